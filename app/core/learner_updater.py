@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from copy import deepcopy
 import math
 
@@ -130,10 +130,142 @@ def update_learner_state(
     # -----------------------------------
     # 6. HISTORY
     # -----------------------------------
-    updated_state["history"].append({
-        "date": today.date().isoformat(),
-        "actual_hours": actual,
-        "expected_hours": expected
-    })
+    record_history(updated_state, today.date(), actual, expected)
 
     return updated_state
+
+
+# -----------------------------------
+# HISTORY (bounded)
+#
+#   history          last HISTORY_DAYS days, one entry per date
+#   history_weekly   { "2026-W13": totals }, last HISTORY_WEEKS weeks
+#   history_monthly  { "2026-03": totals },  last HISTORY_MONTHS months
+#   streak           { "current": n, "last_date": "YYYY-MM-DD" }
+#
+# Weekly / monthly totals are updated incrementally on every
+# submit, so they cover every day — not only the ones that
+# dropped out of the daily ring. Document size stays constant
+# over a semester.
+# -----------------------------------
+HISTORY_DAYS = 60
+HISTORY_WEEKS = 26
+HISTORY_MONTHS = 24
+
+
+def _week_key(day) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _month_key(day) -> str:
+    return f"{day.year}-{day.month:02d}"
+
+
+def _add_to_rollup(rollup, key, actual, expected, new_day, newly_studied, keep):
+    totals = rollup.setdefault(key, {
+        "actual_hours": 0,
+        "expected_hours": 0,
+        "days_logged": 0,
+        "days_studied": 0
+    })
+
+    totals["actual_hours"] = round(totals["actual_hours"] + actual, 2)
+    totals["expected_hours"] = round(totals["expected_hours"] + expected, 2)
+    totals["days_logged"] += 1 if new_day else 0
+    totals["days_studied"] += 1 if newly_studied else 0
+
+    # Keys sort chronologically — drop the oldest beyond keep
+    for old_key in sorted(rollup)[:-keep]:
+        del rollup[old_key]
+
+
+def _upgrade_history(state):
+    """
+    Older learner files have an unbounded history list that may
+    repeat a date. Rebuild it in the bounded format once.
+    """
+    entries = state.get("history", [])
+    state["history"] = []
+    state["history_weekly"] = {}
+    state["history_monthly"] = {}
+    state["streak"] = {"current": 0, "last_date": None}
+
+    for entry in sorted(entries, key=lambda e: e.get("date", "")):
+        try:
+            day = date.fromisoformat(entry["date"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        record_history(
+            state,
+            day,
+            entry.get("actual_hours", 0),
+            entry.get("expected_hours", 0)
+        )
+
+
+def record_history(state, day, actual, expected):
+    """
+    Log one progress submit for day (a date). Several submits on
+    the same day are summed into a single entry.
+    """
+    if "history_weekly" not in state:
+        _upgrade_history(state)
+
+    history = state["history"]
+    day_key = day.isoformat()
+
+    entry = next((e for e in reversed(history) if e["date"] == day_key), None)
+    new_day = entry is None
+
+    if new_day:
+        entry = {"date": day_key, "actual_hours": 0, "expected_hours": 0}
+        history.append(entry)
+        history.sort(key=lambda e: e["date"])
+
+    was_studied = entry["actual_hours"] > 0
+    entry["actual_hours"] = round(entry["actual_hours"] + actual, 2)
+    entry["expected_hours"] = round(entry["expected_hours"] + expected, 2)
+    newly_studied = not was_studied and entry["actual_hours"] > 0
+
+    del history[:-HISTORY_DAYS]
+
+    _add_to_rollup(state["history_weekly"], _week_key(day),
+                   actual, expected, new_day, newly_studied, HISTORY_WEEKS)
+    _add_to_rollup(state["history_monthly"], _month_key(day),
+                   actual, expected, new_day, newly_studied, HISTORY_MONTHS)
+
+    # Streak only moves forward; a late submit for an older day
+    # is still logged above but does not rewrite the streak
+    streak = state["streak"]
+    last = streak["last_date"]
+    last_day = date.fromisoformat(last) if last else None
+
+    if newly_studied and (last_day is None or day > last_day):
+        if last_day == day - timedelta(days=1):
+            streak["current"] += 1
+        else:
+            streak["current"] = 1
+        streak["last_date"] = day_key
+
+
+def study_streak(state, today) -> int:
+    """
+    Consecutive days studied up to today. A streak that ended
+    yesterday still counts, so it does not reset at midnight
+    before the user has studied.
+    """
+    streak = state.get("streak")
+
+    if streak is None:
+        # Not upgraded yet — work on a copy, never mutate here
+        upgraded = {"history": state.get("history", [])}
+        _upgrade_history(upgraded)
+        streak = upgraded["streak"]
+
+    if not streak["last_date"]:
+        return 0
+
+    gap = (today - date.fromisoformat(streak["last_date"])).days
+    return streak["current"] if gap in (0, 1) else 0
@@ -16,6 +16,8 @@ from app.routes import familiarity_test
 from app.routes import plan
 from app.routes import diagnostic
 from app.routes import progress
+from app.routes import usage
+from app.services.bulk_question_generator import BulkQuestionGenerator
 
 # --------------------------------------------------
 # 1. Create app
@@ -65,8 +67,20 @@ app.include_router(diagnostic.router)
 # Daily progress tracker (today's tasks, mark done, auto regenerate)
 app.include_router(progress.router)
 
+# LLM usage (calls, tokens, cost for this user's syllabuses)
+app.include_router(usage.router)
+
+# --------------------------------------------------
+# 5. Background jobs
+# --------------------------------------------------
+@app.on_event("startup")
+async def start_background_jobs():
+    # Retry question banks whose generation failed (with backoff)
+    BulkQuestionGenerator.start_retry_worker()
+
+
 # --------------------------------------------------
-# 5. Error handlers
+# 6. Error handlers
 # --------------------------------------------------
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from bson import ObjectId
+
+from app.database import syllabus_collection
 from app.services.diagnostic_service import DiagnosticService
 
 router = APIRouter()
@@ -6,12 +9,29 @@ diagnostic_service = DiagnosticService()
 
 
 @router.post("/diagnostic/start")
-def start_diagnostic(topics: list):
+def start_diagnostic(request: Request, topics: list, syllabus_id: str | None = None):
     """
-    Generate diagnostic questions for given topics.
+    Generate diagnostic questions for given topics — from the
+    syllabus's structure when syllabus_id is given (the logged-in
+    user's syllabuses only).
     """
 
-    questions = diagnostic_service.generate_questions(topics)
+    structured = []
+    if syllabus_id:
+        if "user_id" not in request.session:
+            return {"error": "not_authenticated"}
+
+        syllabus = syllabus_collection.find_one(
+            {"_id": ObjectId(syllabus_id), "user_id": ObjectId(request.session["user_id"])},
+            {"structured_syllabus": 1}
+        ) if ObjectId.is_valid(syllabus_id) else None
+
+        if not syllabus:
+            return {"error": "syllabus_not_found"}
+
+        structured = syllabus.get("structured_syllabus") or []
+
+    questions = diagnostic_service.generate_questions(topics, structured)
 
     return {
         "questions": questions
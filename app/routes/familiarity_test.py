@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from bson import ObjectId
 
 from app.database import syllabus_collection
 
 from app.services.bulk_question_generator import BulkQuestionGenerator
+from app.services.template_question_generator import TemplateQuestionGenerator
 from app.services.familiarity_updater import update_familiarity
 from app.services.test_sampler import sample_initial_unit_topics, sample_micro_topics
 
-from app.storage.learner_store import load_learner_state, save_learner_state
+from app.storage.learner_store import load_learner_state, modify_learner_state
 
 from app.services.familiarity_updater import update_familiarity
 from app.services.plan_orchestrator import build_adaptive_plan
@@ -26,60 +28,77 @@ templates = Jinja2Templates(directory="app/templates")
 # ---------------------------------------------------
 # HELPER: ensure question bank exists for syllabus
 # ---------------------------------------------------
-def _ensure_question_bank(syllabus: dict) -> dict:
+async def _ensure_question_bank(syllabus: dict):
     """
     Build question bank if not already built.
-    Returns the bank { topic_name: [questions] }
+    Only checks the topic count — tests then fetch just the
+    topics they need with get_questions_for_topics.
+
+    The build (LLM call, or waiting on another worker's build)
+    runs in the threadpool so it never blocks the event loop.
     """
     syllabus_id = str(syllabus["_id"])
     domain = syllabus.get("title") or syllabus.get("subject") or ""
 
-    bank = BulkQuestionGenerator.load_question_bank(syllabus_id)
-
-    if not bank:
+    if not BulkQuestionGenerator.has_question_bank(syllabus_id):
         structured = syllabus.get("structured_syllabus", [])
-        bank = BulkQuestionGenerator.build_question_bank(
+        await run_in_threadpool(
+            BulkQuestionGenerator.build_question_bank,
             syllabus_id=syllabus_id,
             structured_syllabus=structured,
             domain=domain
         )
 
+
+# ---------------------------------------------------
+# HELPER: bank questions for the test's topics
+# ---------------------------------------------------
+def _questions_for_topics(syllabus: dict, topic_names: list) -> dict:
+    """
+    Fetch the topics' questions from the bank. Topics the bank
+    lacks get template questions this time and are queued for a
+    background top-up, so the next test has real questions.
+    """
+    syllabus_id = str(syllabus["_id"])
+    bank = BulkQuestionGenerator.get_questions_for_topics(syllabus_id, topic_names)
+
+    missing = [t for t in topic_names if not bank.get(t)]
+    if missing:
+        BulkQuestionGenerator.request_top_up(
+            syllabus_id,
+            missing,
+            domain=syllabus.get("title") or syllabus.get("subject") or ""
+        )
+
     return bank
 
 
 # ---------------------------------------------------
 # HELPER: build questions + topic_map from topic list
 # ---------------------------------------------------
-def _build_test_from_bank(bank: dict, topic_names: list) -> tuple:
+def _build_test_from_bank(bank: dict, topic_names: list, structured: list) -> tuple:
     """
     Given a bank and a list of topic names, return
     (questions dict, topic_map dict) ready for the template.
 
-    Falls back to a placeholder question if topic missing from bank.
+    Topics missing from the bank get a template question built
+    from the syllabus (no API call); a topic no template fits is
+    left out of this test rather than scored on a placeholder.
     """
     questions = {}
     topic_map = {}
 
-    for i, topic in enumerate(topic_names):
-        topic_id = f"t{i}"
-        topic_map[topic_id] = topic
+    missing = [t for t in topic_names if not bank.get(t)]
+    local = TemplateQuestionGenerator.generate(structured, missing) if missing else {}
 
-        if topic in bank and bank[topic]:
-            questions[topic_id] = bank[topic]
-        else:
-            # Fallback placeholder — no extra API call needed
-            questions[topic_id] = [
-                {
-                    "question": f"Which of the following best describes '{topic}'?",
-                    "options": [
-                        f"A core concept in the subject",
-                        f"An unrelated technical term",
-                        f"A programming tool",
-                        f"A hardware component"
-                    ],
-                    "answer": "A core concept in the subject"
-                }
-            ]
+    for topic in topic_names:
+        topic_questions = bank.get(topic) or local.get(topic)
+        if not topic_questions:
+            continue
+
+        topic_id = f"t{len(topic_map)}"
+        topic_map[topic_id] = topic
+        questions[topic_id] = topic_questions
 
     return questions, topic_map
 
@@ -108,9 +127,6 @@ async def start_familiarity_test(request: Request, syllabus_id: str):
     if not structured:
         raise HTTPException(status_code=400, detail="Structured syllabus missing")
 
-    # ⭐ Ensure question bank is built (one API call total)
-    bank = _ensure_question_bank(syllabus)
-
     # ⭐ Initial test = ALL Unit-1 topics (proper diagnostic)
     # sample_initial_unit_topics picks from first unit only, up to 20
     unit1_topics = sample_initial_unit_topics(structured, n=20)
@@ -123,7 +139,34 @@ async def start_familiarity_test(request: Request, syllabus_id: str):
             for t in unit["topics"]
         ][:10]
 
-    questions, topic_map = _build_test_from_bank(bank, unit1_topics)
+    # ⭐ Bank is built in the background from structuring time.
+    # Unit-1 not in yet → a page that polls the build instead of
+    # holding this request open (failed builds skip straight to
+    # template questions + top-up)
+    progress = await run_in_threadpool(
+        BulkQuestionGenerator.get_build_progress, syllabus_id, structured
+    )
+
+    if not progress["unit1_ready"] and progress["state"] in ("not_started", "queued", "building"):
+        if progress["state"] == "not_started":
+            BulkQuestionGenerator.enqueue_build(
+                syllabus_id,
+                structured,
+                domain=syllabus.get("title") or syllabus.get("subject") or ""
+            )
+
+        return templates.TemplateResponse(
+            "bank_preparing.html",
+            {
+                "request": request,
+                "syllabus_id": syllabus_id,
+                "progress": progress
+            }
+        )
+
+    # Bank file reads + top-up status lock: off the event loop
+    bank = await run_in_threadpool(_questions_for_topics, syllabus, unit1_topics)
+    questions, topic_map = _build_test_from_bank(bank, unit1_topics, structured)
 
     request.session["test_questions"] = questions
     request.session["test_topic_map"] = topic_map
@@ -143,6 +186,34 @@ async def start_familiarity_test(request: Request, syllabus_id: str):
     )
 
 
+# ---------------------------------------------------
+# QUESTION BANK BUILD STATUS  (JSON — polled by the test page)
+# ---------------------------------------------------
+@router.get("/familiarity/bank-status/{syllabus_id}")
+async def question_bank_status(request: Request, syllabus_id: str):
+    """
+    Progress of the syllabus's background bank build — see
+    BulkQuestionGenerator.get_build_progress.
+    """
+
+    if "user_id" not in request.session:
+        return {"error": "not_authenticated"}
+
+    syllabus = syllabus_collection.find_one(
+        {"_id": ObjectId(syllabus_id), "user_id": ObjectId(request.session["user_id"])},
+        {"structured_syllabus": 1}
+    )
+
+    if not syllabus:
+        return {"error": "syllabus_not_found"}
+
+    return await run_in_threadpool(
+        BulkQuestionGenerator.get_build_progress,
+        syllabus_id,
+        syllabus.get("structured_syllabus") or []
+    )
+
+
 # ---------------------------------------------------
 # MICRO TEST  (Periodic 10-question test)
 # ---------------------------------------------------
@@ -163,7 +234,7 @@ async def micro_familiarity_test(request: Request, syllabus_id: str):
     structured = syllabus.get("structured_syllabus", [])
 
     # ⭐ Ensure bank exists — no new API call if already built
-    bank = _ensure_question_bank(syllabus)
+    await _ensure_question_bank(syllabus)
 
     # ⭐ Unit-aware sampling — returns (topics, unit_number_being_tested)
     result = sample_micro_topics(structured, learner_state, n=10)
@@ -174,7 +245,9 @@ async def micro_familiarity_test(request: Request, syllabus_id: str):
     else:
         topics, unit_being_tested = result, None
 
-    questions, topic_map = _build_test_from_bank(bank, topics)
+    # Bank file reads + top-up status lock: off the event loop
+    bank = await run_in_threadpool(_questions_for_topics, syllabus, topics)
+    questions, topic_map = _build_test_from_bank(bank, topics, structured)
 
     request.session["test_questions"] = questions
     request.session["test_topic_map"] = topic_map
@@ -203,41 +276,43 @@ async def micro_familiarity_test(request: Request, syllabus_id: str):
 # ---------------------------------------------------
 @router.get("/familiarity/local/{syllabus_id}", response_class=HTMLResponse)
 async def local_familiarity_test(request: Request, syllabus_id: str):
+    """
+    The Unit-1 test built from syllabus templates only — served
+    at once while the bank is still being generated or the LLM
+    is unavailable.
+    """
 
-    local_questions = {
-        "t0": [
-            {
-                "question": "What is Python?",
-                "options": ["Language", "Database", "OS", "Compiler"],
-                "answer": "Language"
-            }
-        ],
-        "t1": [
-            {
-                "question": "Which structure uses FIFO?",
-                "options": ["Stack", "Queue", "Tree", "Graph"],
-                "answer": "Queue"
-            }
-        ]
-    }
+    if "user_id" not in request.session:
+        return RedirectResponse("/login", status_code=303)
 
-    topic_map = {
-        "t0": "Python Basics",
-        "t1": "Data Structures"
-    }
+    syllabus = syllabus_collection.find_one({
+        "_id": ObjectId(syllabus_id),
+        "user_id": ObjectId(request.session["user_id"])
+    })
+
+    if not syllabus:
+        raise HTTPException(status_code=404, detail="Syllabus not found")
+
+    structured = syllabus.get("structured_syllabus") or []
+
+    unit1_topics = sample_initial_unit_topics(structured, n=20)
+    questions, topic_map = _build_test_from_bank({}, unit1_topics, structured)
 
-    request.session["test_questions"] = local_questions
+    request.session["test_questions"] = questions
     request.session["test_topic_map"] = topic_map
     request.session["test_syllabus_id"] = syllabus_id
+    # Scored and shown as the Unit-1 test it stands in for
+    test_type = "initial"
+    request.session["test_type"] = test_type
 
     return templates.TemplateResponse(
         "familiarity_test.html",
         {
             "request": request,
-            "questions": local_questions,
+            "questions": questions,
             "topic_map": topic_map,
             "syllabus_id": syllabus_id,
-            "test_type": "local",
+            "test_type": test_type,
             "error_message": None
         }
     )
@@ -303,16 +378,26 @@ async def submit_familiarity_test(request: Request):
     overall_score = total_correct / total_q if total_q else 0
 
     user_id = request.session["user_id"]
-    learner_state = load_learner_state(user_id) or {"topic_states": {}}
 
     # ⭐ Snapshot familiarity BEFORE update for comparison
-    familiarity_before = {
-        topic: learner_state.get("topic_states", {}).get(topic, {}).get("familiarity", 0.0)
-        for topic in topic_scores.keys()
-    }
+    familiarity_before = {}
+
+    def _apply_scores(learner_state):
+        learner_state = learner_state or {"topic_states": {}}
+
+        # Re-taken on every CAS retry so it matches the saved state
+        familiarity_before.clear()
+        familiarity_before.update({
+            topic: learner_state.get("topic_states", {}).get(topic, {}).get("familiarity", 0.0)
+            for topic in topic_scores.keys()
+        })
 
-    learner_state = update_familiarity(learner_state, topic_scores)
-    save_learner_state(user_id, learner_state)
+        return update_familiarity(learner_state, topic_scores)
+
+    # Blocking file lock + CAS retries: off the event loop
+    learner_state = await run_in_threadpool(
+        modify_learner_state, user_id, _apply_scores, event="familiarity_test"
+    )
 
     # ⭐ Snapshot familiarity AFTER update
     familiarity_after = {
@@ -567,64 +652,70 @@ async def submit_self_rating(request: Request):
 
     structured = syllabus.get("structured_syllabus", [])
 
-    # Load existing learner state (has Unit-1 test results)
-    learner_state = load_learner_state(user_id) or {"topic_states": {}}
-
-    if "topic_states" not in learner_state:
-        learner_state["topic_states"] = {}
-
-    # Process each unit's self-rating
-    for unit in structured:
-        unit_number = unit.get("unit_number", 1)
-
-        if unit_number == 1:
-            # Skip Unit-1 — already tested properly
-            continue
-
-        form_key = f"unit_{unit_number}"
-        raw_rating = answers.get(form_key)
-
-        if raw_rating is None:
-            continue
-
-        try:
-            self_rating = float(raw_rating)
-        except ValueError:
-            continue
-
-        # Apply to all topics in this unit
-        # Weight = 0.4 because self-rating is less reliable than MCQ test
-        weighted_familiarity = round(0.4 * self_rating, 3)
-
-        for topic in unit.get("topics", []):
-            topic_name = topic["name"]
-            existing = learner_state["topic_states"].get(topic_name, {})
-
-            # If topic already has test data, blend with self-rating
-            # If topic is fresh, use weighted self-rating only
-            existing_familiarity = existing.get("familiarity", 0.0)
-            existing_attempts = existing.get("attempts", 0)
+    # Apply ratings on top of the existing learner state (has
+    # Unit-1 test results) as a compare-and-swap update
+    def _apply_self_rating(learner_state):
+        learner_state = learner_state or {"topic_states": {}}
+
+        if "topic_states" not in learner_state:
+            learner_state["topic_states"] = {}
+
+        # Process each unit's self-rating
+        for unit in structured:
+            unit_number = unit.get("unit_number", 1)
+
+            if unit_number == 1:
+                # Skip Unit-1 — already tested properly
+                continue
+
+            form_key = f"unit_{unit_number}"
+            raw_rating = answers.get(form_key)
+
+            if raw_rating is None:
+                continue
+
+            try:
+                self_rating = float(raw_rating)
+            except ValueError:
+                continue
+
+            # Apply to all topics in this unit
+            # Weight = 0.4 because self-rating is less reliable than MCQ test
+            weighted_familiarity = round(0.4 * self_rating, 3)
+
+            for topic in unit.get("topics", []):
+                topic_name = topic["name"]
+                existing = learner_state["topic_states"].get(topic_name, {})
+
+                # If topic already has test data, blend with self-rating
+                # If topic is fresh, use weighted self-rating only
+                existing_familiarity = existing.get("familiarity", 0.0)
+                existing_attempts = existing.get("attempts", 0)
+
+                if existing_attempts > 0:
+                    # Blend: existing test score takes priority (60%)
+                    blended = round(
+                        0.6 * existing_familiarity + 0.4 * self_rating,
+                        3
+                    )
+                else:
+                    blended = weighted_familiarity
+
+                learner_state["topic_states"][topic_name] = {
+                    "familiarity": blended,
+                    "confidence": round(blended * 0.6, 3),  # lower confidence for self-rated
+                    "retention": existing.get("retention", 1.0),
+                    "attempts": existing_attempts,
+                    "revision_due": blended < 0.5,
+                    "last_updated": existing.get("last_updated"),
+                    "self_rated": True   # flag so planner knows this is approximate
+                }
 
-            if existing_attempts > 0:
-                # Blend: existing test score takes priority (60%)
-                blended = round(
-                    0.6 * existing_familiarity + 0.4 * self_rating,
-                    3
-                )
-            else:
-                blended = weighted_familiarity
-
-            learner_state["topic_states"][topic_name] = {
-                "familiarity": blended,
-                "confidence": round(blended * 0.6, 3),  # lower confidence for self-rated
-                "retention": existing.get("retention", 1.0),
-                "attempts": existing_attempts,
-                "revision_due": blended < 0.5,
-                "last_updated": existing.get("last_updated"),
-                "self_rated": True   # flag so planner knows this is approximate
-            }
+        return learner_state
 
-    save_learner_state(user_id, learner_state)
+    await run_in_threadpool(
+        modify_learner_state, user_id, _apply_self_rating, event="self_rating"
+    )
 
     # Clear pending flag
     request.session.pop("pending_self_rating_syllabus_id", None)
@@ -718,15 +809,22 @@ async def submit_micro_popup(request: Request):
     # --------------------------------------------------
     # Update familiarity
     # --------------------------------------------------
-    learner_state = load_learner_state(user_id) or {"topic_states": {}}
+    familiarity_before = {}
 
-    familiarity_before = {
-        t: learner_state.get("topic_states", {}).get(t, {}).get("familiarity", 0.0)
-        for t in topic_scores
-    }
+    def _apply_scores(learner_state):
+        learner_state = learner_state or {"topic_states": {}}
 
-    learner_state = update_familiarity(learner_state, topic_scores)
-    save_learner_state(user_id, learner_state)
+        familiarity_before.clear()
+        familiarity_before.update({
+            t: learner_state.get("topic_states", {}).get(t, {}).get("familiarity", 0.0)
+            for t in topic_scores
+        })
+
+        return update_familiarity(learner_state, topic_scores)
+
+    learner_state = await run_in_threadpool(
+        modify_learner_state, user_id, _apply_scores, event="micro_test"
+    )
 
     familiarity_after = {
         t: learner_state.get("topic_states", {}).get(t, {}).get("familiarity", 0.0)
@@ -810,7 +908,7 @@ async def micro_test_data(request: Request, syllabus_id: str):
         return {"error": "syllabus_not_found"}
 
     structured = syllabus.get("structured_syllabus", [])
-    bank = _ensure_question_bank(syllabus)
+    await _ensure_question_bank(syllabus)
 
     # Unit-aware sampling
     result = sample_micro_topics(structured, learner_state, n=10)
@@ -820,7 +918,9 @@ async def micro_test_data(request: Request, syllabus_id: str):
     else:
         topics, unit_being_tested = result, None
 
-    questions, topic_map = _build_test_from_bank(bank, topics)
+    # Bank file reads + top-up status lock: off the event loop
+    bank = await run_in_threadpool(_questions_for_topics, syllabus, topics)
+    questions, topic_map = _build_test_from_bank(bank, topics, structured)
 
     return {
         "questions": questions,
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from bson import ObjectId
-from datetime import date, timedelta
+from datetime import date
 
+from app.core.learner_updater import study_streak
 from app.database import syllabus_collection
 from app.storage.learner_store import load_learner_state
 from app.storage.plan_store import load_plan
@@ -91,40 +92,10 @@ def dashboard(request: Request):
         )
 
         # -------------------------------------------------------
-        # Study streak — count consecutive days studied going
-        # backwards from today using the history list.
-        # Each history entry has a "date" field "YYYY-MM-DD".
-        # We deduplicate dates first (multiple submits same day)
-        # then walk back day by day until a gap is found.
+        # Study streak — consecutive days studied up to today,
+        # kept up to date by learner_updater on every submit
         # -------------------------------------------------------
-        history = learner_state.get("history", [])
-
-        if history:
-            # Get unique dates that had actual study (actual_hours > 0)
-            studied_dates = set()
-            for entry in history:
-                try:
-                    if entry.get("actual_hours", 0) > 0:
-                        studied_dates.add(date.fromisoformat(entry["date"]))
-                except Exception:
-                    pass
-
-            # Walk back from today counting consecutive days
-            streak = 0
-            check_date = date.today()
-            while check_date in studied_dates:
-                streak += 1
-                check_date -= timedelta(days=1)
-
-            # If today not studied yet, check from yesterday so
-            # streak does not reset at midnight before user studies
-            if streak == 0:
-                check_date = date.today() - timedelta(days=1)
-                while check_date in studied_dates:
-                    streak += 1
-                    check_date -= timedelta(days=1)
-
-            streak_days = streak
+        streak_days = study_streak(learner_state, date.today())
 
         # -------------------------------------------------------
         # Consistency percentage (0.5-1.0 scale shown as %)
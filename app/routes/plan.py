@@ -1,14 +1,24 @@
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from bson import ObjectId
 
 from app.database import syllabus_collection
 from app.services.plan_orchestrator import build_adaptive_plan
-from app.storage.plan_store import get_study_plan, load_plan
-from app.storage.learner_store import load_learner_state, save_learner_state
+from app.storage.plan_store import (
+    diff_plan_revisions,
+    get_study_plan,
+    list_plan_revisions,
+    load_plan,
+    load_plan_revision,
+    restore_plan_revision
+)
+from app.storage.learner_store import modify_learner_state
 from app.services.familiarity_updater import update_familiarity
 from app.services.bulk_question_generator import BulkQuestionGenerator
+from app.services.template_question_generator import TemplateQuestionGenerator
 
 router = APIRouter(tags=["Study Plan"])
 templates = Jinja2Templates(directory="app/templates")
@@ -218,6 +228,64 @@ def dynamic_plan(request: Request):
     )
 
 
+# ─────────────────────────────────────────────
+# Plan revisions — every regeneration is kept
+# GET  /plan/revisions
+# GET  /plan/revisions/diff/{from_version}/{to_version}
+# GET  /plan/revisions/{version}
+# POST /plan/revisions/{version}/restore
+# ─────────────────────────────────────────────
+@router.get("/plan/revisions")
+def plan_revisions(request: Request):
+
+    if "user_id" not in request.session:
+        return JSONResponse({"error": "not_authenticated"}, status_code=401)
+
+    return JSONResponse({
+        "revisions": list_plan_revisions(request.session["user_id"])
+    })
+
+
+@router.get("/plan/revisions/diff/{from_version}/{to_version}")
+def plan_revision_diff(request: Request, from_version: int, to_version: int):
+
+    if "user_id" not in request.session:
+        return JSONResponse({"error": "not_authenticated"}, status_code=401)
+
+    diff = diff_plan_revisions(request.session["user_id"], from_version, to_version)
+
+    if diff is None:
+        return JSONResponse({"error": "revision_not_found"}, status_code=404)
+
+    return JSONResponse(jsonable_encoder(diff))
+
+
+@router.get("/plan/revisions/{version}")
+def plan_revision(request: Request, version: int):
+
+    if "user_id" not in request.session:
+        return JSONResponse({"error": "not_authenticated"}, status_code=401)
+
+    document = load_plan_revision(request.session["user_id"], version)
+
+    if document is None:
+        return JSONResponse({"error": "revision_not_found"}, status_code=404)
+
+    return JSONResponse(jsonable_encoder(document))
+
+
+@router.post("/plan/revisions/{version}/restore")
+def restore_plan(request: Request, version: int):
+
+    if "user_id" not in request.session:
+        return RedirectResponse("/login", status_code=303)
+
+    if restore_plan_revision(request.session["user_id"], version) is None:
+        raise HTTPException(status_code=404, detail="Plan revision not found")
+
+    return RedirectResponse("/plan/dynamic", status_code=303)
+
+
 # ─────────────────────────────────────────────
 # Daily Quiz — get questions
 # GET /plan/quiz/questions/{day}
@@ -251,43 +319,56 @@ async def get_daily_quiz_questions(request: Request, day: int):
     if not study_topics:
         return JSONResponse({"error": "no_topics_for_day"}, status_code=404)
 
-    # 3. Find the right question bank automatically
-    #    Try all structured syllabuses for this user, newest first
+    # 3. Find each topic's questions through the topic index —
+    #    only this user's syllabuses, newest first
     syllabuses = list(syllabus_collection.find(
         {"user_id": ObjectId(user_id), "status": "structured"},
+        {"_id": 1, "title": 1, "subject": 1},
         sort=[("_id", -1)]
     ))
+    syllabus_ids = [str(s["_id"]) for s in syllabuses]
 
-    bank = None
-    for syllabus in syllabuses:
-        candidate = BulkQuestionGenerator.load_question_bank(
-            str(syllabus["_id"])
+    # Topic index + bank file reads: off the event loop
+    bank = await run_in_threadpool(
+        BulkQuestionGenerator.find_questions_for_topics,
+        study_topics, syllabus_ids
+    )
+
+    # Topics no bank has → top up the newest syllabus's bank
+    # (the plan is built from it); template questions from its
+    # syllabus for today
+    missing = [t for t in study_topics if not bank.get(t)]
+    local = {}
+    if missing and syllabuses:
+        await run_in_threadpool(
+            BulkQuestionGenerator.request_top_up,
+            syllabus_ids[0],
+            missing,
+            domain=syllabuses[0].get("title") or syllabuses[0].get("subject") or ""
+        )
+        newest = syllabus_collection.find_one(
+            {"_id": syllabuses[0]["_id"]}, {"structured_syllabus": 1}
+        ) or {}
+        local = TemplateQuestionGenerator.generate(
+            newest.get("structured_syllabus") or [], missing
         )
-        if candidate and any(t in candidate for t in study_topics):
-            bank = candidate
-            break
 
-    # 4. Build questions — 1 per topic for daily quiz
+    # 4. Build questions — 1 per topic for daily quiz; a topic
+    #    with no question at all is left out, not scored
     questions = {}
     topic_map = {}
 
-    for i, topic in enumerate(study_topics):
-        topic_id          = f"t{i}"
+    for topic in study_topics:
+        topic_questions = bank.get(topic) or local.get(topic)
+        if not topic_questions:
+            continue
+
+        topic_id            = f"t{len(topic_map)}"
         topic_map[topic_id] = topic
+        questions[topic_id] = [topic_questions[0]]
 
-        if bank and topic in bank and bank[topic]:
-            questions[topic_id] = [bank[topic][0]]
-        else:
-            questions[topic_id] = [{
-                "question": f"Which of the following best describes '{topic}'?",
-                "options": [
-                    "A core concept in this subject",
-                    "An unrelated technical term",
-                    "A programming tool",
-                    "A hardware component"
-                ],
-                "answer": "A core concept in this subject"
-            }]
+    if not questions:
+        return JSONResponse({"error": "no_questions"}, status_code=404)
 
     return JSONResponse({
         "questions":       questions,
@@ -333,9 +414,15 @@ async def submit_daily_quiz(request: Request):
 
     overall_score = total_correct / total_q if total_q else 0
 
-    learner_state = load_learner_state(user_id) or {"topic_states": {}}
-    learner_state = update_familiarity(learner_state, topic_scores)
-    save_learner_state(user_id, learner_state)
+    # Blocking file lock + CAS retries: off the event loop
+    await run_in_threadpool(
+        modify_learner_state,
+        user_id,
+        lambda state: update_familiarity(
+            state or {"topic_states": {}}, topic_scores
+        ),
+        event="daily_quiz"
+    )
 
     return JSONResponse({
         "overall_score":   round(overall_score * 100, 1),
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Request, HTTPException, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from bson import ObjectId
 from datetime import date
 import json
 
 from app.database import syllabus_collection
-from app.storage.learner_store import load_learner_state, save_learner_state
+from app.storage.learner_store import load_learner_state, modify_learner_state
 from app.storage.plan_store import load_plan, save_plan
 from app.core.learner_updater import update_learner_state
 from app.services.plan_orchestrator import build_adaptive_plan
@@ -207,23 +208,27 @@ async def submit_progress(request: Request, syllabus_id: str):
     # ------------------------------------------------
     # 3. Update learner state
     # ------------------------------------------------
-    learner_state = load_learner_state(user_id)
-
-    if not learner_state:
-        learner_state = {
-            "topic_states": {},
-            "learning_speed": 1.0,
-            "consistency": 1.0,
-            "history": []
-        }
+    # Read-modify-write under compare-and-swap so a concurrent
+    # micro test / quiz submit for the same user is not lost
+    def _apply_report(learner_state):
+        if not learner_state:
+            learner_state = {
+                "topic_states": {},
+                "learning_speed": 1.0,
+                "consistency": 1.0,
+                "history": []
+            }
+
+        return update_learner_state(
+            learner_state=learner_state,
+            daily_report=daily_report
+        )
 
-    learner_state = update_learner_state(
-        learner_state=learner_state,
-        daily_report=daily_report
+    # Blocking file lock + CAS retries: off the event loop
+    await run_in_threadpool(
+        modify_learner_state, user_id, _apply_report, event="study_session"
     )
 
-    save_learner_state(user_id, learner_state)
-
     # ------------------------------------------------
     # 4. Auto regenerate plan with updated learner state
     # ------------------------------------------------
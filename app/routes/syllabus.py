@@ -13,6 +13,7 @@ from app.services.syllabus_structurer import structure_syllabus
 from app.services.subject_detector import detect_subjects
 from app.services.planner_service import PlannerService
 from app.services.topic_cleaner import TopicCleaner
+from app.services.bulk_question_generator import BulkQuestionGenerator
 from app.storage.learner_store import get_learner_state
 from app.services.complexity_engine import compute_complexity
 from app.services.topic_analyzer import analyze_topic
@@ -261,7 +262,10 @@ def structure_selected_subject(
     print(structured_payload)
 
     try:
-        cleaned_payload = TopicCleaner.clean_topics(structured_payload)
+        cleaned_payload = TopicCleaner.clean_topics(
+            structured_payload,
+            tags={"syllabus_id": syllabus_id, "user_id": request.session["user_id"]}
+        )
         print("CLEANED PAYLOAD FROM AI:")
         print(cleaned_payload)
 
@@ -324,6 +328,22 @@ def structure_selected_subject(
         }
     )
 
+    # -----------------------------------------
+    # PRE-GENERATE QUESTION BANK (background)
+    # Ready — Unit-1 first — by the time the
+    # student opens the familiarity test
+    # -----------------------------------------
+    syllabus = syllabus_collection.find_one(
+        {"_id": ObjectId(syllabus_id)},
+        {"title": 1, "subject": 1}
+    ) or {}
+
+    BulkQuestionGenerator.enqueue_build(
+        syllabus_id,
+        cleaned_payload,
+        domain=syllabus.get("title") or syllabus.get("subject") or ""
+    )
+
     return RedirectResponse(
         url=f"/syllabus/preview/{syllabus_id}",
         status_code=status.HTTP_303_SEE_OTHER
@@ -435,7 +455,10 @@ def clean_topics_with_ai(request: Request, syllabus_id: str):
         raise HTTPException(status_code=400, detail="Syllabus not structured yet")
 
     try:
-        cleaned = TopicCleaner.clean_topics(structured)
+        cleaned = TopicCleaner.clean_topics(
+            structured,
+            tags={"syllabus_id": syllabus_id, "user_id": request.session["user_id"]}
+        )
 
         syllabus_collection.update_one(
             {"_id": ObjectId(syllabus_id)},
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Request
+from bson import ObjectId
+
+from app.database import syllabus_collection
+from app.services.llm_usage import get_usage_log
+
+router = APIRouter(tags=["Usage"])
+
+
+# ---------------------------------------------------
+# LLM USAGE  (JSON — this user's calls, see llm_usage)
+# ---------------------------------------------------
+@router.get("/usage/llm")
+def llm_usage(request: Request, days: int = 30):
+    """
+    Calls, tokens, latency and cost of the LLM calls made for the
+    logged-in user and their syllabuses over the last `days` days:
+    per day, per syllabus and per purpose.
+    """
+
+    if "user_id" not in request.session:
+        return {"error": "not_authenticated"}
+
+    user_id = request.session["user_id"]
+
+    syllabus_ids = [
+        str(s["_id"])
+        for s in syllabus_collection.find({"user_id": ObjectId(user_id)}, {"_id": 1})
+    ]
+
+    since = (datetime.utcnow() - timedelta(days=max(days, 1) - 1)).strftime("%Y-%m-%d")
+    usage = get_usage_log()
+
+    return {
+        "since": since,
+        "by_day": usage.summary("day", since, syllabus_ids, user_id),
+        "by_syllabus": usage.summary("syllabus_id", since, syllabus_ids, user_id),
+        "by_purpose": usage.summary("purpose", since, syllabus_ids, user_id)
+    }
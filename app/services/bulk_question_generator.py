@@ -1,34 +1,95 @@
 import os
 import json
-import re
-import requests
+import asyncio
+import hashlib
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from app.services.json_stream import JsonObjectStream, salvage_json_object
+from app.services.llm_client import get_llm_client
+from app.services.topic_matcher import match_key, match_topics
+from app.storage.backend import get_backend, normalize_topic
+from app.storage.file_io import LockTimeout, file_lock
+
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# A failed build is retried after BASE × 2^(attempts-1) seconds, capped at MAX
+BANK_RETRY_BASE = int(os.getenv("BANK_RETRY_BASE_SECONDS", "60"))
+BANK_RETRY_MAX = int(os.getenv("BANK_RETRY_MAX_SECONDS", str(6 * 60 * 60)))
+
+# How often the background job looks for retries that are due (0 = off)
+BANK_RETRY_INTERVAL = int(os.getenv("BANK_RETRY_INTERVAL_SECONDS", "300"))
+
+# A retry in progress holds off other retries this long (worker may die)
+BANK_RETRY_LEASE = 180
+
+# One build per syllabus at a time, across workers: the others wait
+# up to BANK_BUILD_WAIT seconds on its lock file, then reuse its result
+BANK_LOCK_PATH = os.getenv("BANK_LOCK_PATH", "data/locks")
+BANK_BUILD_WAIT = int(os.getenv("BANK_BUILD_WAIT_SECONDS", "90"))
+
+# Large syllabi are generated in chunks (one per unit, units split
+# at this many topics), this many at a time
+BANK_CHUNK_TOPICS = int(os.getenv("BANK_CHUNK_TOPICS", "15"))
+BANK_CHUNK_CONCURRENCY = int(os.getenv("BANK_CHUNK_CONCURRENCY", "4"))
+
+# A streaming build saves the bank when a chunk ends, and in between
+# once this many new topics arrived or this many seconds passed
+BANK_PERSIST_TOPICS = int(os.getenv("BANK_PERSIST_TOPICS", "10"))
+BANK_PERSIST_SECONDS = float(os.getenv("BANK_PERSIST_SECONDS", "1"))
+
+# Background builds queued at structuring time, this many at once
+BANK_PREBUILD_WORKERS = int(os.getenv("BANK_PREBUILD_WORKERS", "2"))
+
+# A queued marker older than this is left by a worker that died
+BANK_QUEUED_STALE = 60 * 60
+
+_build_queue = queue.Queue()
+_queued = set()
+_queue_lock = threading.Lock()
+_prebuild_started = False
 
 
 class BulkQuestionGenerator:
     """
-    Generates ALL questions for ALL topics in ONE API call.
+    Generates ALL questions for ALL topics in a few bulk API calls.
 
-    Why one call?
+    Why bulk calls?
     - 100 topics × 1 call each = 100 API calls (wasteful, slow, costly)
-    - 100 topics × 1 bulk call = 1 API call (fast, efficient)
+    - 100 topics in chunks of 15 = 7 API calls, run concurrently
+      (one giant prompt gets truncated at max_tokens and loses
+      the whole bank; chunks fail and retry independently)
+
+    Replies are streamed: finished topics are saved to the bank in
+    small batches (every finished chunk at the latest), so the
+    Unit-1 test can start before the rest of the bank arrives
+    (get_build_progress).
 
-    Generated questions are stored in:
-    data/question_banks/{syllabus_id}.json
+    Banks are built in the background as soon as a syllabus is
+    structured (enqueue_build), Unit-1 chunks first.
+
+    Generated questions are stored once per (domain, topic) in the
+    backend's shared question store, keyed by a hash of both names
+    normalized. A syllabus's bank only holds references
+    { topic: {"ref": key} }, so the hundredth upload of the same
+    syllabus costs no LLM calls — only cache misses are generated.
+    Older banks holding questions inline still load.
 
     This bank is reused for:
     - Initial Unit-1 diagnostic test
     - Periodic 10-question micro tests
     - Self-rating confirmation questions
+
+    A failed build is never saved as an empty bank. It is recorded
+    as a bank status with a next_retry_at (exponential backoff);
+    until then requests get {} straight away (tests fall back to
+    template questions) and the retry happens in the background.
     """
 
-    API_URL = "https://api.groq.com/openai/v1/chat/completions"
     MODEL = "llama-3.1-8b-instant"
-    BANK_PATH = "data/question_banks"
 
     # -------------------------------------------------------
     # PUBLIC: Generate and store question bank
@@ -40,10 +101,13 @@ class BulkQuestionGenerator:
 
         1. Extract all topics from structured syllabus
         2. Decide how many questions per topic based on count
-        3. Generate all questions in ONE API call
-        4. Store to file
+        3. Generate questions per unit chunk, concurrently
+        4. Store to file as each topic streams in
         5. Return bank
 
+        If generation fails (now or before, see get_bank_status)
+        returns {} without blocking — retries run in the background.
+
         Args:
             syllabus_id:          MongoDB _id of syllabus (used as filename)
             structured_syllabus:  list of units with topics
@@ -54,48 +118,647 @@ class BulkQuestionGenerator:
         """
 
         # Check if bank already exists — avoid regenerating
-        existing = BulkQuestionGenerator.load_question_bank(syllabus_id)
-        if existing:
+        topic_count = get_backend().bank_topic_count(syllabus_id)
+        if topic_count:
             print(f"Question bank already exists for {syllabus_id}, reusing.")
-            return existing
+            return BulkQuestionGenerator.load_question_bank(syllabus_id)
 
         # Extract all topics grouped by unit
         units_topics = BulkQuestionGenerator._extract_topics_by_unit(
             structured_syllabus
         )
 
+        # An earlier build failed — never block on it again
+        status = BulkQuestionGenerator.get_bank_status(syllabus_id)
+        if status is None and topic_count == 0:
+            # Empty bank saved by an older version = failed build
+            status = {"status": "failed", "attempts": 1,
+                      "next_retry_at": datetime.utcnow().isoformat()}
+
+        if status is not None:
+            status = dict(status, units_topics=units_topics, domain=domain)
+
+            if BulkQuestionGenerator._retry_due(status):
+                BulkQuestionGenerator._retry_in_background(syllabus_id, status)
+            else:
+                print(f"Question bank for {syllabus_id} failed, next retry at {status['next_retry_at']}")
+
+            return {}
+
+        return BulkQuestionGenerator._build(syllabus_id, units_topics, domain)
+
+    # -------------------------------------------------------
+    # PUBLIC: Queue a build in the background
+    # -------------------------------------------------------
+    @staticmethod
+    def enqueue_build(syllabus_id: str, structured_syllabus: list, domain: str = ""):
+        """
+        Build the bank on a background worker (BANK_PREBUILD_WORKERS
+        threads, started on first use). A syllabus already queued
+        is not queued twice; a bank already built is reused.
+        """
+        global _prebuild_started
+
+        with _queue_lock:
+            if syllabus_id in _queued:
+                return
+            _queued.add(syllabus_id)
+
+            if not _prebuild_started:
+                for n in range(max(1, BANK_PREBUILD_WORKERS)):
+                    threading.Thread(
+                        target=BulkQuestionGenerator._prebuild_worker,
+                        name=f"bank-prebuild-{n}",
+                        daemon=True
+                    ).start()
+                _prebuild_started = True
+
+        BulkQuestionGenerator._mark_queued(syllabus_id, True)
+        _build_queue.put((syllabus_id, structured_syllabus, domain))
+        print(f"Question bank {syllabus_id} queued for background build")
+
+    @staticmethod
+    def _prebuild_worker():
+        while True:
+            syllabus_id, structured_syllabus, domain = _build_queue.get()
+            try:
+                BulkQuestionGenerator.build_question_bank(syllabus_id, structured_syllabus, domain)
+            except Exception as e:
+                print(f"Background build of question bank {syllabus_id} failed: {e}")
+            finally:
+                with _queue_lock:
+                    _queued.discard(syllabus_id)
+                BulkQuestionGenerator._mark_queued(syllabus_id, False)
+
+    @staticmethod
+    def _queued_marker(syllabus_id: str) -> str:
+        return os.path.join(BANK_LOCK_PATH, f"bank-{syllabus_id}.queued")
+
+    @staticmethod
+    def _mark_queued(syllabus_id: str, queued: bool):
+        """
+        The queue lives in one worker's memory; a marker file next
+        to the build lock lets every worker report "queued".
+        """
+        marker = BulkQuestionGenerator._queued_marker(syllabus_id)
+        try:
+            if queued:
+                os.makedirs(BANK_LOCK_PATH, exist_ok=True)
+                open(marker, "w").close()
+            else:
+                os.remove(marker)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_queued(syllabus_id: str) -> bool:
+        try:
+            age = time.time() - os.path.getmtime(BulkQuestionGenerator._queued_marker(syllabus_id))
+        except OSError:
+            return False
+        return age < BANK_QUEUED_STALE
+
+    # -------------------------------------------------------
+    # PUBLIC: Build progress (for the test page to poll)
+    # -------------------------------------------------------
+    @staticmethod
+    def get_build_progress(syllabus_id: str, structured_syllabus: list) -> dict:
+        """
+        {
+          state:        ready | building | queued | failed | retrying
+                        | top_up | not_started
+          topics_ready: topics in the bank so far
+          topics_total: topics in the syllabus
+          unit1_ready:  every first-unit topic has questions
+          next_retry_at (failed / retrying / top_up only)
+        }
+        """
+        units_topics = BulkQuestionGenerator._extract_topics_by_unit(structured_syllabus)
+        first_unit = next(iter(units_topics.values()), [])
+
+        topics_ready = get_backend().bank_topic_count(syllabus_id) or 0
+        unit1 = BulkQuestionGenerator.get_questions_for_topics(syllabus_id, first_unit) \
+            if topics_ready else {}
+
+        progress = {
+            "topics_ready": topics_ready,
+            "topics_total": sum(len(t) for t in units_topics.values()),
+            "unit1_ready": bool(first_unit) and all(unit1.get(t) for t in first_unit)
+        }
+
+        status = BulkQuestionGenerator.get_bank_status(syllabus_id)
+
+        if BulkQuestionGenerator._build_running(syllabus_id):
+            progress["state"] = "building"
+        elif BulkQuestionGenerator._is_queued(syllabus_id):
+            progress["state"] = "queued"
+        elif status is not None:
+            progress["state"] = status["status"]
+            progress["next_retry_at"] = status.get("next_retry_at")
+        elif topics_ready:
+            progress["state"] = "ready"
+        else:
+            progress["state"] = "not_started"
+
+        return progress
+
+    # -------------------------------------------------------
+    # PUBLIC: Generation status of a bank not yet built
+    # -------------------------------------------------------
+    @staticmethod
+    def get_bank_status(syllabus_id: str) -> dict | None:
+        """
+        None if nothing is recorded (bank built or never tried), else
+        { status: failed | retrying, attempts, last_error,
+          failed_at, next_retry_at, ... }
+        """
+        return get_backend().load_bank_status(syllabus_id)
+
+    # -------------------------------------------------------
+    # PUBLIC: Top up topics missing from the bank
+    # -------------------------------------------------------
+    @staticmethod
+    def request_top_up(syllabus_id: str, topic_names: list, domain: str = ""):
+        """
+        Record topics a test found missing from the bank (renamed
+        by TopicCleaner, skipped by the LLM, ...) and generate them
+        in the background. Only those topics are generated; they
+        are merged into the existing bank.
+
+        Uses the same bank status + retry path as failed builds, so
+        a top-up that fails backs off instead of firing per test.
+
+        Skipped while a build of the bank is running: its bank
+        fills in as it streams, so "missing" topics may just not
+        have arrived yet. A later test asks again if they never do.
+        """
+        if not topic_names:
+            return
+
+        if BulkQuestionGenerator._build_running(syllabus_id):
+            return
+
+        backend = get_backend()
+        topic_count = backend.bank_topic_count(syllabus_id)
+        added = []
+
+        def _update(status):
+            if status is None:
+                if not topic_count:
+                    return None   # no bank yet — the full build covers these
+
+                status = {
+                    "status": "top_up",
+                    "attempts": 0,
+                    "next_retry_at": datetime.utcnow().isoformat(),
+                    "domain": domain,
+                    "units_topics": {},
+                    "questions_per_topic": BulkQuestionGenerator._decide_questions_per_topic(
+                        topic_count + len(topic_names)
+                    )
+                }
+
+            units_topics = dict(status.get("units_topics") or {})
+            pending = {t for topics in units_topics.values() for t in topics}
+            added[:] = [t for t in dict.fromkeys(topic_names) if t not in pending]
+
+            if added:
+                units_topics["top_up"] = units_topics.get("top_up", []) + added
+                status = dict(status, units_topics=units_topics)
+            return status
+
+        # Under the status lock: a build finishing meanwhile keeps these
+        status = backend.update_bank_status(syllabus_id, _update)
+        if status is None:
+            return
+
+        if added:
+            print(f"Question bank {syllabus_id}: {len(added)} topics queued for top-up")
+
+        if BulkQuestionGenerator._retry_due(status):
+            BulkQuestionGenerator._retry_in_background(syllabus_id, status)
+
+    # -------------------------------------------------------
+    # PUBLIC: Background retry job
+    # -------------------------------------------------------
+    @staticmethod
+    def retry_failed_banks() -> int:
+        """
+        Retry every failed bank whose backoff has expired.
+        Returns how many were retried.
+        """
+        retried = 0
+
+        for syllabus_id, status in list(get_backend().iter_bank_statuses()):
+            if "units_topics" in status and BulkQuestionGenerator._retry_due(status):
+                BulkQuestionGenerator._retry(syllabus_id, status)
+                retried += 1
+
+        return retried
+
+    @staticmethod
+    def start_retry_worker():
+        """
+        Daemon thread running retry_failed_banks every
+        BANK_RETRY_INTERVAL seconds. Call once at app startup.
+        """
+        if BANK_RETRY_INTERVAL <= 0:
+            return
+
+        def _loop():
+            stop = threading.Event()
+            while not stop.wait(BANK_RETRY_INTERVAL):
+                try:
+                    BulkQuestionGenerator.retry_failed_banks()
+                except Exception as e:
+                    print(f"Question bank retry job failed: {e}")
+
+        threading.Thread(target=_loop, name="bank-retry", daemon=True).start()
+
+    # -------------------------------------------------------
+    # PRIVATE: Build, record failure, retry
+    # -------------------------------------------------------
+    @staticmethod
+    def _lock_path(syllabus_id: str) -> str:
+        return os.path.join(BANK_LOCK_PATH, f"bank-{syllabus_id}")
+
+    @staticmethod
+    def _build_running(syllabus_id: str) -> bool:
+        """
+        True while any worker holds the syllabus's build lock.
+        """
+        lock_path = BulkQuestionGenerator._lock_path(syllabus_id)
+        if not os.path.exists(f"{lock_path}.lock"):
+            return False
+
+        try:
+            with file_lock(lock_path, timeout=0):
+                return False
+        except LockTimeout:
+            return True
+
+    @staticmethod
+    def _build(syllabus_id: str, units_topics: dict, domain: str,
+               previous: dict | None = None, wait: float = BANK_BUILD_WAIT) -> dict:
+        """
+        Single-flight build: whoever takes the syllabus's lock file
+        generates; concurrent callers (any worker) wait up to `wait`
+        seconds for it and return its bank, or {} if it failed or
+        is still running.
+        """
+        os.makedirs(BANK_LOCK_PATH, exist_ok=True)
+        lock_path = BulkQuestionGenerator._lock_path(syllabus_id)
+
+        try:
+            with file_lock(lock_path, timeout=wait):
+                # Someone else may have finished (or failed) meanwhile.
+                # A retry may run on a partial bank (failed chunks).
+                if previous is None and BulkQuestionGenerator.has_question_bank(syllabus_id):
+                    return BulkQuestionGenerator.load_question_bank(syllabus_id)
+
+                status = BulkQuestionGenerator.get_bank_status(syllabus_id)
+                if (status or {}).get("failed_at") != (previous or {}).get("failed_at"):
+                    return BulkQuestionGenerator.load_question_bank(syllabus_id) or {}
+
+                if previous is not None:
+                    # Hold off other retries while this call runs
+                    # (topics topped up since previous was read stay)
+                    lease = datetime.utcnow() + timedelta(seconds=BANK_RETRY_LEASE)
+                    get_backend().update_bank_status(
+                        syllabus_id,
+                        lambda current: dict(
+                            current or previous, status="retrying",
+                            next_retry_at=lease.isoformat()
+                        )
+                    )
+
+                return BulkQuestionGenerator._generate_and_save(
+                    syllabus_id, units_topics, domain, previous
+                )
+        except LockTimeout:
+            print(f"Question bank {syllabus_id} is still being built elsewhere")
+            return {}
+
+    @staticmethod
+    def _generate_and_save(syllabus_id: str, units_topics: dict, domain: str,
+                           previous: dict | None) -> dict:
+        """
+        Generate the bank chunk by chunk, saving the merged bank as
+        topics stream in (batched, see BANK_PERSIST_TOPICS — each
+        save rewrites the whole bank). Topics a chunk did not
+        deliver (call failed or broke off, LLM skipped them) are
+        recorded in the bank status for a later retry, which merges
+        into the partial bank. Retries and top-ups only ever
+        generate the topics they were given.
+        Returns the bank (possibly partial / {}).
+        """
+        backend = get_backend()
         total_topics = sum(len(t) for t in units_topics.values())
 
         # Decide questions per topic based on total count
-        # Keeps total questions reasonable regardless of syllabus size
-        questions_per_topic = BulkQuestionGenerator._decide_questions_per_topic(
-            total_topics
+        # Keeps total questions reasonable regardless of syllabus size.
+        # A retry keeps the original syllabus's choice.
+        questions_per_topic = (previous or {}).get("questions_per_topic") or \
+            BulkQuestionGenerator._decide_questions_per_topic(total_topics)
+
+        # Retry: keep what earlier chunks produced
+        existing = (backend.load_bank(syllabus_id) or {}) if previous else {}
+        requested = [t for topics in units_topics.values() for t in topics]
+        order = list(dict.fromkeys([*existing, *requested]))
+
+        # Topics any syllabus already generated for this domain
+        keys = {t: BulkQuestionGenerator._content_key(domain, t) for t in order}
+        stored = backend.load_shared_questions(
+            [keys[t] for topics in units_topics.values() for t in topics]
         )
+        reused = {
+            t: {"ref": keys[t]}
+            for topics in units_topics.values() for t in topics
+            if stored.get(keys[t])
+        }
+        units_topics = {
+            unit_num: [t for t in topics if t not in reused]
+            for unit_num, topics in units_topics.items()
+        }
+        units_topics = {u: topics for u, topics in units_topics.items() if topics}
 
-        print(f"Total topics: {total_topics}, questions per topic: {questions_per_topic}")
+        chunks = BulkQuestionGenerator._chunk_topics(units_topics)
 
-        # Generate all questions in one call
-        question_bank = BulkQuestionGenerator._generate_bulk(
-            units_topics=units_topics,
-            questions_per_topic=questions_per_topic,
-            domain=domain
+        print(
+            f"Total topics: {total_topics}, questions per topic: {questions_per_topic}, "
+            f"shared: {len(reused)}, chunks: {len(chunks)}"
         )
 
-        # Save to file
-        BulkQuestionGenerator._save_bank(syllabus_id, question_bank)
+        results = [{} for _ in chunks]
+        failed = {}
+        errors = []
 
-        return question_bank
+        unsaved = {"topics": 0, "since": time.monotonic()}
+
+        def _persist():
+            # Syllabus order, whatever is done so far
+            merged = dict(existing)
+            merged.update(reused)
+            for chunk_refs in results:
+                merged.update(chunk_refs)
+
+            bank = {t: merged[t] for t in order if t in merged}
+            bank.update(merged)
+            BulkQuestionGenerator._save_bank(syllabus_id, bank)
+            unsaved.update(topics=0, since=time.monotonic())
+
+        if reused:
+            _persist()
+
+        def _on_topic(index: int, topic: str, questions: list):
+            results[index].update(
+                BulkQuestionGenerator._share_questions(domain, {topic: questions})
+            )
+            # Tests can use finished topics already — but a save per
+            # topic rewrites the bank N times and stalls the streams
+            unsaved["topics"] += 1
+            if unsaved["topics"] >= BANK_PERSIST_TOPICS or \
+                    time.monotonic() - unsaved["since"] >= BANK_PERSIST_SECONDS:
+                _persist()
+
+        def _on_chunk(index: int, error: Exception | None):
+            if unsaved["topics"]:
+                _persist()
+
+            # Topics streamed before a failure are kept
+            missing = {
+                unit_num: [t for t in topics if t not in results[index]]
+                for unit_num, topics in chunks[index].items()
+            }
+            count = sum(len(topics) for topics in missing.values())
+
+            if error is not None:
+                print(f"Chunk {index + 1}/{len(chunks)} failed ({count} topics missing): {error}")
+                errors.append(str(error))
+            elif count:
+                errors.append(f"LLM skipped {count} topics")
+
+            for unit_num, topics in missing.items():
+                if topics:
+                    failed.setdefault(unit_num, []).extend(topics)
+
+        # Accounting: retries / top-ups counted apart from first builds
+        tags = {
+            "purpose": "question_bank_retry" if previous else "question_bank",
+            "syllabus_id": syllabus_id
+        }
+
+        try:
+            asyncio.run(BulkQuestionGenerator._generate_chunks(
+                chunks, questions_per_topic, domain, _on_chunk, _on_topic, tags
+            ))
+        finally:
+            # Final flush: topics since the last save
+            if unsaved["topics"]:
+                _persist()
+
+        BulkQuestionGenerator._record_outcome(
+            syllabus_id, previous, set(requested), failed, "; ".join(errors),
+            domain, questions_per_topic
+        )
+
+        # Precompute the syllabus topic → bank key map for tests
+        BulkQuestionGenerator._match_bank_topics(syllabus_id, requested)
+
+        return BulkQuestionGenerator.load_question_bank(syllabus_id) or {}
+
+    # -------------------------------------------------------
+    # PRIVATE: Shared question store
+    # -------------------------------------------------------
+    @staticmethod
+    def _content_key(domain: str, topic: str) -> str:
+        """
+        Same key for the same topic in the same subject, whatever
+        the syllabus, capitalization or punctuation.
+        """
+        content = f"{normalize_topic(domain)}\n{normalize_topic(topic)}"
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    @staticmethod
+    def _share_questions(domain: str, questions: dict) -> dict:
+        """
+        Store generated { topic: [questions] } in the shared store;
+        returns the bank references { topic: {"ref": key} }. A key
+        some syllabus stored first keeps its questions (a race
+        between two builds), so banks referencing it never change.
+        """
+        entries = {}
+        refs = {}
+        for topic, topic_questions in questions.items():
+            if topic_questions:
+                key = BulkQuestionGenerator._content_key(domain, topic)
+                entries[key] = topic_questions
+                refs[topic] = {"ref": key}
+
+        get_backend().save_shared_questions(entries)
+        return refs
+
+    @staticmethod
+    def _resolve_refs(bank: dict | None) -> dict | None:
+        """
+        Replace { "ref": key } entries with the shared questions
+        ([] if the entry is gone — the topic then counts as missing
+        and is topped up). Inline (older) entries pass through.
+        """
+        if not bank:
+            return bank
+
+        keys = [q["ref"] for q in bank.values() if isinstance(q, dict)]
+        if not keys:
+            return bank
+
+        shared = get_backend().load_shared_questions(keys)
+        return {
+            topic: shared.get(q["ref"], []) if isinstance(q, dict) else q
+            for topic, q in bank.items()
+        }
+
+    @staticmethod
+    def _chunk_topics(units_topics: dict) -> list:
+        """
+        [{unit_number: [topics]}] — one chunk per unit, units with
+        more than BANK_CHUNK_TOPICS topics split evenly.
+        """
+        chunks = []
+        for unit_num, topics in units_topics.items():
+            pieces = -(-len(topics) // BANK_CHUNK_TOPICS)
+            size = -(-len(topics) // pieces) if pieces else 0
+            for start in range(0, len(topics), size or 1):
+                chunks.append({unit_num: topics[start:start + size]})
+        return chunks
+
+    @staticmethod
+    async def _generate_chunks(chunks: list, questions_per_topic: int, domain: str,
+                               on_chunk, on_topic, tags: dict | None = None):
+        """
+        Generate every chunk, at most BANK_CHUNK_CONCURRENCY at a
+        time, in order (Unit-1 first). on_topic(index, topic,
+        questions) runs as each topic streams in, on_chunk(index,
+        error) as each chunk ends. tags label the LLM calls.
+        """
+        semaphore = asyncio.Semaphore(BANK_CHUNK_CONCURRENCY)
+
+        async def _one(index: int, chunk: dict):
+            async with semaphore:
+                try:
+                    await BulkQuestionGenerator._generate_bulk(
+                        units_topics=chunk,
+                        questions_per_topic=questions_per_topic,
+                        domain=domain,
+                        on_topic=lambda topic, questions: on_topic(index, topic, questions),
+                        tags=tags
+                    )
+                    return index, None
+                except Exception as e:
+                    return index, e
+
+        # Tasks created in order take the semaphore in order
+        # (as_completed would start bare coroutines in any order)
+        tasks = [asyncio.ensure_future(_one(i, c)) for i, c in enumerate(chunks)]
+
+        for done in asyncio.as_completed(tasks):
+            on_chunk(*await done)
+
+    @staticmethod
+    def _record_outcome(syllabus_id: str, previous: dict | None, handled: set,
+                        failed: dict, error: str, domain: str, questions_per_topic: int):
+        """
+        Update the bank status when a build ends, re-read under the
+        status lock: the topics this build was given (handled) are
+        cleared, or recorded as failed with a backoff. Topics a
+        top-up added while it ran are left pending.
+        """
+        now = datetime.utcnow()
+        outcome = {}
+
+        def _update(current):
+            pending = {}
+            for unit_num, topics in ((current or {}).get("units_topics") or {}).items():
+                left = [t for t in topics if t not in handled]
+                if left:
+                    pending[str(unit_num)] = left
+
+            if failed:
+                attempts = (previous or {}).get("attempts", 0) + 1
+                delay = min(BANK_RETRY_BASE * 2 ** (attempts - 1), BANK_RETRY_MAX)
+                outcome.update(attempts=attempts, delay=delay)
+
+                units_topics = {str(u): list(topics) for u, topics in failed.items()}
+                for unit_num, topics in pending.items():
+                    units_topics.setdefault(unit_num, []).extend(topics)
+
+                return {
+                    "status": "failed",
+                    "attempts": attempts,
+                    "last_error": error[:500],
+                    "failed_at": now.isoformat(),
+                    "next_retry_at": (now + timedelta(seconds=delay)).isoformat(),
+                    "domain": domain,
+                    "units_topics": units_topics,
+                    "questions_per_topic": questions_per_topic
+                }
+
+            if pending:
+                return {
+                    "status": "top_up",
+                    "attempts": 0,
+                    "next_retry_at": now.isoformat(),
+                    "domain": domain,
+                    "units_topics": pending,
+                    "questions_per_topic": questions_per_topic
+                }
+
+            return None
+
+        get_backend().update_bank_status(syllabus_id, _update)
+
+        if failed:
+            print(
+                f"Question bank {syllabus_id}: attempt {outcome['attempts']} failed, "
+                f"retry in {outcome['delay']}s"
+            )
+
+    @staticmethod
+    def _retry_due(status: dict) -> bool:
+        return datetime.fromisoformat(status["next_retry_at"]) <= datetime.utcnow()
+
+    @staticmethod
+    def _retry(syllabus_id: str, status: dict):
+        # wait=0: if another worker is already on it, leave it be
+        BulkQuestionGenerator._build(
+            syllabus_id, status["units_topics"], status.get("domain", ""),
+            previous=status, wait=0
+        )
+
+    @staticmethod
+    def _retry_in_background(syllabus_id: str, status: dict):
+        threading.Thread(
+            target=BulkQuestionGenerator._retry,
+            args=(syllabus_id, status),
+            daemon=True
+        ).start()
 
     # -------------------------------------------------------
     # PUBLIC: Load existing bank
     # -------------------------------------------------------
     @staticmethod
     def load_question_bank(syllabus_id: str) -> dict | None:
-        path = BulkQuestionGenerator._bank_path(syllabus_id)
-        if not os.path.exists(path):
-            return None
-        with open(path, "r") as f:
-            return json.load(f)
+        return BulkQuestionGenerator._resolve_refs(get_backend().load_bank(syllabus_id))
+
+    # -------------------------------------------------------
+    # PUBLIC: Cheap existence check
+    # -------------------------------------------------------
+    @staticmethod
+    def has_question_bank(syllabus_id: str) -> bool:
+        """
+        True if a non-empty bank is stored — without loading it.
+        """
+        return bool(get_backend().bank_topic_count(syllabus_id))
 
     # -------------------------------------------------------
     # PUBLIC: Get questions for specific topics
@@ -108,16 +771,96 @@ class BulkQuestionGenerator:
 
         Returns: { topic_name: [questions] }
         """
-        bank = BulkQuestionGenerator.load_question_bank(syllabus_id)
+        # Backend only reads the requested topics where it can
+        backend = get_backend()
+        found = backend.load_bank_topics(syllabus_id, topic_names)
 
-        if not bank:
+        # Names the LLM or TopicCleaner spelled differently still
+        # match through the bank's topic map
+        missing = [t for t in topic_names if t not in found]
+        if missing:
+            # All names: the ones found exactly claim their keys
+            matched = BulkQuestionGenerator._match_bank_topics(syllabus_id, topic_names)
+            keys = {matched[t] for t in missing if t in matched}
+            questions = backend.load_bank_topics(syllabus_id, list(keys))
+            for topic in missing:
+                if matched.get(topic) in questions:
+                    found[topic] = questions[matched[topic]]
+
+        return BulkQuestionGenerator._resolve_refs(
+            {t: found[t] for t in topic_names if t in found}
+        )
+
+    # -------------------------------------------------------
+    # PUBLIC: Find questions across several banks
+    # -------------------------------------------------------
+    @staticmethod
+    def find_questions_for_topics(topic_names: list, syllabus_ids: list) -> dict:
+        """
+        Resolve each topic to whichever of syllabus_ids' banks has
+        it (earlier ids preferred) through the backend's topic
+        index — then, for topics still unresolved, through each
+        bank's topic map in turn — and read only those topics.
+
+        Returns: { topic_name: [questions] } for topics found.
+        """
+        backend = get_backend()
+        located = backend.find_bank_topics(topic_names, syllabus_ids)
+
+        by_bank = {}
+        for topic, (syllabus_id, key) in located.items():
+            by_bank.setdefault(syllabus_id, {})[topic] = key
+
+        missing = [t for t in topic_names if t not in located]
+        for syllabus_id in syllabus_ids:
+            if not missing:
+                break
+            syllabus_id = str(syllabus_id)
+            matched = BulkQuestionGenerator._match_bank_topics(syllabus_id, topic_names)
+            for topic in missing:
+                if topic in matched:
+                    by_bank.setdefault(syllabus_id, {})[topic] = matched[topic]
+            missing = [t for t in missing if t not in matched]
+
+        found = {}
+        for syllabus_id, keys in by_bank.items():
+            questions = backend.load_bank_topics(syllabus_id, list(set(keys.values())))
+            for topic, key in keys.items():
+                if key in questions:
+                    found[topic] = questions[key]
+
+        return BulkQuestionGenerator._resolve_refs(found)
+
+    # -------------------------------------------------------
+    # PRIVATE: Syllabus topic → bank key (stored topic map)
+    # -------------------------------------------------------
+    @staticmethod
+    def _match_bank_topics(syllabus_id: str, topic_names: list) -> dict:
+        """
+        { topic_name: bank key } for the names the bank has, exact
+        or fuzzy (see topic_matcher). Matches — misses included —
+        are kept in the map stored alongside the bank, so each name
+        is matched once per version of the bank and is a dict
+        lookup after that.
+        """
+        backend = get_backend()
+        mapping, token = backend.load_topic_map(syllabus_id)
+
+        if token is None:
             return {}
 
-        return {
-            topic: bank[topic]
-            for topic in topic_names
-            if topic in bank
-        }
+        new = [t for t in dict.fromkeys(topic_names) if t not in mapping]
+        if new:
+            # Keys earlier names matched exactly are taken
+            claimed = {
+                key for topic, key in mapping.items()
+                if key is not None and match_key(topic) == match_key(key)
+            }
+            mapping = dict(mapping)
+            mapping.update(match_topics(new, backend.bank_topic_keys(syllabus_id), claimed))
+            backend.save_topic_map(syllabus_id, mapping, token)
+
+        return {t: mapping[t] for t in topic_names if mapping.get(t)}
 
     # -------------------------------------------------------
     # PRIVATE: Extract topics grouped by unit number
@@ -156,13 +899,27 @@ class BulkQuestionGenerator:
             return 1
 
     # -------------------------------------------------------
-    # PRIVATE: Single bulk API call
+    # PRIVATE: One bulk API call (one chunk)
     # -------------------------------------------------------
     @staticmethod
-    def _generate_bulk(units_topics: dict, questions_per_topic: int, domain: str) -> dict:
+    async def _generate_bulk(units_topics: dict, questions_per_topic: int, domain: str,
+                             on_topic=None, tags: dict | None = None) -> dict:
         """
-        Sends ONE prompt to Groq with all topics.
-        Returns { topic_name: [question, ...] }
+        Sends ONE prompt to Groq with all topics of the chunk and
+        streams the reply; on_topic(topic, questions) runs as soon
+        as each topic's list closes.
+
+        The reply is parsed tolerantly (see json_stream): a reply
+        cut off or slightly malformed still yields every complete
+        topic, and malformed questions are dropped one by one.
+        Topic keys the LLM re-spelled are mapped back to the
+        requested names; keys matching no requested topic are
+        dropped.
+        Topics lost are reported and left out of the result, so the
+        caller retries only those.
+
+        Returns { topic_name: [question, ...] }; raises on failure
+        (after on_topic has seen the topics that did arrive).
         """
 
         # Build flat topic list preserving unit context
@@ -229,65 +986,126 @@ Topics to generate questions for:
 {json.dumps([t["topic"] for t in all_topics], indent=2)}
 """
 
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        parser = JsonObjectStream()
+        question_bank = {}
 
-        payload = {
-            "model": BulkQuestionGenerator.MODEL,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.4,
-            "max_tokens": 8000
-        }
+        replies = get_llm_client().stream(
+            prompt,
+            model=BulkQuestionGenerator.MODEL,
+            temperature=0.4,
+            # ~200 tokens per MCQ; small chunks don't reserve 8000
+            max_tokens=min(8000, 500 + 200 * questions_per_topic * len(all_topics)),
+            timeout=60,   # bulk call needs more time
+            # Don't cache a reply that was cut off or skipped topics
+            # — the retry for them would just get it back
+            cacheable=lambda reply: BulkQuestionGenerator._reply_complete(
+                reply, [t["topic"] for t in all_topics]
+            ),
+            tags=tags
+        )
 
-        try:
-            response = requests.post(
-                BulkQuestionGenerator.API_URL,
-                headers=headers,
-                json=payload,
-                timeout=60   # bulk call needs more time
-            )
+        requested = [t["topic"] for t in all_topics]
+        renamed = []
 
-            if response.status_code != 200:
-                raise Exception(f"Groq API Error: {response.text}")
+        async for text in replies:
+            for key, questions in parser.feed(text):
+                # Keyed by the requested name, whatever the LLM wrote —
+                # else a re-spelled topic counts as missing forever
+                topic = BulkQuestionGenerator._requested_topic(key, requested, question_bank)
+                if topic is None:
+                    print(f"LLM returned an unrequested topic, dropped: {key!r}")
+                    continue
+                if topic != key:
+                    renamed.append(key)
 
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
+                questions = BulkQuestionGenerator._valid_questions(questions)
+                if not questions:
+                    continue
 
-            question_bank = BulkQuestionGenerator._extract_json_object(content)
+                question_bank[topic] = questions
+                if on_topic is not None:
+                    on_topic(topic, questions)
 
-            # Normalize all answers to full option text
-            for topic, questions in question_bank.items():
-                for q in questions:
-                    q["answer"] = BulkQuestionGenerator._resolve_answer(
-                        q.get("answer", ""),
-                        q.get("options", [])
-                    )
+        lost = [t["topic"] for t in all_topics if t["topic"] not in question_bank]
+        if lost and (not parser.done or parser.dropped):
+            print(
+                f"Salvaged {len(question_bank)}/{len(all_topics)} topics from a "
+                f"{'cut-off' if not parser.done else 'malformed'} reply; lost: {lost}"
+            )
 
-            return question_bank
+        if renamed:
+            print(f"Matched {len(renamed)} re-spelled topic keys to the requested names")
 
-        except Exception as e:
-            print(f"Bulk generation failed: {e}")
-            # Return empty bank — fallback will handle per-topic
-            return {}
+        if not question_bank:
+            raise Exception("Groq returned an empty question bank")
+
+        return question_bank
 
     # -------------------------------------------------------
-    # PRIVATE: Extract JSON object from response
+    # PRIVATE: Validate parsed questions
     # -------------------------------------------------------
     @staticmethod
-    def _extract_json_object(text: str) -> dict:
-        text = re.sub(r"```json", "", text)
-        text = re.sub(r"```", "", text)
+    def _valid_questions(questions) -> list:
+        """
+        Keep well-formed MCQs (question text, 2+ options, an answer
+        that is one of the options), answers normalized to the exact
+        option text; drop the rest — a question whose answer matches
+        no option could never be answered right.
+        """
+        if not isinstance(questions, list):
+            return []
+
+        valid = []
+        for q in questions:
+            if not isinstance(q, dict) or not isinstance(q.get("question"), str):
+                continue
+
+            options = q.get("options")
+            if not isinstance(options, list) or len(options) < 2:
+                continue
+
+            options = [str(o) for o in options]
+            answer = BulkQuestionGenerator._resolve_answer(
+                str(q.get("answer", "")),
+                options
+            ).casefold()
 
-        # Find outermost { }
-        start = text.find("{")
-        end = text.rfind("}") + 1
+            # Spacing / capitalization may differ from the option
+            correct = next((o for o in options if o.strip().casefold() == answer), None)
+            if correct is None:
+                continue
 
-        if start == -1 or end == 0:
-            raise Exception("No JSON object found in response")
+            q["options"] = options
+            q["answer"] = correct
+            valid.append(q)
 
-        return json.loads(text[start:end])
+        return valid
+
+    @staticmethod
+    def _requested_topic(key: str, requested: list, delivered) -> str | None:
+        """
+        The requested topic a reply key stands for: exact, then
+        normalized / fuzzy (see topic_matcher) among the topics not
+        delivered yet. None if it matches nothing.
+        """
+        if key in requested:
+            return key
+
+        remaining = [t for t in requested if t not in delivered]
+        return match_topics([key], remaining).get(key)
+
+    @staticmethod
+    def _reply_complete(reply: str, topics: list) -> bool:
+        # A topic whose questions are all invalid is missing too
+        bank, complete = salvage_json_object(reply)
+
+        delivered = set()
+        for key, questions in bank.items():
+            topic = BulkQuestionGenerator._requested_topic(key, topics, delivered)
+            if topic is not None and BulkQuestionGenerator._valid_questions(questions):
+                delivered.add(topic)
+
+        return complete and all(t in delivered for t in topics)
 
     # -------------------------------------------------------
     # PRIVATE: Resolve answer letter → full text
@@ -303,16 +1121,9 @@ Topics to generate questions for:
         return answer
 
     # -------------------------------------------------------
-    # PRIVATE: File helpers
+    # PRIVATE: Storage helpers
     # -------------------------------------------------------
-    @staticmethod
-    def _bank_path(syllabus_id: str) -> str:
-        os.makedirs(BulkQuestionGenerator.BANK_PATH, exist_ok=True)
-        return os.path.join(BulkQuestionGenerator.BANK_PATH, f"{syllabus_id}.json")
-
     @staticmethod
     def _save_bank(syllabus_id: str, bank: dict):
-        path = BulkQuestionGenerator._bank_path(syllabus_id)
-        with open(path, "w") as f:
-            json.dump(bank, f, indent=2)
-        print(f"Question bank saved: {path} ({len(bank)} topics)")
\ No newline at end of file
+        get_backend().save_bank(syllabus_id, bank)
+        print(f"Question bank saved: {syllabus_id} ({len(bank)} topics)")
@@ -1,14 +1,19 @@
 import random
 
+from app.services.template_question_generator import TemplateQuestionGenerator
+
 class DiagnosticService:
 
-    def generate_questions(self, topics):
+    def generate_questions(self, topics, structured_syllabus=None):
         """
         Generate simple MCQs for diagnostic familiarity testing.
-        For v1 we use rule-based templates.
-        Later this can be replaced with AI generation.
+        With a structured syllabus, topics get template questions
+        built from it (TemplateQuestionGenerator); the rule-based
+        ones below cover the rest.
         """
 
+        local = TemplateQuestionGenerator.generate(structured_syllabus or [], topics)
+
         question_bank = {
             "Normalization": {
                 "question": "Which normal form removes transitive dependency?",
@@ -35,7 +40,10 @@ class DiagnosticService:
         questions = []
 
         for topic in topics:
-            if topic in question_bank:
+            if local.get(topic):
+                questions.append({"topic": topic, **local[topic][0]})
+
+            elif topic in question_bank:
                 q = question_bank[topic]
 
                 questions.append({
@@ -0,0 +1,144 @@
+import json
+import re
+
+# -------------------------------------------------------
+# INCREMENTAL / TOLERANT JSON PARSING  (LLM replies)
+#
+# Reads a (streamed) LLM reply shaped like
+#
+#   ```json
+#   { "Topic A": [...], "Topic B": [...] }
+#   ```
+#
+# and hands back each top-level member as soon as its value
+# closes, without waiting for the rest of the object. Text
+# before the first "{" (code fences, prose) is skipped.
+#
+# The same scan salvages replies that are cut off (max_tokens,
+# dropped stream) or slightly malformed: every complete member
+# is kept, and only the broken ones are lost.
+#   - truncated reply        members before the cut
+#   - missing "," between    split where a value ends and a
+#     members                new key starts
+#   - trailing commas        dropped ([1, 2,] → [1, 2])
+#   - a member that still    skipped, counted in `dropped`
+#     is not JSON
+# -------------------------------------------------------
+
+TRAILING_COMMA = re.compile(r",\s*([\]}])")
+
+
+class JsonObjectStream:
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.member_start = None
+        self.after_colon = False
+        self.value_closed = False
+        self.done = False
+        self.dropped = 0
+
+    @property
+    def complete(self) -> bool:
+        """
+        The whole container was read and every member parsed.
+        """
+        return self.done and not self.dropped
+
+    def feed(self, text: str) -> list:
+        """
+        Add the next piece of the reply. Returns the members
+        completed by it: [(key, value), ...]. A member that is
+        not valid JSON even after repair is dropped (the caller
+        sees it as missing).
+        """
+        if self.done:
+            return []
+
+        self.buffer += text
+        members = []
+
+        for i in range(self.pos, len(self.buffer)):
+            c = self.buffer[i]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    # A string closing at depth 1 is a value (not a key)
+                    if self.depth == 1 and self.after_colon:
+                        self.value_closed = True
+                continue
+
+            if self.depth == 0:
+                if c == "{":
+                    self.depth = 1
+                    self.member_start = i + 1
+                continue
+
+            if c == '"':
+                if self.depth == 1 and self.value_closed:
+                    # Missing comma: a new member starts here
+                    members.extend(self._member(i))
+                    self.member_start = i
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    members.extend(self._member(i))
+                    self.done = True
+                    break
+                if self.depth == 1:
+                    self.value_closed = True
+            elif self.depth == 1:
+                if c == ",":
+                    members.extend(self._member(i))
+                    self.member_start = i + 1
+                elif c == ":":
+                    self.after_colon = True
+
+        self.pos = len(self.buffer)
+        return members
+
+    def _member(self, end: int) -> list:
+        text = self.buffer[self.member_start:end].strip()
+        self.after_colon = False
+        self.value_closed = False
+
+        if not text or text == ",":
+            return []
+
+        for candidate in (text, TRAILING_COMMA.sub(r"\1", text).rstrip(",")):
+            try:
+                return self._parse(candidate)
+            except ValueError:
+                continue
+
+        self.dropped += 1
+        return []
+
+    @staticmethod
+    def _parse(text: str) -> list:
+        return list(json.loads("{" + text + "}").items())
+
+
+# -------------------------------------------------------
+# SALVAGE  (whole reply at once)
+# -------------------------------------------------------
+def salvage_json_object(text: str) -> tuple:
+    """
+    (dict of every complete member, whether the reply was a
+    complete, well-formed object). ({}, False) if no object.
+    """
+    parser = JsonObjectStream()
+    return dict(parser.feed(text)), parser.complete
+
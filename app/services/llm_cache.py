@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------------------------------
+# LLM RESPONSE CACHE  (SQLite, shared by all workers)
+#
+# Key = sha256 of (model, prompt, temperature, max_tokens).
+# Entries expire after ttl seconds; when the stored responses
+# exceed max_bytes, the least recently used are evicted.
+#
+# Modes (LLM_CACHE_MODE):
+#   off     never read or write
+#   on      read-through cache (default)
+#   record  always call the API, store every response
+#   replay  never call the API — a miss is an error, nothing
+#           expires (deterministic offline runs from a recording)
+# -------------------------------------------------------
+
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+MODES = ("off", "on", "record", "replay")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int | None) -> str:
+    request = json.dumps(
+        {"model": model, "prompt": prompt, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True
+    )
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+class LLMCache:
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        mode: str = LLM_CACHE_MODE,
+        ttl: int = LLM_CACHE_TTL,
+        max_bytes: int = LLM_CACHE_MAX_BYTES
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+
+        return conn
+
+    # ---------------- lookups ----------------
+    def get(self, key: str) -> str | None:
+        if self.mode in ("off", "record"):
+            return None
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        now = time.time()
+
+        if row is None or (self.mode == "on" and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        if self.mode in ("off", "replay"):
+            return
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, content, len(content.encode()), now, now)
+        )
+        self._evict(conn, now)
+
+    # ---------------- eviction ----------------
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """
+        Drop expired entries, then least recently used ones until
+        the cache is back under 90% of max_bytes (so eviction does
+        not run on every put once full).
+        """
+        if self.mode == "on":
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        evict = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= target:
+                break
+            evict.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        print(f"LLM cache: evicted {len(evict)} responses")
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
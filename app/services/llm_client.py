@@ -0,0 +1,746 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from dotenv import load_dotenv
+
+from app.services.llm_cache import LLMCache, cache_key
+from app.services.llm_usage import LLMUsageLog, get_usage_log
+
+load_dotenv()
+
+# -------------------------------------------------------
+# SHARED LLM CLIENT
+#
+# Every Groq call goes through one LLMClient per process:
+#
+#   - keep-alive pool     one httpx.AsyncClient, reused
+#   - retries             429 / 5xx / network errors, exponential
+#                         backoff with full jitter (Retry-After wins)
+#   - rate limit          token buckets for requests and tokens
+#                         per minute (our Groq quota, per process)
+#   - circuit breaker     after N failed calls in a row, fail fast
+#                         for a cooldown instead of queueing up
+#                         60 s timeouts during an outage
+#   - response cache      identical requests answered from disk
+#                         (see llm_cache: TTL, LRU size limit,
+#                         record / replay for offline runs)
+#   - streaming           stream() yields the reply as the API
+#                         sends it (server-sent events)
+#   - accounting          every call's tokens, latency, attempts,
+#                         outcome and cost go to llm_usage, tagged
+#                         with what it was for (tags=)
+#   - hedging (opt-in)    a call slower than the usual tail sends
+#                         a duplicate; the first good answer wins
+#
+# The client runs on its own event loop thread, so the pool is
+# shared by async routes (await chat), sync routes and
+# background threads (chat_sync) alike.
+#
+# GROQ_API_URL points it elsewhere, e.g. at the fake server in
+# scripts/fake_groq_server.py.
+# -------------------------------------------------------
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+
+# Groq quota for this process (0 = unlimited)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Hedged requests (off by default): once a kind of call has
+# LLM_HEDGE_MIN_SAMPLES latencies, a call still unanswered after
+# their LLM_HEDGE_PERCENTILE (at least LLM_HEDGE_MIN_DELAY s) gets
+# a duplicate request. At most LLM_HEDGE_BUDGET extra requests per
+# call on average (0.1 = +10% spend), bursts of HEDGE_BURST.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+
+HEDGE_BURST = 3
+HEDGE_WINDOW = 200
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """
+    An LLM call failed (after retries). status is the last HTTP
+    status, or None for network errors.
+    """
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMUnavailable(LLMError):
+    """
+    The circuit breaker is open — the call was not attempted.
+    """
+
+
+# -------------------------------------------------------
+# TOKEN BUCKET
+# -------------------------------------------------------
+class TokenBucket:
+    """
+    Refills per_minute tokens evenly over a minute, holding at
+    most one minute's worth. Only used on the client's loop.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost: float = 1):
+        # A single call larger than the bucket waits for a full bucket
+        cost = min(cost, self.capacity)
+
+        while True:
+            self._refill()
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return
+            await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+# -------------------------------------------------------
+# CIRCUIT BREAKER
+# -------------------------------------------------------
+class CircuitBreaker:
+    """
+    closed → open after `threshold` failed calls in a row.
+    open → half-open after `cooldown` seconds: one trial call
+    goes through; success closes, failure re-opens.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+
+        if state == "open" or (state == "half-open" and self.trial_running):
+            raise LLMUnavailable("LLM circuit breaker is open — failing fast")
+
+        if state == "half-open":
+            self.trial_running = True
+
+    def record(self, success: bool):
+        self.trial_running = False
+
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            print(f"LLM circuit breaker open for {self.cooldown}s after {self.failures} failures")
+
+
+# -------------------------------------------------------
+# REQUEST HEDGER
+# -------------------------------------------------------
+class RequestHedger:
+    """
+    Recent latencies per kind of call (purpose, streamed) — time
+    to the reply, or to its first piece when streamed — and the
+    extra-request budget: every call adds `budget` credits (at
+    most HEDGE_BURST), a hedge spends one. Only used on the
+    client's loop.
+    """
+
+    def __init__(self, enabled: bool, percentile: float, min_samples: int,
+                 min_delay: float, budget: float):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget
+        self.samples = {}
+        self.credits = 0.0
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self, kind: tuple) -> float | None:
+        """
+        Seconds to wait before hedging this call, None = don't.
+        """
+        if not self.enabled:
+            return None
+
+        samples = self.samples.get(kind)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def observe(self, kind: tuple, latency: float):
+        self.samples.setdefault(kind, deque(maxlen=HEDGE_WINDOW)).append(latency)
+
+    def start_call(self):
+        self.calls += 1
+        self.credits = min(HEDGE_BURST, self.credits + self.budget)
+
+    def try_hedge(self) -> bool:
+        if self.credits < 1:
+            return False
+        self.credits -= 1
+        self.hedges += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "delays": {
+                f"{purpose}{' (streamed)' if streamed else ''}": self.delay((purpose, streamed))
+                for purpose, streamed in self.samples
+            }
+        }
+
+
+# -------------------------------------------------------
+# CLIENT
+# -------------------------------------------------------
+class LLMClient:
+
+    def __init__(
+        self,
+        api_url: str = GROQ_API_URL,
+        api_key: str | None = GROQ_API_KEY,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_retries: int = LLM_MAX_RETRIES,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        breaker_threshold: int = LLM_BREAKER_THRESHOLD,
+        breaker_cooldown: float = LLM_BREAKER_COOLDOWN,
+        cache: LLMCache | None = None,
+        usage_log: LLMUsageLog | None = None,
+        hedger: RequestHedger | None = None
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.cache = cache if cache is not None else LLMCache()
+        self.usage_log = usage_log if usage_log is not None else get_usage_log()
+        self.hedger = hedger if hedger is not None else RequestHedger(
+            LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES,
+            LLM_HEDGE_MIN_DELAY, LLM_HEDGE_BUDGET
+        )
+
+        self._loop = None
+        self._http = None
+        self._start_lock = threading.Lock()
+
+    # ---------------- public ----------------
+    async def chat(self, prompt: str, **options) -> str:
+        """
+        Send one user prompt, return the completion text.
+
+        options: model, temperature, max_tokens, timeout (seconds),
+                 cacheable — callable(content) → bool; replies it
+                 rejects (or raises on) are returned but not cached,
+                 so a retry asks the API again
+                 tags — accounting labels: purpose, syllabus_id, user_id
+        Raises LLMError / LLMUnavailable.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._chat(prompt, **options), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    async def stream(self, prompt: str, **options):
+        """
+        Like chat(), but an async generator of reply text pieces
+        as the API streams them (one piece on a cache hit). Takes
+        the same options; the assembled reply is what gets cached.
+
+        A stream that breaks off after the first piece is not
+        retried (the caller already consumed part of it) — the
+        LLMError is raised after the pieces received.
+        """
+        loop = asyncio.get_running_loop()
+        pieces = asyncio.Queue()
+
+        def _on_delta(text: str):
+            # Runs on the client's loop thread
+            loop.call_soon_threadsafe(pieces.put_nowait, text)
+
+        future = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._chat(prompt, on_delta=_on_delta, **options), self._ensure_loop()
+        ))
+        # Queued after every piece, so it arrives last
+        future.add_done_callback(lambda _: pieces.put_nowait(None))
+
+        while True:
+            text = await pieces.get()
+            if text is None:
+                break
+            yield text
+
+        await future
+
+    def chat_sync(self, prompt: str, **options) -> str:
+        """
+        Blocking chat() for sync routes and background threads.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._chat(prompt, **options), self._ensure_loop())
+        return future.result()
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+        # Finish async generators of abandoned streams before stopping
+        asyncio.run_coroutine_threadsafe(self._loop.shutdown_asyncgens(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._http = None
+
+    # ---------------- loop thread ----------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _client(self) -> httpx.AsyncClient:
+        # Created on the loop thread, on first use
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60
+                )
+            )
+        return self._http
+
+    # ---------------- one call ----------------
+    async def _chat(
+        self,
+        prompt: str,
+        model: str = DEFAULT_MODEL,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        timeout: float = 60,
+        cacheable=None,
+        on_delta=None,
+        tags: dict | None = None
+    ) -> str:
+        started = time.monotonic()
+        streamed = on_delta is not None
+        # Requests sent, and tokens of the ones whose usage never came
+        call = {"attempts": 0, "lost_prompt_tokens": 0, "lost_completion_tokens": 0}
+
+        def _account(outcome: str, content=None, usage=None, error=None):
+            self.usage_log.record(
+                model, prompt, content, usage,
+                latency=time.monotonic() - started,
+                attempts=call["attempts"],
+                outcome=outcome,
+                streamed=streamed,
+                error=error,
+                tags=tags,
+                lost={
+                    "prompt_tokens": call["lost_prompt_tokens"],
+                    "completion_tokens": call["lost_completion_tokens"]
+                }
+            )
+
+        key = cache_key(model, prompt, temperature, max_tokens)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached)
+            _account("cached", cached)
+            return cached
+
+        if self.cache.mode == "replay":
+            error = LLMError(f"No recorded response for this request (replay mode, key {key[:12]})")
+            _account("unavailable", error=str(error))
+            raise error
+
+        try:
+            self.breaker.before_call()
+        except LLMUnavailable as e:
+            _account("unavailable", error=str(e))
+            raise
+
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        try:
+            data = await self._post_hedged(
+                payload,
+                timeout,
+                # Rough prompt size (4 chars/token) + the reply budget
+                estimated_tokens=len(prompt) // 4 + (max_tokens or 1000),
+                on_delta=on_delta,
+                call=call,
+                kind=((tags or {}).get("purpose") or "default", streamed)
+            )
+            content = data["choices"][0]["message"]["content"]
+        except LLMError as e:
+            # A bad request is our bug, not an outage
+            self.breaker.record(success=e.status is not None and e.status < 500 and e.status != 429)
+            _account("error", error=str(e))
+            raise
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            self.breaker.record(success=True)
+            _account("error", error=f"Malformed LLM response: {e}")
+            raise LLMError(f"Malformed LLM response: {e}")
+
+        self.breaker.record(success=True)
+        _account("ok", content, data.get("usage"))
+
+        if self._cacheable(cacheable, content):
+            self.cache.put(key, model, content)
+
+        return content
+
+    @staticmethod
+    def _cacheable(check, content: str) -> bool:
+        if check is None:
+            return True
+        try:
+            return bool(check(content))
+        except Exception:
+            return False
+
+    async def _post_hedged(self, payload: dict, timeout: float, estimated_tokens: int,
+                           on_delta, call: dict, kind: tuple) -> dict:
+        """
+        _post_with_retries, hedged: if no answer (no first piece,
+        when streamed) arrives within the hedger's delay and the
+        budget allows, a duplicate request races the first. The
+        first good answer wins and the other is cancelled; a
+        streamed call is decided by its first piece, so only one
+        request's pieces reach on_delta. Both requests count as
+        attempts, and the loser's tokens as lost (see _count_lost).
+        """
+        hedger = self.hedger
+        hedger.start_call()
+        delay = hedger.delay(kind)
+        started = time.monotonic()
+        first_piece = None
+        winner = None
+        requests = []
+
+        def _emitter(n: int):
+            def _emit(text: str):
+                nonlocal first_piece, winner
+                if winner is None:
+                    winner = n
+                    first_piece = time.monotonic() - started
+                    for i, other in enumerate(requests):
+                        if i != n:
+                            other.cancel()
+                if winner == n:
+                    on_delta(text)
+            return _emit
+
+        def _start(n: int) -> asyncio.Future:
+            return asyncio.ensure_future(self._post_with_retries(
+                payload, timeout, estimated_tokens,
+                on_delta=_emitter(n) if on_delta is not None else None,
+                call=call
+            ))
+
+        requests.append(_start(0))
+
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(requests, timeout=delay)
+                if not done and winner is None and hedger.try_hedge():
+                    print(f"LLM call unanswered after {delay:.1f}s, sending a hedged request")
+                    requests.append(_start(1))
+
+            pending = set(requests)
+            error = None
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for request in done:
+                    if request.cancelled():
+                        continue
+                    if request.exception() is not None:
+                        error = error or request.exception()
+                        continue
+
+                    if request is not requests[0]:
+                        hedger.hedge_wins += 1
+
+                    # Both answered at once: the other one is billed too
+                    for other in done:
+                        if other is not request and not other.cancelled() \
+                                and other.exception() is None:
+                            self._count_lost(call, payload, other.result())
+
+                    latency = first_piece if first_piece is not None else time.monotonic() - started
+                    hedger.observe(kind, latency)
+                    return request.result()
+
+            raise error
+        finally:
+            # The loser — or both, if this call itself was cancelled.
+            # Waited for, so its tokens are counted before accounting.
+            for request in requests:
+                request.cancel()
+            await asyncio.gather(*requests, return_exceptions=True)
+
+    async def _post_with_retries(self, payload: dict, timeout: float, estimated_tokens: int,
+                                 on_delta=None, call: dict | None = None) -> dict:
+        """
+        POST with retries; call["attempts"] counts the requests
+        actually sent, call["lost_*_tokens"] what the ones that
+        never returned usage consumed (for accounting).
+        """
+        call = call if call is not None else {}
+        call.setdefault("attempts", 0)
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        streamed = False
+        received = 0
+        sent = False
+
+        def _emit(text: str):
+            nonlocal streamed, received
+            streamed = True
+            received += len(text)
+            on_delta(text)
+
+        async def _trace(event: str, info: dict):
+            # httpcore's trace hook: once the body is out the API may
+            # process (and bill) the prompt — not before
+            nonlocal sent
+            if event.endswith("send_request_body.complete"):
+                sent = True
+
+        extensions = {"trace": _trace}
+
+        if on_delta is not None:
+            payload = dict(payload, stream=True)
+
+        for attempt in range(self.max_retries + 1):
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire()
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire(estimated_tokens)
+
+            retry_after = None
+            call["attempts"] += 1
+            received = 0
+            sent = False
+
+            try:
+                if on_delta is None:
+                    response = await self._client().post(
+                        self.api_url, headers=headers, json=payload, timeout=timeout,
+                        extensions=extensions
+                    )
+                    if response.status_code == 200:
+                        return response.json()
+                else:
+                    async with self._client().stream(
+                        "POST", self.api_url, headers=headers, json=payload, timeout=timeout,
+                        extensions=extensions
+                    ) as response:
+                        if response.status_code == 200:
+                            return await self._read_stream(response, _emit)
+                        await response.aread()
+            except httpx.HTTPError as e:
+                # Timed out or broke off after sending: the prompt (and
+                # whatever streamed) was still processed. Never connected
+                # (ConnectError / ConnectTimeout / PoolTimeout): nothing was
+                if sent:
+                    self._count_lost(call, payload, received_chars=received)
+                if streamed:
+                    raise LLMError(f"LLM stream broke off: {e!r}")
+                error = LLMError(f"LLM request failed: {e!r}")
+            except BaseException:
+                # Cancelled (a hedge that lost the race) or malformed —
+                # billed only if the request had gone out
+                if sent:
+                    self._count_lost(call, payload, received_chars=received)
+                raise
+            else:
+                error = LLMError(
+                    f"Groq API Error {response.status_code}: {response.text[:500]}",
+                    status=response.status_code
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get("retry-after")
+
+            if attempt == self.max_retries:
+                raise error
+
+            delay = self._backoff(attempt, retry_after)
+            print(f"LLM call failed ({error}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _count_lost(call: dict, payload: dict, result: dict | None = None,
+                    received_chars: int = 0):
+        """
+        Add a request whose usage was never recorded to call's lost
+        tokens: the reply's usage if it has one, else estimated at
+        4 chars/token — the whole prompt, plus what streamed in.
+        Requests the API rejected with an error status, and ones
+        that were never sent (no connection, cancelled first), never
+        get here; they are not billed.
+        """
+        usage = (result or {}).get("usage") or {}
+        prompt_chars = sum(len(m.get("content") or "") for m in payload["messages"])
+
+        if "prompt_tokens" in usage:
+            call["lost_prompt_tokens"] = call.get("lost_prompt_tokens", 0) + usage["prompt_tokens"]
+            call["lost_completion_tokens"] = call.get("lost_completion_tokens", 0) + \
+                usage.get("completion_tokens", 0)
+            return
+
+        if result is not None:
+            try:
+                received_chars = len(result["choices"][0]["message"]["content"] or "")
+            except (KeyError, IndexError, TypeError):
+                pass
+
+        call["lost_prompt_tokens"] = call.get("lost_prompt_tokens", 0) + prompt_chars // 4
+        call["lost_completion_tokens"] = call.get("lost_completion_tokens", 0) + received_chars // 4
+
+    @staticmethod
+    async def _read_stream(response: httpx.Response, on_delta) -> dict:
+        """
+        Server-sent events: one `data: {chunk}` line per piece, then
+        `data: [DONE]`. Returns the reply in the non-streaming shape,
+        with the token usage the last chunk carries (Groq sends it
+        as x_groq.usage, OpenAI-style APIs as usage).
+        """
+        parts = []
+        usage = None
+        lines = response.aiter_lines()
+
+        try:
+            async for line in lines:
+                if not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+
+                choices = chunk.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    parts.append(text)
+                    on_delta(text)
+        finally:
+            # Closed here, not by the loop later — a hedged request
+            # that lost the race is cancelled mid-stream
+            await lines.aclose()
+
+        return {"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: str | None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_RETRY_MAX)
+            except ValueError:
+                pass
+
+        # Full jitter: spreads retries from many callers apart
+        return random.uniform(0, min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt))
+
+
+# -------------------------------------------------------
+# PROCESS-WIDE CLIENT
+# -------------------------------------------------------
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def set_llm_client(client: LLMClient):
+    """
+    Swap the process-wide client (fake server, scripts).
+    """
+    global _client
+
+    with _client_lock:
+        _client = client
@@ -0,0 +1,322 @@
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------------------------------
+# LLM CALL ACCOUNTING  (SQLite, shared by all workers)
+#
+# LLMClient records one row per call: model, purpose, the
+# syllabus / user it was made for, prompt size, prompt and
+# completion tokens (the API's `usage`, or estimated at 4
+# chars/token when a reply has none — hedges cancelled, streams
+# broken off and timeouts included), latency, requests sent
+# (retries and hedged duplicates included), outcome and cost.
+# Cache hits are recorded too (no tokens), so a regeneration
+# loop shows up even when the cache absorbs it.
+#
+# summary() aggregates per day, syllabus, model or purpose
+# (user_summary per user); per day it also gives the busiest
+# minute's requests and tokens — what the Groq per-minute
+# limits are checked against. scripts/llm_usage_report.py
+# prints the tables.
+#
+#   outcome   ok | cached | error | unavailable (breaker open,
+#             or a replay-mode miss — no API call made)
+# -------------------------------------------------------
+
+LLM_USAGE_ENABLED = os.getenv("LLM_USAGE_ENABLED", "1") == "1"
+LLM_USAGE_PATH = os.getenv("LLM_USAGE_PATH", "data/llm_usage.sqlite3")
+
+# USD per million tokens (prompt, completion) — Groq list prices.
+# Models not listed are recorded with cost 0.
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+# Per-user totals come from user_summary (bank builds carry no user)
+GROUPS = ("day", "syllabus_id", "model", "purpose")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id                INTEGER PRIMARY KEY,
+    created_at        REAL NOT NULL,
+    day               TEXT NOT NULL,
+    model             TEXT NOT NULL,
+    purpose           TEXT,
+    syllabus_id       TEXT,
+    user_id           TEXT,
+    prompt_chars      INTEGER NOT NULL,
+    prompt_tokens     INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    estimated         INTEGER NOT NULL,
+    latency_ms        INTEGER NOT NULL,
+    attempts          INTEGER NOT NULL,
+    streamed          INTEGER NOT NULL,
+    outcome           TEXT NOT NULL,
+    error             TEXT,
+    cost              REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS calls_day ON calls (day);
+CREATE INDEX IF NOT EXISTS calls_syllabus ON calls (syllabus_id);
+CREATE INDEX IF NOT EXISTS calls_user ON calls (user_id);
+"""
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0, 0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class LLMUsageLog:
+
+    def __init__(self, path: str = LLM_USAGE_PATH, enabled: bool = LLM_USAGE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+
+        return conn
+
+    # ---------------- writes ----------------
+    def record(
+        self,
+        model: str,
+        prompt: str,
+        content: str | None,
+        usage: dict | None,
+        latency: float,
+        attempts: int,
+        outcome: str,
+        streamed: bool = False,
+        error: str | None = None,
+        tags: dict | None = None,
+        lost: dict | None = None
+    ):
+        """
+        One finished call. usage is the API's usage dict (None on
+        cache hits / failures); tags: purpose, syllabus_id, user_id.
+        lost: prompt / completion tokens of requests that were sent
+        but whose usage never came back (a hedge that lost the race,
+        a stream that broke off, a timeout) — billed all the same.
+        Accounting must never break the call, so errors are logged.
+        """
+        if not self.enabled:
+            return
+
+        tags = tags or {}
+        usage = usage or {}
+        lost = lost or {}
+
+        # Only the answer that was used carries usage; cache hits and
+        # breaker rejections never reach the API
+        if outcome != "ok":
+            prompt_tokens = completion_tokens = 0
+            estimated = False
+        else:
+            estimated = "prompt_tokens" not in usage
+            prompt_tokens = usage.get("prompt_tokens", len(prompt) // 4)
+            completion_tokens = usage.get("completion_tokens", len(content or "") // 4)
+
+        if lost.get("prompt_tokens") or lost.get("completion_tokens"):
+            prompt_tokens += lost.get("prompt_tokens", 0)
+            completion_tokens += lost.get("completion_tokens", 0)
+            estimated = True
+
+        now = time.time()
+
+        try:
+            self._conn().execute(
+                "INSERT INTO calls (created_at, day, model, purpose, syllabus_id, user_id, "
+                "prompt_chars, prompt_tokens, completion_tokens, estimated, latency_ms, "
+                "attempts, streamed, outcome, error, cost) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    now, time.strftime("%Y-%m-%d", time.gmtime(now)), model,
+                    tags.get("purpose"), tags.get("syllabus_id"), tags.get("user_id"),
+                    len(prompt), prompt_tokens, completion_tokens, int(estimated),
+                    int(latency * 1000), attempts, int(streamed), outcome,
+                    (error or "")[:500] or None,
+                    call_cost(model, prompt_tokens, completion_tokens)
+                )
+            )
+        except sqlite3.Error as e:
+            print(f"LLM usage not recorded: {e}")
+
+    # ---------------- aggregates ----------------
+    def summary(self, group_by: str = "day", since: str | None = None,
+                syllabus_ids: list | None = None, user_id: str | None = None) -> list:
+        """
+        One dict per group (newest day / most calls first):
+        calls, failed, cached, retries, prompt / completion tokens,
+        cost, avg / max latency (API calls only); per day also
+        peak_rpm / peak_tpm (busiest minute).
+
+        since: first day included (YYYY-MM-DD). syllabus_ids /
+        user_id: only calls made for those syllabuses or that user.
+        """
+        if group_by not in GROUPS:
+            raise ValueError(f"Unknown group: {group_by}")
+
+        where, params = self._filters(since, syllabus_ids, user_id)
+
+        rows = self._conn().execute(
+            f"SELECT {group_by}, COUNT(*), "
+            "SUM(outcome IN ('error', 'unavailable')), "
+            "SUM(outcome = 'cached'), "
+            "SUM(MAX(attempts - 1, 0)), "
+            "SUM(prompt_tokens), SUM(completion_tokens), SUM(cost), "
+            "AVG(CASE WHEN attempts > 0 THEN latency_ms END), "
+            "MAX(CASE WHEN attempts > 0 THEN latency_ms END) "
+            f"FROM calls {where} GROUP BY {group_by} "
+            f"ORDER BY {'day DESC' if group_by == 'day' else 'COUNT(*) DESC'}",
+            params
+        ).fetchall()
+
+        summary = [
+            {
+                group_by: key,
+                "calls": calls,
+                "failed": failed,
+                "cached": cached,
+                "retries": retries,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost": round(cost, 6),
+                "avg_latency_ms": round(avg_latency) if avg_latency is not None else None,
+                "max_latency_ms": max_latency
+            }
+            for key, calls, failed, cached, retries, prompt_tokens, completion_tokens,
+                cost, avg_latency, max_latency in rows
+        ]
+
+        if group_by == "day":
+            peaks = self._minute_peaks(where, params)
+            for row in summary:
+                row["peak_rpm"], row["peak_tpm"] = peaks.get(row["day"], (0, 0))
+
+        return summary
+
+    def _minute_peaks(self, where: str, params: list) -> dict:
+        """
+        { day: (most API requests in one minute, most tokens) }.
+        Retries count as requests; cache hits and breaker
+        rejections never reach Groq.
+        """
+        api_calls = f"{where} {'AND' if where else 'WHERE'} attempts > 0"
+        rows = self._conn().execute(
+            "SELECT day, MAX(requests), MAX(tokens) FROM ("
+            "  SELECT day, SUM(attempts) AS requests, "
+            "         SUM(prompt_tokens + completion_tokens) AS tokens "
+            f"  FROM calls {api_calls} "
+            "  GROUP BY day, CAST(created_at / 60 AS INTEGER)"
+            ") GROUP BY day",
+            params
+        ).fetchall()
+        return {day: (requests, tokens) for day, requests, tokens in rows}
+
+    @staticmethod
+    def _filters(since: str | None, syllabus_ids: list | None, user_id: str | None) -> tuple:
+        clauses, params = [], []
+
+        if since:
+            clauses.append("day >= ?")
+            params.append(since)
+
+        owned = []
+        if syllabus_ids:
+            owned.append(f"syllabus_id IN ({','.join('?' for _ in syllabus_ids)})")
+            params.extend(syllabus_ids)
+        if user_id:
+            owned.append("user_id = ?")
+            params.append(user_id)
+        if syllabus_ids is not None or user_id:
+            clauses.append(f"({' OR '.join(owned) or '0'})")
+
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def busy_syllabuses(self, min_calls: int, since: str | None = None) -> list:
+        """
+        (day, syllabus_id, calls, cost) for every syllabus with at
+        least min_calls calls in one day — a bank that keeps failing
+        and retrying, or a page re-triggering generation, shows up here.
+        """
+        where, params = self._filters(since, None, None)
+        where = f"{where} {'AND' if where else 'WHERE'} syllabus_id IS NOT NULL"
+
+        return self._conn().execute(
+            "SELECT day, syllabus_id, COUNT(*), ROUND(SUM(cost), 6) "
+            f"FROM calls {where} GROUP BY day, syllabus_id HAVING COUNT(*) >= ? "
+            "ORDER BY day DESC, COUNT(*) DESC",
+            [*params, min_calls]
+        ).fetchall()
+
+    def user_summary(self, owners: dict, since: str | None = None) -> list:
+        """
+        Per-user totals. Bank builds are tagged with the syllabus
+        only, so rows without a user_id are credited to the owner
+        of their syllabus — owners: { syllabus_id: user_id }.
+        """
+        where, params = self._filters(since, None, None)
+
+        rows = self._conn().execute(
+            "SELECT syllabus_id, user_id, COUNT(*), "
+            "SUM(outcome IN ('error', 'unavailable')), SUM(outcome = 'cached'), "
+            "SUM(prompt_tokens), SUM(completion_tokens), SUM(cost) "
+            f"FROM calls {where} GROUP BY syllabus_id, user_id",
+            params
+        ).fetchall()
+
+        users = {}
+        for syllabus_id, user_id, calls, failed, cached, prompt_tokens, completion_tokens, cost in rows:
+            user = user_id or owners.get(syllabus_id)
+            totals = users.setdefault(user, {
+                "user_id": user, "calls": 0, "failed": 0, "cached": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0
+            })
+            totals["calls"] += calls
+            totals["failed"] += failed
+            totals["cached"] += cached
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost"] += cost
+
+        for totals in users.values():
+            totals["cost"] = round(totals["cost"], 6)
+
+        return sorted(users.values(), key=lambda t: -t["calls"])
+
+
+# -------------------------------------------------------
+# PROCESS-WIDE LOG
+# -------------------------------------------------------
+_usage_log = None
+_usage_lock = threading.Lock()
+
+
+def get_usage_log() -> LLMUsageLog:
+    global _usage_log
+
+    with _usage_lock:
+        if _usage_log is None:
+            _usage_log = LLMUsageLog()
+        return _usage_log
@@ -1,11 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 
-from app.storage.learner_store import (
-    get_learner_state,
-    create_learner_state,
-    save_learner_state
-)
+from app.storage.learner_store import modify_learner_state
 from app.storage.plan_store import save_plan
 
 from app.core.learner_initializer import initialize_learner_state
@@ -89,65 +85,69 @@ def build_adaptive_plan(
     # -------------------------------------------------
     # 2️⃣ Load Existing Learner State
     #    This already contains familiarity scores from
-    #    any familiarity tests the user has taken
+    #    any familiarity tests the user has taken.
+    #    Merged and saved as a compare-and-swap update so a
+    #    concurrent test submit for this user is not lost.
     # -------------------------------------------------
-    learner_state = get_learner_state(user_id_str)
-
-    if learner_state is None:
-
-        # First time — initialize with familiarity = 0.0 for all topics
-        topic_states_init = initialize_learner_state(topics)
-
-        learner_state = {
-            "topic_states": {
-                topic_id: {
-                    "familiarity": state.familiarity,
-                    "confidence": state.confidence,
-                    "retention": 1.0,
-                    "attempts": state.attempts,
-                    "last_studied": None,
-                    "revision_due": False,
-                    "complexity": next(
-                        (t["complexity"] for t in topics if t["topic"] == topic_id),
-                        "Medium"
-                    )
-                }
-                for topic_id, state in topic_states_init.items()
-            },
-            "learning_speed": 1.0,
-            "consistency": 1.0,
-            "history": []
-        }
-
-        create_learner_state(user_id_str, learner_state)
-
-    else:
-        # ⭐ FIX: Ensure every topic in the syllabus exists in learner state.
-        # New topics (not yet tested) get familiarity=0.0.
-        # Already-tested topics KEEP their existing familiarity scores.
-        topic_states = learner_state.setdefault("topic_states", {})
-
-        for t in topics:
-            topic_name = t["topic"]
-            if topic_name not in topic_states:
-                # Topic not yet tested — add with defaults
-                topic_states[topic_name] = {
-                    "familiarity": 0.0,
-                    "confidence": 0.0,
-                    "retention": 1.0,
-                    "attempts": 0,
-                    "last_studied": None,
-                    "revision_due": False,
-                    "complexity": t["complexity"]
-                }
-
-        # Ensure top-level keys exist
-        learner_state.setdefault("learning_speed", 1.0)
-        learner_state.setdefault("consistency", 1.0)
-        learner_state.setdefault("history", [])
-
-        # Save merged state back
-        save_learner_state(user_id_str, learner_state)
+    def _merge_syllabus_topics(learner_state):
+        if learner_state is None:
+
+            # First time — initialize with familiarity = 0.0 for all topics
+            topic_states_init = initialize_learner_state(topics)
+
+            learner_state = {
+                "topic_states": {
+                    topic_id: {
+                        "familiarity": state.familiarity,
+                        "confidence": state.confidence,
+                        "retention": 1.0,
+                        "attempts": state.attempts,
+                        "last_studied": None,
+                        "revision_due": False,
+                        "complexity": next(
+                            (t["complexity"] for t in topics if t["topic"] == topic_id),
+                            "Medium"
+                        )
+                    }
+                    for topic_id, state in topic_states_init.items()
+                },
+                "learning_speed": 1.0,
+                "consistency": 1.0,
+                "history": []
+            }
+
+            return learner_state
+
+        else:
+            # ⭐ FIX: Ensure every topic in the syllabus exists in learner state.
+            # New topics (not yet tested) get familiarity=0.0.
+            # Already-tested topics KEEP their existing familiarity scores.
+            topic_states = learner_state.setdefault("topic_states", {})
+
+            for t in topics:
+                topic_name = t["topic"]
+                if topic_name not in topic_states:
+                    # Topic not yet tested — add with defaults
+                    topic_states[topic_name] = {
+                        "familiarity": 0.0,
+                        "confidence": 0.0,
+                        "retention": 1.0,
+                        "attempts": 0,
+                        "last_studied": None,
+                        "revision_due": False,
+                        "complexity": t["complexity"]
+                    }
+
+            # Ensure top-level keys exist
+            learner_state.setdefault("learning_speed", 1.0)
+            learner_state.setdefault("consistency", 1.0)
+            learner_state.setdefault("history", [])
+
+            return learner_state
+
+    learner_state = modify_learner_state(
+        user_id_str, _merge_syllabus_topics, event="sync_syllabus_topics"
+    )
 
     # -------------------------------------------------
     # 3️⃣ Apply Retention Decay BEFORE Planning
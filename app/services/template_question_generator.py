@@ -0,0 +1,210 @@
+import hashlib
+import random
+
+from app.services.topic_matcher import match_key
+
+# -------------------------------------------------------
+# TEMPLATE QUESTIONS  (offline — no LLM call)
+#
+# Builds MCQs from the structured syllabus itself, so a test
+# can be served at once while the bank is still being built,
+# or when the LLM is slow, rate-limited or down. Each topic
+# gets questions about where it sits in the syllabus:
+#
+#   unit      "Which unit covers 'Deadlocks'?"
+#             → its unit's title, other units' titles
+#   sibling   "Which topic is taught alongside 'Deadlocks'?"
+#             → a topic of the same unit, topics of other units
+#   outsider  "Which topic is NOT in the same unit as 'Deadlocks'?"
+#             → a topic of another unit, the unit's own topics
+#   subtopic  "Which of these is a subtopic of 'Deadlocks'?"
+#             → one of its subtopics, other units' subtopics
+#
+# Distractors come from other units, so no option is also
+# right. A topic no template fits (too few units or siblings)
+# gets no question instead of a guessable placeholder — a
+# placeholder's obvious answer would pass as familiarity.
+#
+# Choices are seeded by the topic name, so reloading a test
+# shows the same questions and option order.
+# -------------------------------------------------------
+
+OPTIONS_PER_QUESTION = 4
+MIN_OPTIONS = 3
+
+
+class TemplateQuestionGenerator:
+
+    @staticmethod
+    def generate(structured_syllabus: list, topic_names: list,
+                 per_topic: int = 1) -> dict:
+        """
+        { topic_name: [ {question, options, answer}, ... ] } for
+        the topics at least one template fits. Topics not in the
+        syllabus are looked up by match_key (renamed topics).
+        """
+        units = TemplateQuestionGenerator._index(structured_syllabus)
+        by_key = {
+            match_key(topic["name"]): (unit, topic)
+            for unit in units
+            for topic in unit["topics"]
+        }
+
+        questions = {}
+        for name in topic_names:
+            found = by_key.get(match_key(name))
+            if not found:
+                continue
+
+            unit, topic = found
+            rng = random.Random(
+                hashlib.md5(match_key(name).encode("utf-8")).hexdigest()
+            )
+
+            templates = list(TEMPLATES)
+            rng.shuffle(templates)
+
+            built = []
+            for template in templates:
+                if len(built) >= per_topic:
+                    break
+                question = template(name, topic, unit, units, rng)
+                if question:
+                    built.append(question)
+
+            if built:
+                questions[name] = built
+
+        return questions
+
+    # -------------------------------------------------------
+    # SYLLABUS INDEX
+    # -------------------------------------------------------
+    @staticmethod
+    def _index(structured_syllabus: list) -> list:
+        """
+        Units as {title, topics: [{name, subtopics}]}, with
+        blank names dropped and subtopics as plain strings.
+        """
+        units = []
+        for position, unit in enumerate(structured_syllabus or [], start=1):
+            number = unit.get("unit_number") or position
+            topics = []
+
+            for topic in unit.get("topics", []):
+                name = str(topic.get("name") or "").strip()
+                if not name:
+                    continue
+
+                subtopics = []
+                for sub in topic.get("subtopics") or []:
+                    if isinstance(sub, dict):
+                        sub = sub.get("name") or sub.get("title")
+                    if sub and str(sub).strip():
+                        subtopics.append(str(sub).strip())
+
+                topics.append({"name": name, "subtopics": subtopics})
+
+            if topics:
+                units.append({
+                    "title": str(unit.get("title") or "").strip() or f"Unit {number}",
+                    "topics": topics
+                })
+
+        return units
+
+
+# -------------------------------------------------------
+# TEMPLATES  (name, topic, unit, units, rng) → question | None
+# -------------------------------------------------------
+def _question(text: str, answer: str, pool: list, rng) -> dict | None:
+    """
+    The answer plus up to three distinct distractors from pool,
+    shuffled. None if fewer than MIN_OPTIONS options remain.
+    """
+    seen = {match_key(answer)}
+    distractors = []
+
+    for option in pool:
+        key = match_key(option)
+        if key not in seen:
+            seen.add(key)
+            distractors.append(option)
+
+    if len(distractors) + 1 < MIN_OPTIONS:
+        return None
+
+    options = [answer] + rng.sample(
+        distractors, min(len(distractors), OPTIONS_PER_QUESTION - 1)
+    )
+    rng.shuffle(options)
+
+    return {"question": text, "options": options, "answer": answer}
+
+
+def _other_units(unit: dict, units: list) -> list:
+    return [u for u in units if u is not unit]
+
+
+def _unit_template(name, topic, unit, units, rng):
+    others = [u["title"] for u in _other_units(unit, units)]
+    return _question(
+        f"Which unit of this syllabus covers '{name}'?",
+        unit["title"], others, rng
+    )
+
+
+def _sibling_template(name, topic, unit, units, rng):
+    siblings = [t["name"] for t in unit["topics"] if t is not topic]
+    if not siblings:
+        return None
+
+    outsiders = [
+        t["name"] for u in _other_units(unit, units) for t in u["topics"]
+    ]
+    return _question(
+        f"Which of these topics is taught alongside '{name}' in {unit['title']}?",
+        rng.choice(siblings), outsiders, rng
+    )
+
+
+def _outsider_template(name, topic, unit, units, rng):
+    outsiders = [
+        t["name"] for u in _other_units(unit, units) for t in u["topics"]
+    ]
+    if not outsiders:
+        return None
+
+    siblings = [t["name"] for t in unit["topics"] if t is not topic]
+    return _question(
+        f"Which of these topics is NOT covered in the same unit as '{name}'?",
+        rng.choice(outsiders), siblings, rng
+    )
+
+
+def _subtopic_template(name, topic, unit, units, rng):
+    if not topic["subtopics"]:
+        return None
+
+    # Other units' subtopics first, their topic names if too few
+    pool = [
+        s for u in _other_units(unit, units) for t in u["topics"]
+        for s in t["subtopics"]
+    ]
+    if len(pool) < OPTIONS_PER_QUESTION - 1:
+        pool += [
+            t["name"] for u in _other_units(unit, units) for t in u["topics"]
+        ]
+
+    return _question(
+        f"Which of the following is a subtopic of '{name}'?",
+        rng.choice(topic["subtopics"]), pool, rng
+    )
+
+
+TEMPLATES = (
+    _subtopic_template,
+    _sibling_template,
+    _outsider_template,
+    _unit_template,
+)
@@ -1,10 +1,19 @@
 import os
 import json
-import requests
+import asyncio
 from dotenv import load_dotenv
 
+from app.services.json_stream import salvage_json_object
+from app.services.llm_client import get_llm_client
+from app.services.topic_name_cache import get_topic_name_cache
+
 load_dotenv()
 
+# Names are cleaned one LLM call per unit chunk of at most
+# this many topics, this many calls at a time
+TOPIC_CLEAN_CHUNK_TOPICS = int(os.getenv("TOPIC_CLEAN_CHUNK_TOPICS", "25"))
+TOPIC_CLEAN_CONCURRENCY = int(os.getenv("TOPIC_CLEAN_CONCURRENCY", "4"))
+
 
 # -------------------------------------------------------
 # GENERIC WORD FILTER
@@ -76,248 +85,273 @@ def _is_generic(name: str) -> bool:
 
 
 class TopicCleaner:
+    """
+    Cleans the wording of extracted topic names with the LLM.
 
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    Every topic is sent with an id ({"7": "Frame work"}) and the
+    reply is keyed by the same ids, so a name the model splits
+    ("7": ["A", "B"]), drops or cannot parse only affects that
+    topic — never the ones after it.
 
-    API_URL = "https://api.groq.com/openai/v1/chat/completions"
+    Names are cleaned per unit, in chunks of at most
+    TOPIC_CLEAN_CHUNK_TOPICS run concurrently, and each raw
+    name's result is cached (topic_name_cache): names cleaned
+    before cost no LLM call.
+    """
 
     MODEL = "llama-3.1-8b-instant"
 
     @staticmethod
-    def clean_topics(structured_syllabus):
-
-        print("Calling Groq API for topic cleaning...")
+    def clean_topics(structured_syllabus, tags: dict | None = None):
+        """
+        Clean every topic name in place and return the syllabus.
+        tags: syllabus_id / user_id the LLM calls are accounted to.
+        """
+        cache = get_topic_name_cache()
 
         # --------------------------------
-        # Extract ONLY topic names
+        # Ids = position in the syllabus
         # --------------------------------
-        topic_names = []
+        raw_names = [
+            topic["name"]
+            for unit in structured_syllabus
+            for topic in unit["topics"]
+        ]
 
+        known = cache.get_many(raw_names, TopicCleaner.MODEL)
+        cleaned = {i: known[name] for i, name in enumerate(raw_names) if name in known}
+
+        chunks = []
+        topic_id = 0
         for unit in structured_syllabus:
+            pending = {}
             for topic in unit["topics"]:
-                topic_names.append(topic["name"])
+                if topic_id not in cleaned:
+                    pending[topic_id] = topic["name"]
+                topic_id += 1
 
-        # --------------------------------
-        # Prompt
-        # --------------------------------
+            ids = list(pending)
+            for start in range(0, len(ids), TOPIC_CLEAN_CHUNK_TOPICS or 1):
+                chunks.append({i: pending[i] for i in ids[start:start + TOPIC_CLEAN_CHUNK_TOPICS]})
+
+        print(
+            f"Topic cleaning: {len(raw_names)} topics, {len(cleaned)} cached, "
+            f"{len(chunks)} LLM calls"
+        )
+
+        if chunks:
+            results = asyncio.run(TopicCleaner._clean_chunks(chunks, tags))
+
+            fresh = {}
+            for chunk, result in zip(chunks, results):
+                for i, names in result.items():
+                    cleaned[i] = names
+                    fresh[chunk[i]] = names
+
+            cache.put_many(fresh, TopicCleaner.MODEL)
+
+        TopicCleaner._write_back(structured_syllabus, cleaned)
+        return structured_syllabus
+
+    # -------------------------------------------------------
+    # PRIVATE: LLM calls
+    # -------------------------------------------------------
+    @staticmethod
+    async def _clean_chunks(chunks: list, tags: dict | None) -> list:
+        """
+        One result per chunk, in order ({} for a failed call —
+        its topics keep their names).
+        """
+        semaphore = asyncio.Semaphore(TOPIC_CLEAN_CONCURRENCY)
+
+        async def _one(chunk: dict) -> dict:
+            async with semaphore:
+                try:
+                    return await TopicCleaner._clean_chunk(chunk, tags)
+                except Exception as e:
+                    print(f"Topic cleaning failed for {len(chunk)} topics, keeping names: {e}")
+                    return {}
+
+        return await asyncio.gather(*(_one(chunk) for chunk in chunks))
+
+    @staticmethod
+    async def _clean_chunk(chunk: dict, tags: dict | None) -> dict:
+        """
+        { id: [cleaned name, ...] } for the chunk's topics the
+        reply covered. Unknown ids and malformed entries are
+        ignored; a reply cut off part-way keeps the ids before
+        the cut.
+        """
         prompt = f"""
 You are cleaning syllabus topic names extracted from a PDF.
 
 The extraction may contain:
 - broken words
-- duplicates
 - meaningless words like "definition"
 - poor capitalization
 - merged topics
 
-Clean and normalize the topic names.
-
-Rules:
-- Keep the meaning academic
-- Fix capitalization
-- Merge broken words
-- Remove duplicates
-- Expand incomplete names if needed
-
-Return ONLY a JSON array.
-
-Example output:
-
-[
-"Introduction to Organizational Behaviour",
-"Nature and Scope of Organizational Behaviour",
-"Personality Theories"
-]
-
-You are cleaning topic names extracted from a syllabus.
-
-Your job is ONLY to clean the wording of the existing topic.
+Your job is ONLY to clean the wording of each existing topic.
 
 You must NOT introduce new concepts.
 You must NOT change the academic meaning.
-You must NOT reorder topics.
-You must NOT merge units.
+You must NOT merge topics.
 
 You may only:
 - fix spelling
 - fix capitalization
 - remove meaningless filler words
+- expand an abbreviation
 - split merged topics if they appear in one line
 
 VERY IMPORTANT:
 The cleaned topic must keep the SAME meaning as the original.
 
---------------------------------
-EXAMPLES
---------------------------------
-
-Example 1
-
-Input:
-"definition"
-
-Output:
-"Definition"
-
-Reason:
-Only capitalization fixed.
+Each topic has an id. Return ONLY a JSON object with the SAME
+ids as keys and the cleaned name as value. If a topic clearly
+contains several topics, its value is a JSON array of names.
+Every id must appear exactly once.
 
 --------------------------------
-
-Example 2
-
-Input:
-"Frame work"
-
-Output:
-"Framework"
-
-Reason:
-Spelling corrected.
-
+EXAMPLES
 --------------------------------
 
-Example 3
-
 Input:
-"Organizational behaviour models."
+{{"0": "definition", "1": "Frame work", "2": "Organizational behaviour models."}}
 
 Output:
-"Organizational Behavior Models"
+{{"0": "Definition", "1": "Framework", "2": "Organizational Behavior Models"}}
 
 Reason:
-Removed punctuation and fixed capitalization.
+Capitalization, spelling and punctuation fixed.
 
 --------------------------------
 
-Example 4
-
 Input:
-"The learning process, Learning theories, Organizational behaviour modification"
+{{"4": "The learning process, Learning theories, Organizational behaviour modification"}}
 
 Output:
-[
-"Learning Process",
-"Learning Theories",
-"Organizational Behavior Modification"
-]
+{{"4": ["Learning Process", "Learning Theories", "Organizational Behavior Modification"]}}
 
 Reason:
 Split merged topics into separate topics.
 
 --------------------------------
 
-Example 5
-
 Input:
-"Organizational behaviour"
+{{"7": "Organizational behaviour", "8": "nature and scope of ob"}}
 
 Correct Output:
-"Organizational Behavior"
+{{"7": "Organizational Behavior", "8": "Nature and Scope of Organizational Behavior"}}
 
 WRONG OUTPUT (DO NOT DO THIS):
-"Introduction to Organizational Behavior"
-
-Reason:
-This changes the meaning.
-
---------------------------------
-
-Example 6
-
-Input:
-"nature and scope of ob"
-
-Output:
-"Nature and Scope of Organizational Behavior"
+{{"7": "Introduction to Organizational Behavior", ...}}
 
 Reason:
-Expanded abbreviation but kept the same meaning.
+"Introduction to" changes the meaning; expanding "ob" keeps it.
 
 --------------------------------
 
 Follow these rules strictly.
 Do NOT invent new topics.
-Do NOT reorganize units.
 Do NOT summarize.
 Do NOT rewrite academically.
 
-Only clean the wording of existing topics.
-The number of topics should remain the same unless a single topic clearly contains multiple topics separated by commas.
-
-
 Return ONLY JSON.
 
-Topic names:
+Topics by id:
 
-{json.dumps(topic_names)}
+{json.dumps({str(i): name for i, name in chunk.items()}, indent=2)}
 """
 
-        headers = {
-            "Authorization": f"Bearer {TopicCleaner.GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "model": TopicCleaner.MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
-        }
-
-        response = requests.post(
-            TopicCleaner.API_URL,
-            headers=headers,
-            json=payload
-        )
-
-        print("Groq response:", response.text)
+        ids = [str(i) for i in chunk]
 
-        try:
+        content = await get_llm_client().chat(
+            prompt,
+            model=TopicCleaner.MODEL,
+            temperature=0.2,
+            timeout=60,
+            # A cut-off reply (or one missing ids) is used but not cached
+            cacheable=lambda reply: TopicCleaner._reply_complete(reply, ids),
+            tags=dict(tags or {}, purpose="topic_cleaning")
+        )
 
-            data = response.json()
+        print(f"Groq response: {len(content)} chars")
 
-            content = data["choices"][0]["message"]["content"]
+        reply, complete = salvage_json_object(content)
+        if not reply:
+            raise Exception("No JSON object found in response")
 
-            # Remove markdown
-            content = content.replace("```json", "").replace("```python", "").replace("```", "").strip()
+        result = {}
+        for i in chunk:
+            names = TopicCleaner._names(reply.get(str(i)))
+            if names:
+                result[i] = names
 
-            # Extract JSON array
-            json_start = content.find("[")
-            json_end = content.find("]") + 1
+        lost = [chunk[i] for i in chunk if i not in result]
+        if lost:
+            print(
+                f"Topic cleaner reply {'incomplete' if not complete else 'missing ids'}, "
+                f"keeping {len(lost)} names: {lost}"
+            )
 
-            cleaned_list = json.loads(content[json_start:json_end])
+        return result
 
-            print("Cleaned topic list:", cleaned_list)
+    @staticmethod
+    def _names(value) -> list:
+        """
+        A reply value as a list of non-empty names ([] if unusable).
+        """
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [v.strip() for v in value if isinstance(v, str) and v.strip()]
 
-            # -------------------------------------------------------
-            # Write cleaned names back into structured syllabus.
-            # FILTER: skip generic single words before saving.
-            # If a cleaned name is generic (e.g. "Labor", "Types"),
-            # keep the original name instead of replacing it.
-            # This prevents meaningless topics polluting the plan.
-            # -------------------------------------------------------
-            index = 0
+    @staticmethod
+    def _reply_complete(content: str, ids: list) -> bool:
+        reply, complete = salvage_json_object(content)
+        return complete and all(TopicCleaner._names(reply.get(i)) for i in ids)
 
-            for unit in structured_syllabus:
-                for topic in unit["topics"]:
+    # -------------------------------------------------------
+    # PRIVATE: Write cleaned names back
+    # -------------------------------------------------------
+    @staticmethod
+    def _write_back(structured_syllabus: list, cleaned: dict):
+        """
+        Write cleaned names back into the structured syllabus by id.
+        FILTER: skip generic single words before saving.
+        If a cleaned name is generic (e.g. "Labor", "Types"),
+        keep the original name instead of replacing it.
+        This prevents meaningless topics polluting the plan.
+        A split topic becomes several topics (same complexity /
+        hours each); topics without a result keep their name.
+        """
+        topic_id = 0
 
-                    if index < len(cleaned_list):
-                        candidate = cleaned_list[index]
+        for unit in structured_syllabus:
+            topics = []
 
-                        if _is_generic(candidate):
-                            # Keep original name — generic word is worse
-                            print(f"Skipping generic: '{candidate}' keeping '{topic['name']}'")
-                        else:
-                            topic["name"] = candidate
+            for topic in unit["topics"]:
+                names = cleaned.get(topic_id, [])
+                topic_id += 1
 
-                    index += 1
+                kept = []
+                for name in names:
+                    if _is_generic(name):
+                        # Keep original name — generic word is worse
+                        print(f"Skipping generic: '{name}' keeping '{topic['name']}'")
+                    elif name not in kept:
+                        kept.append(name)
 
-            return structured_syllabus
+                if not kept:
+                    topics.append(topic)
+                    continue
 
-        except Exception as e:
+                if len(kept) > 1:
+                    print(f"Split '{topic['name']}' into {kept}")
 
-            print("AI parsing error:", e)
+                topics.append(dict(topic, name=kept[0]))
+                topics.extend(dict(topic, name=name) for name in kept[1:])
 
-            return structured_syllabus
\ No newline at end of file
+            unit["topics"] = topics
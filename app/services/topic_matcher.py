@@ -0,0 +1,111 @@
+import os
+import re
+
+from dotenv import load_dotenv
+
+from app.storage.backend import normalize_topic
+
+load_dotenv()
+
+# -------------------------------------------------------
+# TOPIC NAME MATCHING  (syllabus topic → bank key)
+#
+# The keys the LLM returns in a bank often differ slightly from
+# the syllabus's topic names, and TopicCleaner may rename topics
+# after the bank was built. Each name is matched, in order, by:
+#
+#   1. exact key
+#   2. same normalize_topic() key (case, accents, punctuation),
+#      British / American spellings folded together
+#      — "Organizational Behaviour" ↔ "Organisational Behavior"
+#   3. character-trigram similarity (Dice coefficient) of those
+#      keys, best bank key at or above TOPIC_MATCH_MIN
+#      — "Personality Traits & Types" ↔ "Personality Traits"
+#
+# Names with no match map to None. A key matched exactly (1, 2)
+# by one of the names is not offered to the others as a fuzzy
+# match — a topic the LLM skipped must not borrow its sibling's
+# questions ("Learning Theory" vs "Learning Theories").
+# -------------------------------------------------------
+
+TOPIC_MATCH_MIN = float(os.getenv("TOPIC_MATCH_MIN_SIMILARITY", "0.75"))
+
+# behaviour → behavior, organisation → organization,
+# analyse → analyze, centre → center
+SPELLING_FOLDS = (
+    (re.compile(r"our\b"), "or"),
+    (re.compile(r"isation"), "ization"),
+    (re.compile(r"is(e|ed|es|er|ers|ing)\b"), r"iz\1"),
+    (re.compile(r"yse\b"), "yze"),
+    (re.compile(r"tre\b"), "ter"),
+)
+
+
+def match_key(name: str) -> str:
+    key = normalize_topic(name)
+    for pattern, replacement in SPELLING_FOLDS:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def trigrams(name: str) -> set:
+    padded = f"  {match_key(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def match_topics(topic_names: list, bank_keys: list, claimed=(),
+                 min_similarity: float = TOPIC_MATCH_MIN) -> dict:
+    """
+    { topic_name: best bank key, or None }.
+    claimed: keys already matched exactly by other names (earlier
+    calls), also kept out of the fuzzy matches.
+    Trigram candidates come from an inverted index, so each name
+    is only compared with keys sharing a trigram with it.
+    """
+    position = {}
+    by_normalized = {}
+    by_trigram = {}
+    key_trigrams = {}
+
+    for key in bank_keys:
+        position.setdefault(key, len(position))
+        by_normalized.setdefault(match_key(key), key)
+        key_trigrams[key] = trigrams(key)
+        for gram in key_trigrams[key]:
+            by_trigram.setdefault(gram, []).append(key)
+
+    matches = {}
+    for name in topic_names:
+        if name in position:
+            matches[name] = name
+        else:
+            matches[name] = by_normalized.get(match_key(name))
+
+    claimed = set(claimed) | set(matches.values())
+
+    for name in topic_names:
+        if matches[name] is not None:
+            continue
+
+        grams = trigrams(name)
+        candidates = {
+            key for gram in grams for key in by_trigram.get(gram, ())
+            if key not in claimed
+        }
+
+        best, best_score = None, min_similarity
+        # Bank order breaks ties, so the first entry wins
+        for key in sorted(candidates, key=position.get):
+            score = similarity(grams, key_trigrams[key])
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = key, score
+
+        matches[name] = best
+
+    return matches
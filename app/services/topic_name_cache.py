@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------------------------------
+# CLEANED TOPIC NAME CACHE  (SQLite, shared by all workers)
+#
+# raw topic name (as extracted) + model → what TopicCleaner's
+# LLM made of it: one name, or several when it split a merged
+# line. Re-structuring a syllabus, changing its subject or
+# uploading the same syllabus again only sends the names never
+# seen before. The generic-word filter runs on every use, so
+# stored results stay unfiltered.
+# -------------------------------------------------------
+
+TOPIC_NAME_CACHE_ENABLED = os.getenv("TOPIC_NAME_CACHE_ENABLED", "1") == "1"
+TOPIC_NAME_CACHE_PATH = os.getenv("TOPIC_NAME_CACHE_PATH", "data/topic_names.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cleaned_names (
+    raw        TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    cleaned    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (raw, model)
+);
+"""
+
+
+class TopicNameCache:
+
+    def __init__(self, path: str = TOPIC_NAME_CACHE_PATH, enabled: bool = TOPIC_NAME_CACHE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+
+        return conn
+
+    def get_many(self, raw_names: list, model: str) -> dict:
+        """
+        { raw name: [cleaned name, ...] } for the names cleaned before.
+        """
+        names = list(dict.fromkeys(raw_names))
+        if not self.enabled or not names:
+            return {}
+
+        found = {}
+        conn = self._conn()
+
+        # SQLite caps bound parameters per statement
+        for start in range(0, len(names), 500):
+            batch = names[start:start + 500]
+            rows = conn.execute(
+                f"SELECT raw, cleaned FROM cleaned_names "
+                f"WHERE model = ? AND raw IN ({','.join('?' for _ in batch)})",
+                [model, *batch]
+            ).fetchall()
+            found.update((raw, json.loads(cleaned)) for raw, cleaned in rows)
+
+        return found
+
+    def put_many(self, cleaned: dict, model: str):
+        """
+        cleaned: { raw name: [cleaned name, ...] }.
+        """
+        if not self.enabled or not cleaned:
+            return
+
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR REPLACE INTO cleaned_names (raw, model, cleaned, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(raw, model, json.dumps(names), now) for raw, names in cleaned.items()]
+        )
+
+
+# -------------------------------------------------------
+# PROCESS-WIDE CACHE
+# -------------------------------------------------------
+_name_cache = None
+_name_cache_lock = threading.Lock()
+
+
+def get_topic_name_cache() -> TopicNameCache:
+    global _name_cache
+
+    with _name_cache_lock:
+        if _name_cache is None:
+            _name_cache = TopicNameCache()
+        return _name_cache
@@ -0,0 +1,460 @@
+import os
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from bson import ObjectId
+
+
+# --------------------------------------------------
+# JSON DEFAULT  (shared by every backend)
+# --------------------------------------------------
+def json_default(obj):
+    """
+    datetime / ObjectId are not JSON serializable — convert to string.
+    """
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+# --------------------------------------------------
+# LEARNER PATCH HELPERS
+# --------------------------------------------------
+def diff_learner_state(old: dict, new: dict) -> dict:
+    """
+    Describe how new differs from old as a patch:
+
+        {
+          "topics":         { topic: full topic state },  # added / changed
+          "removed_topics": [topic, ...],
+          "fields":         { key: value },               # top-level keys
+          "removed_fields": [key, ...]
+        }
+
+    "version" is never part of a patch — backends own it.
+    """
+    old_topics = old.get("topic_states", {})
+    new_topics = new.get("topic_states", {})
+
+    old_fields = {k: v for k, v in old.items() if k not in ("topic_states", "version")}
+    new_fields = {k: v for k, v in new.items() if k not in ("topic_states", "version")}
+
+    return {
+        "topics": {
+            topic: state
+            for topic, state in new_topics.items()
+            if old_topics.get(topic) != state
+        },
+        "removed_topics": [t for t in old_topics if t not in new_topics],
+        "fields": {
+            key: value
+            for key, value in new_fields.items()
+            if key not in old_fields or old_fields[key] != value
+        },
+        "removed_fields": [k for k in old_fields if k not in new_fields]
+    }
+
+
+def apply_learner_patch(state: dict | None, patch: dict) -> dict:
+    """
+    Apply a diff_learner_state() patch to a full learner document.
+    """
+    state = state or {}
+    topic_states = state.setdefault("topic_states", {})
+
+    topic_states.update(patch.get("topics", {}))
+    for topic in patch.get("removed_topics", []):
+        topic_states.pop(topic, None)
+
+    state.update(patch.get("fields", {}))
+    for key in patch.get("removed_fields", []):
+        state.pop(key, None)
+
+    return state
+
+
+def is_empty_patch(patch: dict) -> bool:
+    return not any(patch.get(k) for k in (
+        "topics", "removed_topics", "fields", "removed_fields"
+    ))
+
+
+# --------------------------------------------------
+# PLAN REVISION HELPERS
+# --------------------------------------------------
+# Take a full copy (keyframe) of the plan every this many revisions,
+# so loading any revision applies at most this many deltas
+PLAN_KEYFRAME_EVERY = int(os.getenv("PLAN_KEYFRAME_EVERY", "20"))
+
+
+def _split_plan(document: dict) -> tuple:
+    """
+    (top-level fields, plan fields, schedule) — "version" excluded.
+    """
+    plan = document.get("plan") or {}
+    fields = {k: v for k, v in document.items() if k not in ("plan", "version")}
+    plan_fields = {k: v for k, v in plan.items() if k != "schedule"}
+    return fields, plan_fields, plan.get("schedule") or {}
+
+
+def _dict_delta(old: dict, new: dict) -> tuple:
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+def diff_plan(old: dict, new: dict) -> dict:
+    """
+    Describe how plan document new differs from old, day by day:
+
+        {
+          "days":         { day: [entries] },   # added / changed days
+          "removed_days": [day, ...],
+          "day_order":    [day, ...],           # only if order changed
+          "plan_fields":  { key: value },       # plan keys except schedule
+          "removed_plan_fields": [key, ...],
+          "fields":       { key: value },       # top-level keys except plan
+          "removed_fields": [key, ...]
+        }
+
+    A regeneration that only reshuffles a few days stores only
+    those days.
+    """
+    old_fields, old_plan, old_days = _split_plan(old)
+    new_fields, new_plan, new_days = _split_plan(new)
+
+    delta = {}
+    delta["days"], delta["removed_days"] = _dict_delta(old_days, new_days)
+    delta["plan_fields"], delta["removed_plan_fields"] = _dict_delta(old_plan, new_plan)
+    delta["fields"], delta["removed_fields"] = _dict_delta(old_fields, new_fields)
+
+    # Applying the delta keeps old days in place and appends new
+    # ones; record the order only when that would be wrong
+    applied_order = [d for d in old_days if d in new_days]
+    applied_order += [d for d in new_days if d not in old_days]
+    if applied_order != list(new_days):
+        delta["day_order"] = list(new_days)
+
+    return {k: v for k, v in delta.items() if v}
+
+
+def apply_plan_delta(document: dict, delta: dict) -> dict:
+    """
+    Apply a diff_plan() delta, returning a new plan document.
+    """
+    fields, plan_fields, schedule = _split_plan(document)
+    schedule = dict(schedule)
+
+    schedule.update(delta.get("days", {}))
+    for day in delta.get("removed_days", []):
+        schedule.pop(day, None)
+    if "day_order" in delta:
+        schedule = {day: schedule[day] for day in delta["day_order"]}
+
+    plan_fields.update(delta.get("plan_fields", {}))
+    for key in delta.get("removed_plan_fields", []):
+        plan_fields.pop(key, None)
+
+    fields.update(delta.get("fields", {}))
+    for key in delta.get("removed_fields", []):
+        fields.pop(key, None)
+
+    plan_fields["schedule"] = schedule
+    result = dict(fields)
+    result["plan"] = plan_fields
+    return result
+
+
+def make_plan_revision(previous: dict | None, document: dict,
+                       version: int, base: int | None) -> dict:
+    """
+    Revision record for saving document as version, given the
+    previous document and the keyframe version it builds on.
+
+        {"v": 7, "ts": ..., "base": 1, "delta": {...}}   or
+        {"v": 21, "ts": ..., "base": 21, "full": {...}}  (keyframe)
+    """
+    record = {"v": version, "ts": datetime.utcnow().isoformat()}
+
+    if previous is None or base is None or version - base >= PLAN_KEYFRAME_EVERY:
+        record["base"] = version
+        record["full"] = {k: v for k, v in document.items() if k != "version"}
+    else:
+        record["base"] = base
+        record["delta"] = diff_plan(previous, document)
+
+    return record
+
+
+def materialize_plan_revision(records: list, version: int) -> dict | None:
+    """
+    Rebuild revision version from its keyframe and the deltas after
+    it. records: revision records of one plan, any order; for a
+    repeated version the last record wins.
+    """
+    by_version = {r["v"]: r for r in records}
+    target = by_version.get(version)
+
+    if target is None:
+        return None
+
+    document = None
+    for v in range(target["base"], version + 1):
+        record = by_version.get(v)
+        if record is None:
+            continue
+        if "full" in record:
+            document = dict(record["full"])
+        elif document is not None:
+            document = apply_plan_delta(document, record["delta"])
+
+    if document is not None:
+        document["version"] = version
+    return document
+
+
+# --------------------------------------------------
+# TOPIC NAME NORMALIZATION  (bank topic index)
+# --------------------------------------------------
+def normalize_topic(name: str) -> str:
+    """
+    Key under which a topic is indexed: case, accents, punctuation
+    and spacing differences between the plan and the bank collapse
+    — "Plain Text & Cipher-Text." → "plain text cipher text".
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", name.lower()).split())
+
+
+def pick_bank_topics(entries: dict, topic_names: list, syllabus_ids: list | None) -> dict:
+    """
+    entries: { normalized topic: { syllabus_id: bank key } }
+    Returns { topic_name: (syllabus_id, bank key) }, preferring
+    syllabuses earlier in syllabus_ids (None = any syllabus).
+    """
+    rank = None
+    if syllabus_ids is not None:
+        rank = {str(s): i for i, s in enumerate(syllabus_ids)}
+
+    found = {}
+    for topic in topic_names:
+        candidates = entries.get(normalize_topic(topic), {})
+        if rank is not None:
+            candidates = {s: k for s, k in candidates.items() if s in rank}
+        if candidates:
+            syllabus_id = min(candidates, key=lambda s: rank[s] if rank else 0)
+            found[topic] = (syllabus_id, candidates[syllabus_id])
+
+    return found
+
+
+# --------------------------------------------------
+# INTERFACE
+# --------------------------------------------------
+class StorageBackend(ABC):
+    """
+    Persistence for learner states, plans and question banks.
+
+    Learner states and plans are versioned: every write bumps
+    document["version"], and writes taking expected_version are
+    compare-and-swap (VersionConflict on mismatch).
+
+    load_* methods return (document, token). The token changes
+    whenever the stored document changes; learner_store and
+    plan_store use it to validate their process-local caches.
+    """
+
+    # ---------------- learners ----------------
+    @abstractmethod
+    def learner_token(self, user_id: str):
+        """Cheap change token, or None if the learner has no state."""
+
+    @abstractmethod
+    def load_learner(self, user_id: str) -> tuple:
+        """(learner_state, token), or (None, None)."""
+
+    @abstractmethod
+    def save_learner(self, user_id: str, state: dict,
+                     expected_version: int | None = None) -> int:
+        """Replace the whole learner state. Returns the new version."""
+
+    @abstractmethod
+    def patch_learner(self, user_id: str, patch: dict,
+                      expected_version: int | None = None,
+                      event: str = "update") -> int:
+        """
+        Apply a diff_learner_state() patch. Returns the new version.
+        event labels the change in the learner's audit trail.
+        """
+
+    @abstractmethod
+    def iter_learner_events(self, user_id: str):
+        """
+        Yield the learner's audit trail, oldest first:
+        {"v", "ts", "event", "patch"} — or "state" for full saves.
+        """
+
+    @abstractmethod
+    def iter_learner_ids(self):
+        """Yield every stored user id."""
+
+    # ---------------- plans ----------------
+    @abstractmethod
+    def plan_token(self, plan_id: str):
+        """Cheap change token, or None if the plan does not exist."""
+
+    @abstractmethod
+    def load_plan(self, plan_id: str) -> tuple:
+        """(plan_document, token), or (None, None)."""
+
+    @abstractmethod
+    def save_plan(self, plan_id: str, document: dict,
+                  expected_version: int | None = None) -> int:
+        """Replace the plan document. Returns the new version."""
+
+    @abstractmethod
+    def iter_plan_revisions(self, plan_id: str):
+        """
+        Yield the plan's make_plan_revision() records, oldest first.
+        save_plan records one per save.
+        """
+
+    @abstractmethod
+    def load_plan_revision(self, plan_id: str, version: int) -> dict | None:
+        """The plan document as it was at version, or None."""
+
+    @abstractmethod
+    def iter_plan_ids(self):
+        """Yield every stored plan id."""
+
+    # ---------------- question banks ----------------
+    @abstractmethod
+    def load_bank(self, syllabus_id: str) -> dict | None:
+        """Full bank { topic: [questions] }, or None if never saved."""
+
+    @abstractmethod
+    def load_bank_topics(self, syllabus_id: str, topic_names: list) -> dict:
+        """Only the requested topics that exist in the bank."""
+
+    @abstractmethod
+    def find_bank_topics(self, topic_names: list, syllabus_ids: list | None = None) -> dict:
+        """
+        Look topics up in the inverted index kept by save_bank:
+        { topic_name: (syllabus_id, bank key) } for those found.
+        Names match after normalize_topic(); syllabus_ids limits
+        the search and orders preference (first wins).
+        """
+
+    @abstractmethod
+    def bank_topic_count(self, syllabus_id: str) -> int | None:
+        """Topics in the bank without loading it; None if never saved."""
+
+    @abstractmethod
+    def bank_topic_keys(self, syllabus_id: str) -> list:
+        """The bank's topic keys in order, without their questions."""
+
+    @abstractmethod
+    def load_topic_map(self, syllabus_id: str) -> tuple:
+        """
+        (topic map, token): the map stored alongside the bank
+        { syllabus topic name: bank key or None }, {} if none was
+        saved for the bank as it is now; token identifies the
+        bank's current contents (None if there is no bank).
+        """
+
+    @abstractmethod
+    def save_topic_map(self, syllabus_id: str, mapping: dict, token):
+        """
+        Replace the topic map, computed against the bank as of
+        token (from load_topic_map). If the bank has changed
+        since, the map is ignored by the next load_topic_map.
+        """
+
+    @abstractmethod
+    def save_bank(self, syllabus_id: str, bank: dict):
+        """Replace the whole bank and index its topics."""
+
+    @abstractmethod
+    def iter_bank_ids(self):
+        """Yield every stored syllabus id that has a bank."""
+
+    # ---------------- shared question store ----------------
+    @abstractmethod
+    def load_shared_questions(self, keys: list) -> dict:
+        """{ key: [questions] } for the content keys that are stored."""
+
+    @abstractmethod
+    def save_shared_questions(self, entries: dict):
+        """
+        Store { key: [questions] } for keys not stored yet. An
+        existing key is kept as is — banks of other syllabuses
+        reference it.
+        """
+
+    # ---------------- bank generation status ----------------
+    @abstractmethod
+    def load_bank_status(self, syllabus_id: str) -> dict | None:
+        """Generation status of a bank not (yet) built, or None."""
+
+    @abstractmethod
+    def save_bank_status(self, syllabus_id: str, status: dict | None):
+        """Record a generation status; None clears it."""
+
+    @abstractmethod
+    def update_bank_status(self, syllabus_id: str, update) -> dict | None:
+        """
+        Read-modify-write one status atomically (across workers):
+        update(current or None) returns the status to store, None
+        to clear it. Returns what was stored.
+        """
+
+    @abstractmethod
+    def iter_bank_statuses(self):
+        """Yield (syllabus_id, status) for every recorded status."""
+
+
+# --------------------------------------------------
+# FACTORY
+# --------------------------------------------------
+_backend = None
+
+
+def create_backend(kind: str, **kwargs) -> StorageBackend:
+    """
+    kind: "json"   → one JSON file per entity under data/ (default)
+          "sqlite" → single SQLite database, per-topic rows
+    """
+    if kind == "json":
+        from app.storage.json_backend import JsonFileBackend
+        return JsonFileBackend(**kwargs)
+
+    if kind == "sqlite":
+        from app.storage.sqlite_backend import SqliteBackend
+        return SqliteBackend(**kwargs)
+
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def get_backend() -> StorageBackend:
+    """
+    Process-wide backend chosen by STORAGE_BACKEND (json | sqlite).
+    """
+    global _backend
+
+    if _backend is None:
+        _backend = create_backend(os.getenv("STORAGE_BACKEND", "json"))
+
+    return _backend
+
+
+def set_backend(backend: StorageBackend):
+    """
+    Swap the process-wide backend (migrations, benchmarks).
+    """
+    global _backend
+    _backend = backend
@@ -0,0 +1,109 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+# Max documents kept per cache (per process)
+CACHE_SIZE = int(os.getenv("STORAGE_CACHE_SIZE", "256"))
+
+_registry = {}
+
+
+class DocumentCache:
+    """
+    Bounded, thread-safe LRU of parsed documents keyed by id.
+
+    Every entry carries a token (file_token() for JSON files)
+    that says which version of the document it came from.
+    A get() with a different token is a miss, so writes from
+    other workers are picked up without any messaging.
+
+    Values are stored pickled and every get() unpickles a fresh
+    copy — callers can mutate what they receive without
+    corrupting the cache, and unpickling is still ~2x faster
+    than json.load on a 40 KB learner file.
+
+    copy=False stores values as is and hands out the shared
+    object — for read-only values (indexes) where copying
+    would cost more than the lookup it saves.
+    """
+
+    def __init__(self, name: str, maxsize: int = CACHE_SIZE, copy: bool = True):
+        self.name = name
+        self.maxsize = maxsize
+        self.copy = copy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry[name] = self
+
+    def get(self, key: str, token):
+        """
+        Return a private copy of the cached value, or None on
+        a miss (absent, or stored under a different token).
+        """
+        if token is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != token:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            blob = entry[1]
+
+        return pickle.loads(blob) if self.copy else blob
+
+    def put(self, key: str, token, value):
+        if token is None:
+            return
+
+        if self.copy:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            blob = value
+
+        with self._lock:
+            self._entries[key] = (token, blob)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+def all_cache_stats() -> dict:
+    """
+    Hit/miss counters for every storage cache in this process.
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
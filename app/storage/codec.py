@@ -0,0 +1,204 @@
+# --------------------------------------------------
+# Compact on-disk encoding for learner states and plans.
+#
+# Topic names are long and repeat everywhere (topic_states keys,
+# every schedule entry). The compact form stores each name once
+# in a "topics" table and refers to it by index, and stores
+# per-topic / per-entry fields column by column:
+#
+#   learner:  {"version": 7, "encoding": "compact-v1",
+#              "topics": ["Cipher Text", "Firewalls", ...],
+#              "topic_states": {"fields": {"familiarity": [0.4, 0.7, ...],
+#                                          "attempts":    [3, 1, ...]},
+#                               "absent": {"last_studied": [1]}},
+#              "learning_speed": 1.0, ...}
+#
+#   plan:     {..., "topics": [...],
+#              "plan": {"schedule": {"days": [["1", 4], ["2", 3], ...],
+#                                    "entries": <columns, topic = index>},
+#                       ...}}
+#
+# "absent" lists the rows that did not have a field at all (as
+# opposed to having it set to null). Files without "encoding"
+# are the old pretty-printed format and load unchanged.
+# --------------------------------------------------
+
+ENCODING = "compact-v1"
+
+# json.dump kwargs for compact files: no indentation, no spaces
+COMPACT_DUMP = {"separators": (",", ":")}
+
+
+def is_compact(document) -> bool:
+    return isinstance(document, dict) and document.get("encoding") == ENCODING
+
+
+# --------------------------------------------------
+# PRIVATE: Columns
+# --------------------------------------------------
+def _to_columns(records: list, topic_index: dict | None = None) -> dict:
+    """
+    [{field: value}] → {"fields": {field: [values]}, "absent": {...}}
+    With topic_index, "topic" values are replaced by table indexes.
+    """
+    # Column order = first appearance across all records
+    fields = {}
+    for record in records:
+        for name in record:
+            fields.setdefault(name, [])
+
+    absent = {}
+
+    for row, record in enumerate(records):
+        for name, column in fields.items():
+            if name not in record:
+                column.append(None)
+                absent.setdefault(name, []).append(row)
+                continue
+
+            value = record[name]
+            if topic_index is not None and name == "topic":
+                value = topic_index.setdefault(value, len(topic_index))
+            column.append(value)
+
+    return {"fields": fields, "absent": absent} if absent else {"fields": fields}
+
+
+def _from_columns(columns: dict, count: int, topics: list | None = None) -> list:
+    absent = columns.get("absent", {})
+    records = [{} for _ in range(count)]
+
+    # Column at a time — much faster than row at a time in CPython
+    for name, column in columns.get("fields", {}).items():
+        if topics is not None and name == "topic":
+            column = [topics[v] if v is not None else None for v in column]
+
+        skip = absent.get(name)
+
+        if not skip:
+            for record, value in zip(records, column):
+                record[name] = value
+            continue
+
+        skip = set(skip)
+        for row, (record, value) in enumerate(zip(records, column)):
+            if row not in skip:
+                record[name] = value
+
+    return records
+
+
+# --------------------------------------------------
+# LEARNER STATE
+# --------------------------------------------------
+def encode_learner(state: dict) -> dict:
+    """
+    Full learner state → compact document. "version" (if any)
+    stays the first key so backends can read it cheaply.
+    """
+    topic_states = state.get("topic_states", {})
+
+    document = {}
+    if "version" in state:
+        document["version"] = state["version"]
+    document["encoding"] = ENCODING
+    document["topics"] = list(topic_states)
+    document["topic_states"] = _to_columns(list(topic_states.values()))
+
+    for key, value in state.items():
+        if key not in ("version", "topic_states"):
+            document[key] = value
+
+    return document
+
+
+def decode_learner(document: dict) -> dict:
+    """
+    Compact or legacy learner document → full learner state.
+    """
+    if not is_compact(document):
+        return document
+
+    topics = document["topics"]
+    states = _from_columns(document["topic_states"], len(topics))
+
+    state = {"topic_states": dict(zip(topics, states))}
+    for key, value in document.items():
+        if key not in ("encoding", "topics", "topic_states"):
+            state[key] = value
+
+    return state
+
+
+# --------------------------------------------------
+# PLANS
+# --------------------------------------------------
+def _is_schedule(schedule) -> bool:
+    return isinstance(schedule, dict) and all(
+        isinstance(entries, list)
+        and all(isinstance(e, dict) for e in entries)
+        for entries in schedule.values()
+    )
+
+
+def encode_plan(document: dict) -> dict:
+    """
+    Plan document → compact document. Only plan["schedule"] is
+    restructured; everything else is stored as is.
+    """
+    plan = document.get("plan")
+    schedule = plan.get("schedule") if isinstance(plan, dict) else None
+
+    if not _is_schedule(schedule):
+        return document
+
+    topic_index = {}
+    entries = [e for day_entries in schedule.values() for e in day_entries]
+
+    encoded_plan = dict(plan)
+    encoded_plan["schedule"] = {
+        "days": [[day, len(day_entries)] for day, day_entries in schedule.items()],
+        "entries": _to_columns(entries, topic_index)
+    }
+
+    encoded = {}
+    if "version" in document:
+        encoded["version"] = document["version"]
+    encoded["encoding"] = ENCODING
+    encoded["topics"] = list(topic_index)
+
+    for key, value in document.items():
+        if key != "version":
+            encoded[key] = encoded_plan if key == "plan" else value
+
+    return encoded
+
+
+def decode_plan(document: dict) -> dict:
+    """
+    Compact or legacy plan document → full plan document.
+    """
+    if not is_compact(document):
+        return document
+
+    plan = dict(document["plan"])
+    days = plan["schedule"]["days"]
+    entries = _from_columns(
+        plan["schedule"]["entries"],
+        sum(count for _, count in days),
+        topics=document["topics"]
+    )
+
+    schedule = {}
+    start = 0
+    for day, count in days:
+        schedule[day] = entries[start:start + count]
+        start += count
+    plan["schedule"] = schedule
+
+    decoded = {}
+    for key, value in document.items():
+        if key not in ("encoding", "topics"):
+            decoded[key] = plan if key == "plan" else value
+
+    return decoded
@@ -0,0 +1,117 @@
+import json
+import os
+
+
+# --------------------------------------------------
+# Append-only JSONL event logs.
+#
+# One event per line, versions strictly increasing:
+#   {"v": 17, "ts": "2026-03-27T10:00:00", "event": "micro_test",
+#    "patch": {...}}
+#
+# A line torn by a crash mid-append is skipped on read, and the
+# next append starts on a fresh line.
+# --------------------------------------------------
+
+
+def append_event(path: str, event: dict, default=None):
+    """
+    Append one event and fsync. Caller must hold the file lock.
+    """
+    line = json.dumps(event, separators=(",", ":"), default=default) + "\n"
+
+    with open(path, "a+b") as f:
+        # Never glue onto a torn last line
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+
+        f.write(line.encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def archive_and_truncate(path: str, archive_path: str):
+    """
+    Move every event of the log to the end of the archive file,
+    then empty the log. The full audit trail survives compaction.
+    Caller must hold the file lock.
+    """
+    try:
+        with open(path, "rb") as src:
+            data = src.read()
+    except FileNotFoundError:
+        return
+
+    if data.strip():
+        if not data.endswith(b"\n"):
+            data += b"\n"
+
+        with open(archive_path, "ab") as dst:
+            dst.write(data)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+    with open(path, "wb") as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _parse_lines(lines) -> list:
+    events = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            print(f"Skipping torn event log line: {line[:80]!r}")
+    return events
+
+
+def last_event(path: str) -> dict | None:
+    """
+    Last complete event, reading only the tail of the file.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        window = 4096
+
+        while True:
+            start = max(0, end - window)
+            f.seek(start)
+            lines = f.read(end - start).split(b"\n")
+
+            # The first line of a window may be cut — drop it
+            # unless the window reaches the start of the file
+            candidates = lines if start == 0 else lines[1:]
+            events = _parse_lines(candidates)
+
+            if events:
+                return events[-1]
+            if start == 0:
+                return None
+
+            window *= 2
+
+
+def read_events(path: str) -> tuple:
+    """
+    All events in order plus the file token of what was read.
+    Returns ([], None) if the log does not exist.
+    """
+    try:
+        with open(path, "r") as f:
+            st = os.fstat(f.fileno())
+            events = _parse_lines(f)
+    except FileNotFoundError:
+        return [], None
+
+    return events, (st.st_ino, st.st_mtime_ns, st.st_size)
@@ -0,0 +1,297 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+
+class VersionConflict(Exception):
+    """
+    Raised when a compare-and-swap write finds that the stored
+    document has moved on since the caller loaded it.
+    """
+
+    def __init__(self, path: str, expected: int, actual: int):
+        super().__init__(
+            f"Version conflict on {path}: expected {expected}, found {actual}"
+        )
+        self.path = path
+        self.expected = expected
+        self.actual = actual
+
+
+# --------------------------------------------------
+# ATOMIC WRITE  (temp file in same dir + os.replace)
+# --------------------------------------------------
+@contextmanager
+def _atomic_file(path: str, mode: str = "w"):
+    """
+    Yield a temp file next to path; on success it is fsynced and
+    renamed over path. The temp file lives in the same directory
+    so os.replace() is a same-filesystem atomic rename.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=".tmp-",
+        suffix=".json"
+    )
+
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, data, **dump_kwargs):
+    """
+    Write JSON so readers only ever see the old file or the
+    complete new one — never a half-written document.
+    """
+    with _atomic_file(path) as f:
+        json.dump(data, f, **dump_kwargs)
+
+
+def atomic_create_json(path: str, data, **dump_kwargs) -> bool:
+    """
+    Write JSON only if path does not exist yet — atomically, so
+    of two concurrent writers exactly one wins. Returns False
+    (nothing written) if the file was already there.
+    """
+    if os.path.exists(path):
+        return False
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # link() fails if path exists, unlike replace()
+        os.link(tmp_path, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def atomic_write_json_records(path: str, records: dict, **dump_kwargs) -> tuple:
+    """
+    Atomically write a JSON object with one key per line:
+
+        {
+        "Topic One":[...],
+        "Topic Two":[...]
+        }
+
+    The file is still plain JSON, but every value can also be
+    read on its own. Returns ({key: [offset, length]}, token):
+    where each value's bytes are, and the file_token() of the
+    file they are valid for.
+    """
+    offsets = {}
+
+    with _atomic_file(path, "wb") as f:
+        f.write(b"{\n")
+        position = 2
+
+        for i, (key, value) in enumerate(records.items()):
+            prefix = (b",\n" if i else b"") + json.dumps(key).encode() + b":"
+            body = json.dumps(value, **dump_kwargs).encode()
+
+            offsets[key] = [position + len(prefix), len(body)]
+            f.write(prefix + body)
+            position += len(prefix) + len(body)
+
+        f.write(b"\n}\n")
+        f.flush()
+        st = os.fstat(f.fileno())
+
+    # Rename keeps inode, mtime and size — the token stays valid
+    return offsets, (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# --------------------------------------------------
+# READ
+# --------------------------------------------------
+def read_json(path: str):
+    """
+    Load a JSON file. Returns None if it does not exist.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_json_with_token(path: str) -> tuple:
+    """
+    Load a JSON file together with the file_token() of exactly
+    the inode that was read. Returns (None, None) if missing.
+    """
+    try:
+        with open(path, "r") as f:
+            st = os.fstat(f.fileno())
+            return json.load(f), (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None, None
+
+
+# --------------------------------------------------
+# CHANGE TOKEN  (cheap "has this file changed?" check)
+# --------------------------------------------------
+def file_token(path: str) -> tuple | None:
+    """
+    (inode, mtime_ns, size) of a file, or None if missing.
+    atomic_write_json always renames a new inode into place,
+    so the token changes on every write even when mtime
+    resolution is coarse.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# --------------------------------------------------
+# CROSS-PROCESS LOCK  (one lock file per document)
+# --------------------------------------------------
+class LockTimeout(TimeoutError):
+    """
+    Raised by file_lock(timeout=...) when the lock stayed held.
+    """
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def file_lock(path: str, timeout: float | None = None):
+    """
+    Exclusive advisory lock on "{path}.lock".
+    Works across uvicorn workers (separate processes) and
+    across threads, because every call opens its own handle.
+
+    timeout: give up after this many seconds (LockTimeout)
+             instead of waiting indefinitely.
+    """
+    lock_path = f"{path}.lock"
+
+    with open(lock_path, "a+") as lock_file:
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not _try_lock(lock_file):
+                if time.monotonic() >= deadline:
+                    raise LockTimeout(f"Lock on {path} still held after {timeout}s")
+                time.sleep(0.05)
+        elif fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            # msvcrt.LK_LOCK gives up after ~10s — keep retrying
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# --------------------------------------------------
+# VERSIONED UPDATE  (compare-and-swap under the lock)
+# --------------------------------------------------
+def versioned_update_json(
+    path: str,
+    update,
+    expected_version: int | None = None,
+    **dump_kwargs
+) -> int:
+    """
+    Read-modify-write a versioned JSON document under its lock.
+
+    update(current) receives the stored document (or None) and
+    returns the document to write; its "version" is set to the
+    stored version + 1.
+
+    expected_version:
+        None → unconditional write (still bumps the version)
+        int  → only write if the stored version matches,
+               otherwise raise VersionConflict.
+               0 matches a missing file or a legacy
+               file written before versioning.
+
+    Returns the new version number.
+    """
+    with file_lock(path):
+        current = read_json(path)
+        current_version = (current or {}).get("version", 0)
+
+        if expected_version is not None and expected_version != current_version:
+            raise VersionConflict(path, expected_version, current_version)
+
+        document = update(current)
+
+        new_version = current_version + 1
+        document["version"] = new_version
+        atomic_write_json(path, document, **dump_kwargs)
+
+    return new_version
+
+
+def versioned_write_json(
+    path: str,
+    document: dict,
+    expected_version: int | None = None,
+    **dump_kwargs
+) -> int:
+    """
+    Replace a versioned JSON document (see versioned_update_json).
+    document["version"] is updated in place.
+    """
+    return versioned_update_json(
+        path,
+        lambda current: document,
+        expected_version=expected_version,
+        **dump_kwargs
+    )
@@ -0,0 +1,725 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from app.storage.backend import (
+    StorageBackend,
+    apply_learner_patch,
+    json_default,
+    make_plan_revision,
+    materialize_plan_revision,
+    normalize_topic,
+    pick_bank_topics
+)
+from app.storage.cache import DocumentCache
+from app.storage.codec import (
+    COMPACT_DUMP,
+    decode_learner,
+    decode_plan,
+    encode_learner,
+    encode_plan
+)
+from app.storage.event_log import (
+    append_event,
+    archive_and_truncate,
+    last_event,
+    read_events
+)
+from app.storage.file_io import (
+    VersionConflict,
+    atomic_create_json,
+    atomic_write_json,
+    atomic_write_json_records,
+    file_lock,
+    file_token,
+    read_json,
+    read_json_with_token,
+    versioned_update_json
+)
+from app.storage.sharding import flat_path, iter_ids, register_id, shard_path
+
+# Learner snapshot is rewritten after this many logged updates
+SNAPSHOT_EVERY = int(os.getenv("LEARNER_SNAPSHOT_EVERY", "50"))
+
+_VERSION_PREFIX = re.compile(rb'^\{\s*"version":\s*(\d+)')
+
+
+class JsonFileBackend(StorageBackend):
+    """
+    One JSON file per entity:
+
+        data/learners/ab/cd/{user_id}.json   (+ .log / .audit.log, see below)
+        data/plans/ab/cd/{plan_id}.json      (+ .revisions.log)
+        data/question_banks/ab/cd/{syllabus_id}.json
+        data/question_store/ab/cd/{key}.json (questions shared by banks)
+        data/bank_status/{syllabus_id}.json  (banks that failed to build)
+
+    sharded by hash prefix, with an index.txt per directory for
+    listing (see sharding).
+
+    Writes are atomic and serialized per file (see file_io).
+    Learner states and plans are written in the compact encoding
+    (see codec); older pretty-printed files still load.
+    """
+
+    LEARNER_PATH = "data/learners"
+    PLAN_PATH = "data/plans"
+    BANK_PATH = "data/question_banks"
+    TOPIC_INDEX_PATH = "data/topic_index"
+    BANK_STATUS_PATH = "data/bank_status"
+    SHARED_PATH = "data/question_store"
+
+    # Inverted topic index is split over this many files by hash
+    TOPIC_INDEX_SHARDS = 16
+
+    def __init__(
+        self,
+        learner_path: str = LEARNER_PATH,
+        plan_path: str = PLAN_PATH,
+        bank_path: str = BANK_PATH,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        topic_index_path: str = TOPIC_INDEX_PATH,
+        bank_status_path: str = BANK_STATUS_PATH,
+        shared_path: str = SHARED_PATH
+    ):
+        self.learner_path = learner_path
+        self.plan_path = plan_path
+        self.bank_path = bank_path
+        self.snapshot_every = snapshot_every
+        self.topic_index_path = topic_index_path
+        self.bank_status_path = bank_status_path
+        self.shared_path = shared_path
+
+        # Parsed bank offset indexes, keyed by bank file token
+        self._bank_indexes = DocumentCache("bank_indexes", copy=False)
+        self._topic_index = DocumentCache("topic_index", copy=False)
+
+    # -------------------------------------------------------
+    # PRIVATE: File helpers
+    # -------------------------------------------------------
+    @staticmethod
+    def _file(base: str, entity_id: str) -> str:
+        """
+        Sharded path of the entity's main file. Files still in the
+        old flat layout (before scripts/shard_data_dirs.py) are
+        used where they are. Lookups create nothing — writers call
+        _ensure_dir first, so reading an unknown id leaves no
+        empty shard directories behind.
+        """
+        path = shard_path(base, entity_id)
+        if os.path.exists(path):
+            return path
+
+        flat = flat_path(base, entity_id)
+        if os.path.exists(flat):
+            return flat
+
+        return path
+
+    @staticmethod
+    def _ensure_dir(path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    @staticmethod
+    def _iter_ids(base: str):
+        return iter_ids(base)
+
+    # -------------------------------------------------------
+    # LEARNERS  (snapshot + append-only delta log)
+    #
+    #   {user_id}.json       snapshot, "version" is its first key
+    #   {user_id}.log        events since the snapshot (JSONL)
+    #   {user_id}.audit.log  events already folded into a snapshot
+    #
+    # A partial update appends one small event — O(changed topics)
+    # — and every snapshot_every events the log is folded back
+    # into the snapshot. Loads replay the log tail.
+    # -------------------------------------------------------
+    def _learner_files(self, user_id: str) -> tuple:
+        snapshot = self._file(self.learner_path, user_id)
+        base = snapshot[:-len(".json")]
+        return snapshot, f"{base}.log", f"{base}.audit.log"
+
+    @staticmethod
+    def _snapshot_version(snapshot: str) -> int:
+        # Snapshots we write start with {"version": N — read just that
+        try:
+            with open(snapshot, "rb") as f:
+                head = f.read(64)
+        except FileNotFoundError:
+            return 0
+
+        match = _VERSION_PREFIX.match(head)
+        if match:
+            return int(match.group(1))
+
+        # Legacy file: version (if any) is somewhere inside
+        return (read_json(snapshot) or {}).get("version", 0)
+
+    @staticmethod
+    def _write_snapshot(snapshot: str, state: dict, version: int):
+        document = encode_learner(dict(state, version=version))
+        atomic_write_json(snapshot, document, default=json_default, **COMPACT_DUMP)
+
+    def _current_version(self, snapshot: str, log: str) -> int:
+        last = last_event(log)
+        return max(self._snapshot_version(snapshot), last["v"] if last else 0)
+
+    @staticmethod
+    def _check_version(snapshot: str, expected_version, current: int):
+        if expected_version is not None and expected_version != current:
+            raise VersionConflict(snapshot, expected_version, current)
+
+    def learner_token(self, user_id: str):
+        snapshot, log, _ = self._learner_files(user_id)
+        snapshot_token = file_token(snapshot)
+
+        if snapshot_token is None:
+            return None
+
+        return (snapshot_token, file_token(log))
+
+    def load_learner(self, user_id: str) -> tuple:
+        snapshot, log, _ = self._learner_files(user_id)
+
+        # Log first, snapshot second: a compaction in between gives
+        # old log + new snapshot, and those events are skipped below
+        events, log_token = read_events(log)
+        state, snapshot_token = read_json_with_token(snapshot)
+
+        if state is None:
+            return None, None
+
+        state = decode_learner(state)
+        version = state.get("version", 0)
+
+        for event in events:
+            if event["v"] <= version:
+                continue
+            apply_learner_patch(state, event["patch"])
+            version = event["v"]
+
+        state["version"] = version
+        return state, (snapshot_token, log_token)
+
+    def save_learner(self, user_id, state, expected_version=None) -> int:
+        snapshot, log, audit = self._learner_files(user_id)
+        self._ensure_dir(snapshot)
+
+        with file_lock(snapshot):
+            current = self._current_version(snapshot, log)
+            self._check_version(snapshot, expected_version, current)
+
+            created = not os.path.exists(snapshot)
+            new_version = current + 1
+            self._write_snapshot(snapshot, state, new_version)
+
+            # Snapshot first: if we crash before the log is cleared,
+            # its events are older than the snapshot and get skipped
+            archive_and_truncate(log, audit)
+            append_event(audit, {
+                "v": new_version,
+                "ts": datetime.utcnow().isoformat(),
+                "event": "save",
+                "state": {k: v for k, v in state.items() if k != "version"}
+            }, default=json_default)
+
+        if created:
+            register_id(self.learner_path, user_id)
+
+        state["version"] = new_version
+        return new_version
+
+    def patch_learner(self, user_id, patch, expected_version=None,
+                      event: str = "update") -> int:
+        snapshot, log, audit = self._learner_files(user_id)
+        self._ensure_dir(snapshot)
+
+        with file_lock(snapshot):
+            snapshot_version = self._snapshot_version(snapshot)
+            last = last_event(log)
+            current = max(snapshot_version, last["v"] if last else 0)
+            self._check_version(snapshot, expected_version, current)
+
+            new_version = current + 1
+
+            if not os.path.exists(snapshot):
+                # Nothing to replay onto yet — start from a snapshot
+                state = apply_learner_patch(None, patch)
+                self._write_snapshot(snapshot, state, new_version)
+                append_event(audit, {
+                    "v": new_version,
+                    "ts": datetime.utcnow().isoformat(),
+                    "event": event,
+                    "state": state
+                }, default=json_default)
+                register_id(self.learner_path, user_id)
+                return new_version
+
+            append_event(log, {
+                "v": new_version,
+                "ts": datetime.utcnow().isoformat(),
+                "event": event,
+                "patch": patch
+            }, default=json_default)
+
+            if new_version - snapshot_version >= self.snapshot_every:
+                self._compact(user_id)
+
+        return new_version
+
+    def _compact(self, user_id: str):
+        """
+        Fold the log into a fresh snapshot. Caller holds the lock.
+        """
+        snapshot, log, audit = self._learner_files(user_id)
+
+        state, _ = self.load_learner(user_id)
+        self._write_snapshot(snapshot, state, state["version"])
+        archive_and_truncate(log, audit)
+
+    def iter_learner_events(self, user_id: str):
+        _, log, audit = self._learner_files(user_id)
+
+        archived, _ = read_events(audit)
+        pending, _ = read_events(log)
+
+        # A crash between archiving and truncating can duplicate events
+        seen = set()
+        for event in archived + pending:
+            if event["v"] not in seen:
+                seen.add(event["v"])
+                yield event
+
+    def iter_learner_ids(self):
+        return self._iter_ids(self.learner_path)
+
+    # -------------------------------------------------------
+    # PLANS
+    #
+    #   {plan_id}.json            current plan (what load_plan reads)
+    #   {plan_id}.revisions.log   one revision record per save:
+    #                             keyframes + day-level deltas
+    # -------------------------------------------------------
+    def _revisions_file(self, plan_id: str) -> str:
+        return self._file(self.plan_path, plan_id)[:-len(".json")] + ".revisions.log"
+
+    def plan_token(self, plan_id: str):
+        return file_token(self._file(self.plan_path, plan_id))
+
+    def load_plan(self, plan_id: str) -> tuple:
+        document, token = read_json_with_token(self._file(self.plan_path, plan_id))
+        return (decode_plan(document) if document else None), token
+
+    def save_plan(self, plan_id, document, expected_version=None) -> int:
+        path = self._ensure_dir(self._file(self.plan_path, plan_id))
+        revisions = self._revisions_file(plan_id)
+        created = []
+
+        def _update(current):
+            # Runs under the plan lock, before the plan is replaced
+            previous = decode_plan(current) if current else None
+            version = (current or {}).get("version", 0) + 1
+            last = last_event(revisions)
+
+            record = make_plan_revision(
+                previous, document, version, last["base"] if last else None
+            )
+            if "full" in record:
+                record["full"] = encode_plan(record["full"])
+
+            append_event(revisions, record, default=json_default)
+            if current is None:
+                created.append(plan_id)
+            return encode_plan(document)
+
+        new_version = versioned_update_json(
+            path,
+            _update,
+            expected_version=expected_version,
+            default=json_default,
+            **COMPACT_DUMP
+        )
+        if created:
+            register_id(self.plan_path, plan_id)
+
+        document["version"] = new_version
+        return new_version
+
+    def iter_plan_revisions(self, plan_id: str):
+        records, _ = read_events(self._revisions_file(plan_id))
+
+        for record in records:
+            if "full" in record:
+                record["full"] = decode_plan(record["full"])
+            yield record
+
+    def load_plan_revision(self, plan_id: str, version: int) -> dict | None:
+        return materialize_plan_revision(
+            list(self.iter_plan_revisions(plan_id)), version
+        )
+
+    def iter_plan_ids(self):
+        return self._iter_ids(self.plan_path)
+
+    # -------------------------------------------------------
+    # QUESTION BANKS
+    #
+    #   {syllabus_id}.json       one topic per line (still plain JSON)
+    #   {syllabus_id}.idx        {"token": [...], "topics": {topic: [offset, length]}}
+    #   {syllabus_id}.topicmap   {"token": [...], "map": {syllabus topic: bank key}}
+    #
+    # load_bank_topics seeks straight to the requested topics,
+    # so a micro test reads ~10 records whatever the bank size.
+    # The index is only trusted for the exact file it was built
+    # against (token); older banks are rewritten once on first use.
+    # -------------------------------------------------------
+    @staticmethod
+    def _bank_index_file(path: str) -> str:
+        return path[:-len(".json")] + ".idx"
+
+    @staticmethod
+    def _topic_map_file(path: str) -> str:
+        return path[:-len(".json")] + ".topicmap"
+
+    def _bank_index(self, syllabus_id: str, path: str, token) -> dict | None:
+        index = self._bank_indexes.get(syllabus_id, token)
+        if index is not None:
+            return index
+
+        index = read_json(self._bank_index_file(path))
+        if index is None or tuple(index.get("token", ())) != token:
+            return None
+
+        self._bank_indexes.put(syllabus_id, token, index)
+        return index
+
+    def load_bank(self, syllabus_id: str) -> dict | None:
+        return read_json(self._file(self.bank_path, syllabus_id))
+
+    def load_bank_topics(self, syllabus_id: str, topic_names: list) -> dict:
+        path = self._file(self.bank_path, syllabus_id)
+
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return {}
+
+        with f:
+            st = os.fstat(f.fileno())
+            token = (st.st_ino, st.st_mtime_ns, st.st_size)
+            index = self._bank_index(syllabus_id, path, token)
+
+            if index is not None:
+                found = {}
+                offsets = index["topics"]
+
+                # In file order, so reads move forward only
+                wanted = sorted(
+                    (offsets[t], t) for t in set(topic_names) if t in offsets
+                )
+                for (offset, length), topic in wanted:
+                    f.seek(offset)
+                    found[topic] = json.loads(f.read(length))
+
+                return {t: found[t] for t in topic_names if t in found}
+
+            bank = json.loads(f.read())
+
+        # Pre-index bank: upgrade it so the next read can seek —
+        # unless a writer replaced it meanwhile (stale copy)
+        with file_lock(path):
+            if file_token(path) == token:
+                self._write_bank(syllabus_id, path, bank)
+
+        return {t: bank[t] for t in topic_names if t in bank}
+
+    def bank_topic_count(self, syllabus_id: str) -> int | None:
+        path = self._file(self.bank_path, syllabus_id)
+        token = file_token(path)
+
+        if token is None:
+            return None
+
+        index = self._bank_index(syllabus_id, path, token)
+        if index is not None:
+            return len(index["topics"])
+
+        return len(read_json(path) or {})
+
+    def bank_topic_keys(self, syllabus_id: str) -> list:
+        path = self._file(self.bank_path, syllabus_id)
+        token = file_token(path)
+
+        if token is None:
+            return []
+
+        index = self._bank_index(syllabus_id, path, token)
+        if index is not None:
+            return list(index["topics"])
+
+        return list(read_json(path) or {})
+
+    def load_topic_map(self, syllabus_id: str) -> tuple:
+        path = self._file(self.bank_path, syllabus_id)
+        token = file_token(path)
+
+        if token is None:
+            return {}, None
+
+        stored = read_json(self._topic_map_file(path))
+        if stored is None or tuple(stored.get("token", ())) != token:
+            return {}, token
+
+        return stored["map"], token
+
+    def save_topic_map(self, syllabus_id: str, mapping: dict, token):
+        if token is None:
+            return
+
+        path = self._ensure_dir(self._file(self.bank_path, syllabus_id))
+        atomic_write_json(
+            self._topic_map_file(path),
+            {"token": list(token), "map": mapping},
+            **COMPACT_DUMP
+        )
+
+    def save_bank(self, syllabus_id: str, bank: dict):
+        path = self._ensure_dir(self._file(self.bank_path, syllabus_id))
+
+        with file_lock(path):
+            self._write_bank(syllabus_id, path, bank)
+
+    def _write_bank(self, syllabus_id: str, path: str, bank: dict):
+        """
+        Bank file + offset index + topic index. Caller holds the
+        bank's lock, so an index upgrade never overwrites a newer
+        bank with the copy it read.
+        """
+        created = not os.path.exists(path)
+
+        # Keys the topic index already holds for this bank
+        previous = self.bank_topic_keys(syllabus_id)
+
+        offsets, token = atomic_write_json_records(
+            path, bank, separators=(",", ":")
+        )
+        atomic_write_json(
+            self._bank_index_file(path),
+            {"token": token, "topics": offsets},
+            **COMPACT_DUMP
+        )
+        self._bank_indexes.put(syllabus_id, token, {"token": token, "topics": offsets})
+
+        self._index_bank_topics(syllabus_id, bank, previous)
+
+        if created:
+            register_id(self.bank_path, syllabus_id)
+
+    def iter_bank_ids(self):
+        return self._iter_ids(self.bank_path)
+
+    # -------------------------------------------------------
+    # SHARED QUESTION STORE  (content-addressed, one file per key)
+    #
+    # Keys are hashes of (domain, topic), so every syllabus with
+    # the same topic reads the same file. A key is written once
+    # and never replaced — other syllabuses' banks reference it —
+    # so no locking is needed.
+    # -------------------------------------------------------
+    def load_shared_questions(self, keys: list) -> dict:
+        found = {}
+        for key in dict.fromkeys(keys):
+            questions = read_json(shard_path(self.shared_path, key))
+            if questions is not None:
+                found[key] = questions
+        return found
+
+    def save_shared_questions(self, entries: dict):
+        for key, questions in entries.items():
+            path = shard_path(self.shared_path, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_create_json(path, questions, default=json_default, **COMPACT_DUMP)
+
+    # -------------------------------------------------------
+    # BANK STATUS  (only failed / pending banks)
+    #
+    #   data/bank_status/{syllabus_id}.json
+    #
+    # One small file per syllabus with its own lock, so build
+    # outcomes and top-ups of different banks never wait on each
+    # other. The directory only holds pending statuses, so the
+    # retry job lists it cheaply. A single bank_status.json from
+    # older versions is split up on first use.
+    # -------------------------------------------------------
+    def _status_file(self, syllabus_id: str) -> str:
+        return os.path.join(self.bank_status_path, f"{syllabus_id}.json")
+
+    def _split_legacy_statuses(self):
+        legacy = f"{self.bank_status_path}.json"
+        if not os.path.exists(legacy):
+            return
+
+        os.makedirs(self.bank_status_path, exist_ok=True)
+
+        with file_lock(legacy):
+            for syllabus_id, status in (read_json(legacy) or {}).items():
+                atomic_create_json(self._status_file(syllabus_id), status, indent=2)
+            if os.path.exists(legacy):
+                os.replace(legacy, f"{legacy}.migrated")
+
+    def load_bank_status(self, syllabus_id: str) -> dict | None:
+        self._split_legacy_statuses()
+        return read_json(self._status_file(syllabus_id))
+
+    def save_bank_status(self, syllabus_id: str, status: dict | None):
+        self.update_bank_status(syllabus_id, lambda current: status)
+
+    def update_bank_status(self, syllabus_id: str, update) -> dict | None:
+        self._split_legacy_statuses()
+        os.makedirs(self.bank_status_path, exist_ok=True)
+        path = self._status_file(syllabus_id)
+
+        with file_lock(path):
+            status = update(read_json(path))
+
+            if status is None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            else:
+                atomic_write_json(path, status, indent=2)
+
+        return status
+
+    def iter_bank_statuses(self):
+        self._split_legacy_statuses()
+        if not os.path.isdir(self.bank_status_path):
+            return
+
+        with os.scandir(self.bank_status_path) as entries:
+            names = [e.name for e in entries if e.name.endswith(".json") and not e.name.startswith(".")]
+
+        for name in names:
+            status = read_json(os.path.join(self.bank_status_path, name))
+            if status is not None:
+                yield name[:-len(".json")], status
+
+    # -------------------------------------------------------
+    # TOPIC INDEX  (normalized topic → {syllabus_id: bank key})
+    #
+    #   data/topic_index/{0-f}.json
+    #
+    # Maintained by save_bank, which rewrites only the shards
+    # whose topics changed; the daily quiz resolves a topic with
+    # one small (cached) file read instead of opening every bank
+    # the user has.
+    # -------------------------------------------------------
+    def _topic_shard(self, normalized: str) -> str:
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        shard = int(digest[:4], 16) % self.TOPIC_INDEX_SHARDS
+        return os.path.join(self.topic_index_path, f"{shard:x}.json")
+
+    def _read_topic_shard(self, path: str) -> dict:
+        token = file_token(path)
+        if token is None:
+            return {}
+
+        entries = self._topic_index.get(path, token)
+        if entries is None:
+            entries, token = read_json_with_token(path)
+            entries = entries or {}
+            self._topic_index.put(path, token, entries)
+
+        return entries
+
+    @staticmethod
+    def _topic_keys(keys) -> dict:
+        # { normalized: bank key } — the last key wins, as in the index
+        return {normalize_topic(key): key for key in keys}
+
+    def _index_bank_topics(self, syllabus_id: str, bank: dict,
+                           previous: list | None = None):
+        """
+        Point the index at this bank's keys. With previous (the
+        keys of the bank being replaced) only the shards of added,
+        renamed or removed topics are locked and rewritten — a
+        save that changes no keys touches none. None (backfill)
+        checks every shard.
+        """
+        mine = self._topic_keys(bank)
+
+        if previous is None:
+            shards = [
+                os.path.join(self.topic_index_path, f"{shard:x}.json")
+                for shard in range(self.TOPIC_INDEX_SHARDS)
+            ]
+        else:
+            before = self._topic_keys(previous)
+            moved = {
+                normalized for normalized in mine.keys() | before.keys()
+                if mine.get(normalized) != before.get(normalized)
+            }
+            shards = sorted({self._topic_shard(normalized) for normalized in moved})
+
+        if not shards:
+            return
+
+        os.makedirs(self.topic_index_path, exist_ok=True)
+
+        wanted = {}
+        for normalized, key in mine.items():
+            wanted.setdefault(self._topic_shard(normalized), {})[normalized] = key
+
+        for path in shards:
+            mine_here = wanted.get(path, {})
+
+            with file_lock(path):
+                entries = read_json(path) or {}
+                changed = False
+
+                # Drop topics this syllabus no longer has
+                for normalized, owners in list(entries.items()):
+                    if syllabus_id in owners and normalized not in mine_here:
+                        del owners[syllabus_id]
+                        if not owners:
+                            del entries[normalized]
+                        changed = True
+
+                for normalized, key in mine_here.items():
+                    owners = entries.setdefault(normalized, {})
+                    if owners.get(syllabus_id) != key:
+                        owners[syllabus_id] = key
+                        changed = True
+
+                if changed:
+                    atomic_write_json(path, entries, **COMPACT_DUMP)
+
+    def _ensure_topic_index(self):
+        # First use on an install whose banks predate the index
+        marker = os.path.join(self.topic_index_path, ".backfilled")
+        if os.path.exists(marker):
+            return
+
+        os.makedirs(self.topic_index_path, exist_ok=True)
+
+        for syllabus_id in list(self.iter_bank_ids()):
+            self._index_bank_topics(syllabus_id, self.load_bank(syllabus_id) or {})
+
+        open(marker, "w").close()
+
+    def find_bank_topics(self, topic_names: list, syllabus_ids: list | None = None) -> dict:
+        self._ensure_topic_index()
+
+        entries = {}
+        for topic in topic_names:
+            normalized = normalize_topic(topic)
+            shard = self._read_topic_shard(self._topic_shard(normalized))
+            if normalized in shard:
+                entries[normalized] = shard[normalized]
+
+        return pick_bank_topics(entries, topic_names, syllabus_ids)
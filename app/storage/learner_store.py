@@ -1,33 +1,57 @@
-import json
-import os
+import pickle
+import random
+import time
 from datetime import datetime
 
-BASE_PATH = "data/learners"
+from app.storage.backend import diff_learner_state, get_backend, is_empty_patch
+from app.storage.cache import DocumentCache
+from app.storage.file_io import VersionConflict
 
+# How many times a compare-and-swap update re-reads and
+# retries before giving up on a heavily contended user.
+MAX_CAS_RETRIES = 10
 
-def _ensure_dir():
-    os.makedirs(BASE_PATH, exist_ok=True)
+# Base of the jittered exponential wait between retries (seconds),
+# so contending writers stop colliding in lockstep
+CAS_BACKOFF = 0.002
+
+# Parsed learner states, revalidated against the backend on every read
+_cache = DocumentCache("learners")
+
+
+def _clone(state: dict) -> dict:
+    return pickle.loads(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
 
 
 # --------------------------------------------------
 # SAVE
 # --------------------------------------------------
-def save_learner_state(user_id: str, learner_state: dict):
+def save_learner_state(
+    user_id: str,
+    learner_state: dict,
+    expected_version: int | None = None
+) -> int:
     """
-    Persist learner state to JSON file.
+    Persist learner state through the storage backend.
     Called after every familiarity test + daily update.
+
+    Writes are atomic and serialized per user. Every save bumps
+    learner_state["version"]. Pass expected_version to make it a
+    compare-and-swap: VersionConflict is raised if someone else
+    saved first.
+
+    Returns the new version.
     """
-    _ensure_dir()
-    path = os.path.join(BASE_PATH, f"{user_id}.json")
+    version = get_backend().save_learner(
+        user_id,
+        learner_state,
+        expected_version=expected_version
+    )
 
-    # datetime objects are not JSON serializable — convert to string
-    def _serialize(obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        raise TypeError(f"Type {type(obj)} not serializable")
+    # The token changed anyway — just free the stale entry
+    _cache.invalidate(user_id)
 
-    with open(path, "w") as f:
-        json.dump(learner_state, f, indent=2, default=_serialize)
+    return version
 
 
 # --------------------------------------------------
@@ -35,16 +59,30 @@ def save_learner_state(user_id: str, learner_state: dict):
 # --------------------------------------------------
 def load_learner_state(user_id: str) -> dict | None:
     """
-    Load learner state from JSON file.
+    Load learner state through the storage backend.
     Returns None if no state exists yet.
+
+    Served from the process-local cache when the stored state
+    has not changed since it was last parsed. Always returns a
+    private copy, safe to mutate.
     """
-    path = os.path.join(BASE_PATH, f"{user_id}.json")
+    backend = get_backend()
+    token = backend.learner_token(user_id)
 
-    if not os.path.exists(path):
+    if token is None:
+        _cache.invalidate(user_id)
         return None
 
-    with open(path, "r") as f:
-        return json.load(f)
+    cached = _cache.get(user_id, token)
+    if cached is not None:
+        return cached
+
+    state, token = backend.load_learner(user_id)
+
+    if state is not None:
+        _cache.put(user_id, token, state)
+
+    return state
 
 
 # --------------------------------------------------
@@ -69,6 +107,76 @@ def create_learner_state(user_id, learner_state: dict):
     save_learner_state(str(user_id), learner_state)
 
 
+# --------------------------------------------------
+# MODIFY  (read-modify-write with compare-and-swap)
+# --------------------------------------------------
+def modify_learner_state(user_id, mutator, event: str = "update") -> dict:
+    """
+    Safely apply mutator to the stored learner state.
+
+    mutator(state) receives the freshly loaded state (or None
+    if the user has none yet) and returns the state to save.
+    If another request or worker saved in between, the write
+    is rejected and mutator runs again on the newer state —
+    so concurrent submits never silently lose an update.
+
+    mutator may run more than once; it must not have side
+    effects beyond building the returned state.
+
+    event names the change in the learner's audit trail
+    (e.g. "micro_test", "study_session").
+    """
+    user_id = str(user_id)
+    last_conflict = None
+
+    for attempt in range(MAX_CAS_RETRIES):
+        original = load_learner_state(user_id)
+        expected_version = (original or {}).get("version", 0)
+
+        new_state = mutator(_clone(original) if original else None)
+
+        try:
+            if original is None:
+                save_learner_state(
+                    user_id,
+                    new_state,
+                    expected_version=expected_version
+                )
+                return new_state
+
+            # Only ship what changed — the backend can then update
+            # just those topics instead of the whole document
+            patch = diff_learner_state(original, new_state)
+
+            if is_empty_patch(patch):
+                return new_state
+
+            new_state["version"] = get_backend().patch_learner(
+                user_id,
+                patch,
+                expected_version=expected_version,
+                event=event
+            )
+            _cache.invalidate(user_id)
+            return new_state
+
+        except VersionConflict as e:
+            last_conflict = e
+            time.sleep(random.uniform(0, CAS_BACKOFF * 2 ** attempt))
+
+    raise last_conflict
+
+
+# --------------------------------------------------
+# CACHE STATS
+# --------------------------------------------------
+def learner_cache_stats() -> dict:
+    """
+    Hit/miss counters of the learner state cache (this process).
+    """
+    return _cache.stats()
+
+
 # --------------------------------------------------
 # UPDATE TOPIC STATES  (partial update helper)
 # --------------------------------------------------
@@ -78,32 +186,35 @@ def update_topic_states(user_id: str, topic_scores: dict):
     Used after familiarity tests so we never overwrite
     unrelated topic states.
     """
-    state = load_learner_state(user_id) or {"topic_states": {}}
 
-    if "topic_states" not in state:
-        state["topic_states"] = {}
+    def _merge(state):
+        state = state or {"topic_states": {}}
 
-    for topic, score in topic_scores.items():
-        existing = state["topic_states"].get(topic, {})
-        attempts = existing.get("attempts", 0)
-        old_familiarity = existing.get("familiarity", 0.0)
+        if "topic_states" not in state:
+            state["topic_states"] = {}
 
-        # Running mean update
-        new_familiarity = (
-            old_familiarity * attempts + score
-        ) / (attempts + 1)
+        for topic, score in topic_scores.items():
+            existing = state["topic_states"].get(topic, {})
+            attempts = existing.get("attempts", 0)
+            old_familiarity = existing.get("familiarity", 0.0)
 
-        state["topic_states"][topic] = {
-            "familiarity": round(new_familiarity, 3),
-            "confidence": round(new_familiarity, 3),
-            "retention": existing.get("retention", 1.0),
-            "attempts": attempts + 1,
-            "revision_due": new_familiarity < 0.5,
-            "last_updated": datetime.utcnow().isoformat()
-        }
+            # Running mean update
+            new_familiarity = (
+                old_familiarity * attempts + score
+            ) / (attempts + 1)
 
-    save_learner_state(user_id, state)
-    return state
+            state["topic_states"][topic] = {
+                "familiarity": round(new_familiarity, 3),
+                "confidence": round(new_familiarity, 3),
+                "retention": existing.get("retention", 1.0),
+                "attempts": attempts + 1,
+                "revision_due": new_familiarity < 0.5,
+                "last_updated": datetime.utcnow().isoformat()
+            }
+
+        return state
+
+    return modify_learner_state(user_id, _merge, event="topic_scores")
 
 
 # --------------------------------------------------
@@ -114,12 +225,16 @@ def mark_unit_as_tested(user_id: str, unit_number: int):
     Record that a unit has been properly tested via micro test.
     This replaces the self-rating flag for that unit.
     """
-    state = load_learner_state(user_id) or {}
 
-    tested_units = state.get("tested_units", [])
+    def _mark(state):
+        state = state or {}
+
+        tested_units = state.get("tested_units", [])
+
+        if unit_number not in tested_units:
+            tested_units.append(unit_number)
 
-    if unit_number not in tested_units:
-        tested_units.append(unit_number)
+        state["tested_units"] = tested_units
+        return state
 
-    state["tested_units"] = tested_units
-    save_learner_state(user_id, state)
\ No newline at end of file
+    modify_learner_state(user_id, _mark, event="unit_tested")
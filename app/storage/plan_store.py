@@ -1,36 +1,32 @@
-import json
-import os
 from datetime import datetime
-from bson import ObjectId
 
-BASE_PATH = "data/plans"
+from app.storage.backend import diff_plan, get_backend
+from app.storage.cache import DocumentCache
 
-
-def _ensure_dir():
-    os.makedirs(BASE_PATH, exist_ok=True)
-
-
-def _serialize(obj):
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    raise TypeError(f"Type {type(obj)} not serializable")
+# Parsed plan documents, revalidated against the backend on every read
+_cache = DocumentCache("plans")
 
 
 # --------------------------------------------------
 # SAVE  (returns plan_id)
 # --------------------------------------------------
-def save_plan(user_id, plan: dict, metadata: dict = None) -> str:
+def save_plan(
+    user_id,
+    plan: dict,
+    metadata: dict = None,
+    expected_version: int | None = None
+) -> str:
     """
     Save a study plan and return its plan_id.
     plan_id = user_id so one active plan per user for now.
     metadata: optional dict with hours_per_day, deadline_days, generated_at
-    """
-    _ensure_dir()
 
+    Written atomically through the storage backend;
+    document["version"] is bumped on every save. expected_version
+    turns the save into a compare-and-swap (raises VersionConflict
+    on mismatch).
+    """
     plan_id = str(user_id)
-    path = os.path.join(BASE_PATH, f"{plan_id}.json")
 
     document = {
         "plan_id": plan_id,
@@ -43,12 +39,37 @@ def save_plan(user_id, plan: dict, metadata: dict = None) -> str:
         )
     }
 
-    with open(path, "w") as f:
-        json.dump(document, f, indent=2, default=_serialize)
+    get_backend().save_plan(
+        plan_id,
+        document,
+        expected_version=expected_version
+    )
+
+    _cache.invalidate(plan_id)
 
     return plan_id
 
 
+def _load_document(plan_id: str) -> dict | None:
+    backend = get_backend()
+    token = backend.plan_token(plan_id)
+
+    if token is None:
+        _cache.invalidate(plan_id)
+        return None
+
+    cached = _cache.get(plan_id, token)
+    if cached is not None:
+        return cached
+
+    document, token = backend.load_plan(plan_id)
+
+    if document is not None:
+        _cache.put(plan_id, token, document)
+
+    return document
+
+
 # --------------------------------------------------
 # GET BY PLAN ID
 # --------------------------------------------------
@@ -58,14 +79,11 @@ def get_study_plan(plan_id: str, user_id: str) -> dict | None:
     Validates that it belongs to user_id.
     Returns None if not found or unauthorized.
     """
-    path = os.path.join(BASE_PATH, f"{plan_id}.json")
+    document = _load_document(plan_id)
 
-    if not os.path.exists(path):
+    if document is None:
         return None
 
-    with open(path, "r") as f:
-        document = json.load(f)
-
     # ownership check
     if str(document.get("user_id")) != str(user_id):
         return None
@@ -80,4 +98,105 @@ def load_plan(user_id: str) -> dict | None:
     """
     Load the current plan for a user.
     """
-    return get_study_plan(str(user_id), str(user_id))
\ No newline at end of file
+    return get_study_plan(str(user_id), str(user_id))
+
+
+# --------------------------------------------------
+# REVISIONS  (every save_plan is one revision)
+# --------------------------------------------------
+def list_plan_revisions(user_id: str) -> list:
+    """
+    Every stored revision of the user's plan, oldest first:
+    [{"version", "saved_at", "keyframe", "days_changed"}]
+    """
+    revisions = []
+
+    for record in get_backend().iter_plan_revisions(str(user_id)):
+        delta = record.get("delta", {})
+        revisions.append({
+            "version": record["v"],
+            "saved_at": record["ts"],
+            "keyframe": "full" in record,
+            "days_changed": (
+                len(delta.get("days", {})) + len(delta.get("removed_days", []))
+                if "delta" in record else None
+            )
+        })
+
+    return revisions
+
+
+def load_plan_revision(user_id: str, version: int) -> dict | None:
+    """
+    The user's plan document as it was at version.
+    """
+    return get_backend().load_plan_revision(str(user_id), version)
+
+
+def diff_plan_revisions(user_id: str, from_version: int, to_version: int) -> dict | None:
+    """
+    What changed between two revisions, day by day.
+    None if either revision does not exist.
+    """
+    old = load_plan_revision(user_id, from_version)
+    new = load_plan_revision(user_id, to_version)
+
+    if old is None or new is None:
+        return None
+
+    delta = diff_plan(old, new)
+    old_schedule = old["plan"].get("schedule", {})
+
+    changed_fields = dict(delta.get("fields", {}))
+    changed_fields.update(delta.get("plan_fields", {}))
+    removed_fields = delta.get("removed_fields", []) + delta.get("removed_plan_fields", [])
+
+    return {
+        "from": from_version,
+        "to": to_version,
+        "days_added": [d for d in delta.get("days", {}) if d not in old_schedule],
+        "days_removed": delta.get("removed_days", []),
+        "days_changed": {
+            day: {"before": old_schedule[day], "after": entries}
+            for day, entries in delta.get("days", {}).items()
+            if day in old_schedule
+        },
+        "fields_changed": {
+            key: {
+                "before": old.get(key, old["plan"].get(key)),
+                "after": new.get(key, new["plan"].get(key))
+            }
+            for key in list(changed_fields) + removed_fields
+        }
+    }
+
+
+def restore_plan_revision(user_id: str, version: int) -> str | None:
+    """
+    Roll back a bad regeneration: save revision version again as
+    the newest revision. Returns plan_id, or None if not found.
+    """
+    document = load_plan_revision(user_id, version)
+
+    if document is None:
+        return None
+
+    return save_plan(
+        user_id,
+        document["plan"],
+        metadata={
+            "hours_per_day": document.get("hours_per_day"),
+            "deadline_days": document.get("deadline_days"),
+            "generated_at": document.get("created_at")
+        }
+    )
+
+
+# --------------------------------------------------
+# CACHE STATS
+# --------------------------------------------------
+def plan_cache_stats() -> dict:
+    """
+    Hit/miss counters of the plan cache (this process).
+    """
+    return _cache.stats()
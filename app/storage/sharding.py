@@ -0,0 +1,127 @@
+import hashlib
+import os
+import tempfile
+
+# --------------------------------------------------
+# Hash-prefix sharding for the JSON data directories.
+#
+#   data/learners/ab/cd/{user_id}.json
+#
+# ab/cd are the first four hex digits of sha1(id) — ObjectIds
+# start with a timestamp, so they are hashed to spread evenly.
+# Two levels of 256 give 65,536 leaf directories: ~15 files
+# each at a million users.
+#
+# Each data directory also keeps index.txt, one id per line,
+# appended when an entity is first written. Listing ids reads
+# the index instead of walking every shard.
+# --------------------------------------------------
+
+INDEX_FILE = "index.txt"
+
+
+def shard_dir(base: str, entity_id: str) -> str:
+    digest = hashlib.sha1(entity_id.encode()).hexdigest()
+    return os.path.join(base, digest[:2], digest[2:4])
+
+
+def shard_path(base: str, entity_id: str, suffix: str = ".json") -> str:
+    return os.path.join(shard_dir(base, entity_id), f"{entity_id}{suffix}")
+
+
+def flat_path(base: str, entity_id: str, suffix: str = ".json") -> str:
+    """
+    Location in the old, unsharded layout.
+    """
+    return os.path.join(base, f"{entity_id}{suffix}")
+
+
+# --------------------------------------------------
+# INDEX
+# --------------------------------------------------
+def register_id(base: str, entity_id: str):
+    """
+    Record a newly created entity — call after its file exists.
+    One short O_APPEND write, so concurrent writers never
+    interleave; a duplicate line from a race is harmless
+    (iter_ids de-duplicates).
+    """
+    if not os.path.exists(os.path.join(base, INDEX_FILE)):
+        # First index in this directory — must include older files
+        rebuild_index(base)
+        return
+
+    fd = os.open(
+        os.path.join(base, INDEX_FILE),
+        os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+        0o644
+    )
+    try:
+        os.write(fd, f"{entity_id}\n".encode())
+    finally:
+        os.close(fd)
+
+
+def _scan_ids(base: str):
+    """
+    Every id with a .json file, flat or sharded. Slow on huge
+    trees — only used to (re)build the index.
+    """
+    with os.scandir(base) as entries:
+        for entry in entries:
+            name = entry.name
+
+            if entry.is_file():
+                if name.endswith(".json") and not name.startswith("."):
+                    yield name[:-len(".json")]
+
+            elif entry.is_dir() and len(name) == 2:
+                for root, _, files in os.walk(entry.path):
+                    for file_name in files:
+                        if file_name.endswith(".json") and not file_name.startswith("."):
+                            yield file_name[:-len(".json")]
+
+
+def rebuild_index(base: str) -> int:
+    """
+    Rewrite index.txt from what is on disk. Returns the id count.
+    """
+    if not os.path.isdir(base):
+        return 0
+
+    ids = sorted(set(_scan_ids(base)))
+
+    fd, tmp = tempfile.mkstemp(dir=base, prefix=".tmp-", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(f"{entity_id}\n" for entity_id in ids)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(base, INDEX_FILE))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    return len(ids)
+
+
+def iter_ids(base: str):
+    """
+    Stream every id in the data directory from its index,
+    building the index first if this directory has none.
+    """
+    if not os.path.isdir(base):
+        return
+
+    path = os.path.join(base, INDEX_FILE)
+    if not os.path.exists(path):
+        rebuild_index(base)
+
+    seen = set()
+    with open(path) as f:
+        for line in f:
+            entity_id = line.strip()
+            if entity_id and entity_id not in seen:
+                seen.add(entity_id)
+                yield entity_id
@@ -0,0 +1,581 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from app.storage.backend import (
+    StorageBackend,
+    json_default,
+    make_plan_revision,
+    materialize_plan_revision,
+    normalize_topic,
+    pick_bank_topics
+)
+from app.storage.codec import decode_plan, encode_plan
+from app.storage.file_io import VersionConflict
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS learners (
+    user_id  TEXT PRIMARY KEY,
+    version  INTEGER NOT NULL,
+    fields   TEXT NOT NULL              -- every top-level key except topic_states
+);
+
+CREATE TABLE IF NOT EXISTS learner_topics (
+    user_id  TEXT NOT NULL,
+    topic    TEXT NOT NULL,
+    position INTEGER NOT NULL,          -- keeps topic_states insertion order
+    state    TEXT NOT NULL,
+    PRIMARY KEY (user_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS learner_events (
+    user_id  TEXT NOT NULL,
+    version  INTEGER NOT NULL,
+    ts       TEXT NOT NULL,
+    event    TEXT NOT NULL,
+    body     TEXT NOT NULL,             -- {"patch": ...} or {"state": ...}
+    PRIMARY KEY (user_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id  TEXT PRIMARY KEY,
+    user_id  TEXT,
+    version  INTEGER NOT NULL,
+    document TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS plan_revisions (
+    plan_id  TEXT NOT NULL,
+    version  INTEGER NOT NULL,
+    base     INTEGER NOT NULL,          -- keyframe this revision builds on
+    record   TEXT NOT NULL,             -- make_plan_revision() record
+    PRIMARY KEY (plan_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS banks (
+    syllabus_id TEXT PRIMARY KEY,
+    topic_count INTEGER NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bank_topics (
+    syllabus_id TEXT NOT NULL,
+    topic       TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    questions   TEXT NOT NULL,
+    PRIMARY KEY (syllabus_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS bank_topic_index (
+    normalized  TEXT NOT NULL,          -- normalize_topic(topic)
+    syllabus_id TEXT NOT NULL,
+    topic       TEXT NOT NULL,          -- exact key in the bank
+    PRIMARY KEY (normalized, syllabus_id)
+);
+
+CREATE TABLE IF NOT EXISTS bank_topic_maps (
+    syllabus_id TEXT PRIMARY KEY,
+    token       TEXT NOT NULL,          -- banks.updated_at it was computed for
+    mapping     TEXT NOT NULL           -- {syllabus topic: bank key or null}
+);
+
+CREATE TABLE IF NOT EXISTS shared_questions (
+    key         TEXT PRIMARY KEY,       -- hash of (domain, topic)
+    questions   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bank_status (
+    syllabus_id TEXT PRIMARY KEY,       -- only banks that failed to build
+    status      TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=json_default)
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Single SQLite database (WAL mode) shared by all workers.
+
+    Learner states are stored one row per topic, so a partial
+    update (patch_learner) only rewrites the topics that changed,
+    inside one IMMEDIATE transaction that also checks and bumps
+    the version. Question banks are one row per topic, so
+    load_bank_topics never touches the rest of the bank.
+    """
+
+    DB_PATH = "data/storage.sqlite3"
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("SQLITE_PATH", self.DB_PATH)
+        self._local = threading.local()
+
+    # -------------------------------------------------------
+    # PRIVATE: Connection + transactions
+    # -------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that made them
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                isolation_level=None   # we issue BEGIN / COMMIT ourselves
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("normalize_topic", 1, normalize_topic, deterministic=True)
+            conn.executescript(SCHEMA)
+            self._backfill_topic_index(conn)
+            self._local.conn = conn
+
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode: str = "IMMEDIATE"):
+        """
+        IMMEDIATE takes the write lock up front so the version
+        check and the write cannot interleave with another worker.
+        DEFERRED gives readers a consistent snapshot.
+        """
+        conn = self._conn()
+        conn.execute(f"BEGIN {mode}")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _backfill_topic_index(conn):
+        # Databases created before the topic index existed
+        has_index = conn.execute("SELECT 1 FROM bank_topic_index LIMIT 1").fetchone()
+        has_banks = conn.execute("SELECT 1 FROM bank_topics LIMIT 1").fetchone()
+
+        if has_banks and not has_index:
+            conn.execute(
+                "INSERT OR REPLACE INTO bank_topic_index (normalized, syllabus_id, topic) "
+                "SELECT normalize_topic(topic), syllabus_id, topic FROM bank_topics"
+            )
+
+    def _check_version(self, conn, table, key_col, key, expected_version) -> int:
+        row = conn.execute(
+            f"SELECT version FROM {table} WHERE {key_col} = ?", (key,)
+        ).fetchone()
+        current = row[0] if row else 0
+
+        if expected_version is not None and expected_version != current:
+            raise VersionConflict(f"{table}/{key}", expected_version, current)
+
+        return current
+
+    @staticmethod
+    def _log_event(conn, user_id, version, event, body):
+        conn.execute(
+            "INSERT OR REPLACE INTO learner_events "
+            "(user_id, version, ts, event, body) VALUES (?, ?, ?, ?, ?)",
+            (user_id, version, datetime.utcnow().isoformat(), event, _dumps(body))
+        )
+
+    # -------------------------------------------------------
+    # LEARNERS
+    # -------------------------------------------------------
+    def learner_token(self, user_id: str):
+        row = self._conn().execute(
+            "SELECT version FROM learners WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return ("sqlite", row[0]) if row else None
+
+    def load_learner(self, user_id: str) -> tuple:
+        with self._transaction("DEFERRED") as conn:
+            row = conn.execute(
+                "SELECT version, fields FROM learners WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+
+            if row is None:
+                return None, None
+
+            topics = conn.execute(
+                "SELECT topic, state FROM learner_topics "
+                "WHERE user_id = ? ORDER BY position",
+                (user_id,)
+            ).fetchall()
+
+        version, fields = row
+        state = {"topic_states": {t: json.loads(s) for t, s in topics}}
+        state.update(json.loads(fields))
+        state["version"] = version
+
+        return state, ("sqlite", version)
+
+    def save_learner(self, user_id, state, expected_version=None) -> int:
+        fields = {k: v for k, v in state.items() if k not in ("topic_states", "version")}
+        topics = state.get("topic_states", {})
+
+        with self._transaction() as conn:
+            new_version = self._check_version(
+                conn, "learners", "user_id", user_id, expected_version
+            ) + 1
+
+            conn.execute(
+                "INSERT OR REPLACE INTO learners (user_id, version, fields) "
+                "VALUES (?, ?, ?)",
+                (user_id, new_version, _dumps(fields))
+            )
+            conn.execute("DELETE FROM learner_topics WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT INTO learner_topics (user_id, topic, position, state) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (user_id, topic, position, _dumps(topic_state))
+                    for position, (topic, topic_state) in enumerate(topics.items())
+                ]
+            )
+            self._log_event(conn, user_id, new_version, "save", {"state": fields | {
+                "topic_states": topics
+            }})
+
+        state["version"] = new_version
+        return new_version
+
+    def patch_learner(self, user_id, patch, expected_version=None,
+                      event: str = "update") -> int:
+        with self._transaction() as conn:
+            new_version = self._check_version(
+                conn, "learners", "user_id", user_id, expected_version
+            ) + 1
+
+            row = conn.execute(
+                "SELECT fields FROM learners WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            fields = json.loads(row[0]) if row else {}
+            fields.update(patch.get("fields", {}))
+            for key in patch.get("removed_fields", []):
+                fields.pop(key, None)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO learners (user_id, version, fields) "
+                "VALUES (?, ?, ?)",
+                (user_id, new_version, _dumps(fields))
+            )
+
+            changed = patch.get("topics", {})
+            if changed:
+                # New topics go after existing ones; existing keep position
+                next_position = conn.execute(
+                    "SELECT COALESCE(MAX(position), -1) + 1 FROM learner_topics "
+                    "WHERE user_id = ?",
+                    (user_id,)
+                ).fetchone()[0]
+
+                conn.executemany(
+                    "INSERT INTO learner_topics (user_id, topic, position, state) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, topic) DO UPDATE SET state = excluded.state",
+                    [
+                        (user_id, topic, next_position + i, _dumps(topic_state))
+                        for i, (topic, topic_state) in enumerate(changed.items())
+                    ]
+                )
+
+            removed = patch.get("removed_topics", [])
+            if removed:
+                conn.executemany(
+                    "DELETE FROM learner_topics WHERE user_id = ? AND topic = ?",
+                    [(user_id, topic) for topic in removed]
+                )
+
+            self._log_event(conn, user_id, new_version, event, {"patch": patch})
+
+        return new_version
+
+    def iter_learner_events(self, user_id: str):
+        rows = self._conn().execute(
+            "SELECT version, ts, event, body FROM learner_events "
+            "WHERE user_id = ? ORDER BY version",
+            (user_id,)
+        ).fetchall()
+
+        for version, ts, event, body in rows:
+            yield {"v": version, "ts": ts, "event": event, **json.loads(body)}
+
+    def iter_learner_ids(self):
+        rows = self._conn().execute("SELECT user_id FROM learners").fetchall()
+        return (r[0] for r in rows)
+
+    # -------------------------------------------------------
+    # PLANS
+    # -------------------------------------------------------
+    def plan_token(self, plan_id: str):
+        row = self._conn().execute(
+            "SELECT version FROM plans WHERE plan_id = ?", (plan_id,)
+        ).fetchone()
+        return ("sqlite", row[0]) if row else None
+
+    def load_plan(self, plan_id: str) -> tuple:
+        row = self._conn().execute(
+            "SELECT version, document FROM plans WHERE plan_id = ?", (plan_id,)
+        ).fetchone()
+
+        if row is None:
+            return None, None
+
+        document = decode_plan(json.loads(row[1]))
+        document["version"] = row[0]
+        return document, ("sqlite", row[0])
+
+    def save_plan(self, plan_id, document, expected_version=None) -> int:
+        body = {k: v for k, v in document.items() if k != "version"}
+
+        with self._transaction() as conn:
+            new_version = self._check_version(
+                conn, "plans", "plan_id", plan_id, expected_version
+            ) + 1
+
+            row = conn.execute(
+                "SELECT document FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+            previous = decode_plan(json.loads(row[0])) if row else None
+
+            base = conn.execute(
+                "SELECT base FROM plan_revisions WHERE plan_id = ? "
+                "ORDER BY version DESC LIMIT 1",
+                (plan_id,)
+            ).fetchone()
+
+            record = make_plan_revision(
+                previous, document, new_version, base[0] if base else None
+            )
+            if "full" in record:
+                record["full"] = encode_plan(record["full"])
+
+            conn.execute(
+                "INSERT OR REPLACE INTO plan_revisions (plan_id, version, base, record) "
+                "VALUES (?, ?, ?, ?)",
+                (plan_id, new_version, record["base"], _dumps(record))
+            )
+
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (plan_id, user_id, version, document) "
+                "VALUES (?, ?, ?, ?)",
+                (plan_id, str(document.get("user_id")), new_version,
+                 _dumps(encode_plan(body)))
+            )
+
+        document["version"] = new_version
+        return new_version
+
+    @staticmethod
+    def _decode_revision(record: str) -> dict:
+        record = json.loads(record)
+        if "full" in record:
+            record["full"] = decode_plan(record["full"])
+        return record
+
+    def iter_plan_revisions(self, plan_id: str):
+        rows = self._conn().execute(
+            "SELECT record FROM plan_revisions WHERE plan_id = ? ORDER BY version",
+            (plan_id,)
+        ).fetchall()
+        return (self._decode_revision(r[0]) for r in rows)
+
+    def load_plan_revision(self, plan_id: str, version: int) -> dict | None:
+        # Only the keyframe and the deltas between it and version
+        rows = self._conn().execute(
+            "SELECT record FROM plan_revisions "
+            "WHERE plan_id = ? AND version <= ? AND version >= ("
+            "  SELECT base FROM plan_revisions WHERE plan_id = ? AND version = ?"
+            ") ORDER BY version",
+            (plan_id, version, plan_id, version)
+        ).fetchall()
+
+        return materialize_plan_revision(
+            [self._decode_revision(r[0]) for r in rows], version
+        )
+
+    def iter_plan_ids(self):
+        rows = self._conn().execute("SELECT plan_id FROM plans").fetchall()
+        return (r[0] for r in rows)
+
+    # -------------------------------------------------------
+    # QUESTION BANKS
+    # -------------------------------------------------------
+    def load_bank(self, syllabus_id: str) -> dict | None:
+        with self._transaction("DEFERRED") as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM banks WHERE syllabus_id = ?", (syllabus_id,)
+            ).fetchone()
+
+            if not exists:
+                return None
+
+            rows = conn.execute(
+                "SELECT topic, questions FROM bank_topics "
+                "WHERE syllabus_id = ? ORDER BY position",
+                (syllabus_id,)
+            ).fetchall()
+
+        return {topic: json.loads(q) for topic, q in rows}
+
+    def load_bank_topics(self, syllabus_id: str, topic_names: list) -> dict:
+        if not topic_names:
+            return {}
+
+        placeholders = ",".join("?" for _ in topic_names)
+        rows = self._conn().execute(
+            f"SELECT topic, questions FROM bank_topics "
+            f"WHERE syllabus_id = ? AND topic IN ({placeholders})",
+            (syllabus_id, *topic_names)
+        ).fetchall()
+
+        found = {topic: json.loads(q) for topic, q in rows}
+
+        # Same order as requested, like the JSON backend
+        return {t: found[t] for t in topic_names if t in found}
+
+    def find_bank_topics(self, topic_names: list, syllabus_ids: list | None = None) -> dict:
+        normalized = list({normalize_topic(t) for t in topic_names})
+        if not normalized:
+            return {}
+
+        placeholders = ",".join("?" for _ in normalized)
+        rows = self._conn().execute(
+            f"SELECT normalized, syllabus_id, topic FROM bank_topic_index "
+            f"WHERE normalized IN ({placeholders})",
+            normalized
+        ).fetchall()
+
+        entries = {}
+        for key, syllabus_id, topic in rows:
+            entries.setdefault(key, {})[syllabus_id] = topic
+
+        return pick_bank_topics(entries, topic_names, syllabus_ids)
+
+    def bank_topic_count(self, syllabus_id: str) -> int | None:
+        row = self._conn().execute(
+            "SELECT topic_count FROM banks WHERE syllabus_id = ?", (syllabus_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def bank_topic_keys(self, syllabus_id: str) -> list:
+        rows = self._conn().execute(
+            "SELECT topic FROM bank_topics WHERE syllabus_id = ? ORDER BY position",
+            (syllabus_id,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def load_topic_map(self, syllabus_id: str) -> tuple:
+        row = self._conn().execute(
+            "SELECT b.updated_at, m.token, m.mapping FROM banks b "
+            "LEFT JOIN bank_topic_maps m ON m.syllabus_id = b.syllabus_id "
+            "WHERE b.syllabus_id = ?",
+            (syllabus_id,)
+        ).fetchone()
+
+        if row is None:
+            return {}, None
+
+        token, map_token, mapping = row
+        if map_token != token:
+            return {}, token
+
+        return json.loads(mapping), token
+
+    def save_topic_map(self, syllabus_id: str, mapping: dict, token):
+        if token is None:
+            return
+
+        self._conn().execute(
+            "INSERT OR REPLACE INTO bank_topic_maps (syllabus_id, token, mapping) "
+            "VALUES (?, ?, ?)",
+            (syllabus_id, token, _dumps(mapping))
+        )
+
+    def save_bank(self, syllabus_id: str, bank: dict):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO banks (syllabus_id, topic_count, updated_at) "
+                "VALUES (?, ?, ?)",
+                (syllabus_id, len(bank), datetime.utcnow().isoformat())
+            )
+            conn.execute("DELETE FROM bank_topics WHERE syllabus_id = ?", (syllabus_id,))
+            conn.executemany(
+                "INSERT INTO bank_topics (syllabus_id, topic, position, questions) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (syllabus_id, topic, position, _dumps(questions))
+                    for position, (topic, questions) in enumerate(bank.items())
+                ]
+            )
+            conn.execute("DELETE FROM bank_topic_index WHERE syllabus_id = ?", (syllabus_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO bank_topic_index (normalized, syllabus_id, topic) "
+                "VALUES (?, ?, ?)",
+                [(normalize_topic(topic), syllabus_id, topic) for topic in bank]
+            )
+
+    def iter_bank_ids(self):
+        rows = self._conn().execute("SELECT syllabus_id FROM banks").fetchall()
+        return (r[0] for r in rows)
+
+    def load_shared_questions(self, keys: list) -> dict:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        placeholders = ",".join("?" for _ in keys)
+        rows = self._conn().execute(
+            f"SELECT key, questions FROM shared_questions WHERE key IN ({placeholders})",
+            keys
+        ).fetchall()
+        return {key: json.loads(questions) for key, questions in rows}
+
+    def save_shared_questions(self, entries: dict):
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO shared_questions (key, questions) VALUES (?, ?)",
+                [(key, _dumps(questions)) for key, questions in entries.items()]
+            )
+
+    def load_bank_status(self, syllabus_id: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT status FROM bank_status WHERE syllabus_id = ?", (syllabus_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_bank_status(self, syllabus_id: str, status: dict | None):
+        self.update_bank_status(syllabus_id, lambda current: status)
+
+    def update_bank_status(self, syllabus_id: str, update) -> dict | None:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT status FROM bank_status WHERE syllabus_id = ?", (syllabus_id,)
+            ).fetchone()
+            status = update(json.loads(row[0]) if row else None)
+
+            if status is None:
+                conn.execute("DELETE FROM bank_status WHERE syllabus_id = ?", (syllabus_id,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO bank_status (syllabus_id, status) VALUES (?, ?)",
+                    (syllabus_id, _dumps(status))
+                )
+
+        return status
+
+    def iter_bank_statuses(self):
+        rows = self._conn().execute("SELECT syllabus_id, status FROM bank_status").fetchall()
+        return ((syllabus_id, json.loads(status)) for syllabus_id, status in rows)
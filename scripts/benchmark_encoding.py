@@ -0,0 +1,149 @@
+"""
+benchmark_encoding.py  —  legacy pretty-printed JSON vs compact encoding.
+
+Usage (from project root):
+    python scripts/benchmark_encoding.py
+    python scripts/benchmark_encoding.py --sizes 50 500 5000 --ops 50
+
+For a learner state and a plan with 50 / 500 / 5000 topics,
+compares file size and median save / load latency of:
+    legacy    json.dump(indent=2), topic names repeated everywhere
+    compact   codec.encode_*: no indentation, interned topic table,
+              columnar per-topic fields (what JsonFileBackend writes)
+
+Files go to a temporary directory; nothing under data/ is touched.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from app.storage.backend import json_default
+from app.storage.codec import (
+    COMPACT_DUMP,
+    decode_learner,
+    decode_plan,
+    encode_learner,
+    encode_plan
+)
+from app.storage.file_io import atomic_write_json, read_json
+
+
+def topic_name(i: int) -> str:
+    return f"Topic {i}: Need and Importance of Organizational Behavior"
+
+
+def make_learner(n_topics: int) -> dict:
+    return {
+        "topic_states": {
+            topic_name(i): {
+                "familiarity": round(random.random(), 3),
+                "confidence": round(random.random(), 3),
+                "retention": round(random.random(), 3),
+                "attempts": random.randint(0, 20),
+                "revision_due": random.random() < 0.3,
+                "last_updated": "2026-03-15"
+            }
+            for i in range(n_topics)
+        },
+        "learning_speed": 1.0,
+        "consistency": 0.9,
+        "tested_units": [1, 2]
+    }
+
+
+def make_plan(n_topics: int) -> dict:
+    # Every topic studied once and revised twice, 4 entries per day
+    entries = []
+    for i in range(n_topics):
+        entries.append({"type": "study", "topic": topic_name(i), "hours": 0.8, "complexity": "Medium"})
+        entries.append({"type": "revision", "topic": topic_name(i), "hours": 0.2})
+        entries.append({"type": "revision", "topic": topic_name(i), "hours": 0.1})
+    for i in range(3, len(entries), 4):
+        entries.insert(i, {"type": "micro_test", "questions": 5})
+
+    return {
+        "plan_id": "bench",
+        "user_id": "bench",
+        "plan": {
+            "schedule": {
+                str(day + 1): entries[day * 4:day * 4 + 4]
+                for day in range((len(entries) + 3) // 4)
+            },
+            "confidence": 0.5
+        },
+        "hours_per_day": 3,
+        "deadline_days": 30,
+        "created_at": "2026-03-01T00:00:00"
+    }
+
+
+def median_ms(fn, ops: int) -> float:
+    samples = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def compare(kind: str, document: dict, encode, decode, workdir: str, ops: int):
+    legacy_path = os.path.join(workdir, f"{kind}-legacy.json")
+    compact_path = os.path.join(workdir, f"{kind}-compact.json")
+
+    def legacy_save():
+        atomic_write_json(legacy_path, document, indent=2, default=json_default)
+
+    def compact_save():
+        atomic_write_json(compact_path, encode(document), default=json_default, **COMPACT_DUMP)
+
+    save_legacy = median_ms(legacy_save, ops)
+    save_compact = median_ms(compact_save, ops)
+    load_legacy = median_ms(lambda: read_json(legacy_path), ops)
+    load_compact = median_ms(lambda: decode(read_json(compact_path)), ops)
+
+    assert decode(read_json(compact_path)) == read_json(legacy_path)
+
+    size_legacy = os.path.getsize(legacy_path)
+    size_compact = os.path.getsize(compact_path)
+
+    print(
+        f"  {kind:<8} size {size_legacy / 1024:9.1f} KB → {size_compact / 1024:8.1f} KB "
+        f"({size_compact / size_legacy:4.0%})   "
+        f"save {save_legacy:7.2f} → {save_compact:7.2f} ms   "
+        f"load {load_legacy:7.2f} → {load_compact:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--ops", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="encoding-bench-")
+
+    try:
+        print("legacy → compact (median of", args.ops, "runs)\n")
+
+        for n_topics in args.sizes:
+            print(f"[{n_topics} topics]")
+            compare("learner", make_learner(n_topics), encode_learner, decode_learner, workdir, args.ops)
+            compare("plan", make_plan(n_topics), encode_plan, decode_plan, workdir, args.ops)
+            print()
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
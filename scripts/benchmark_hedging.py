@@ -0,0 +1,119 @@
+"""
+benchmark_hedging.py  —  LLM call latency with and without hedged requests.
+
+Usage (from project root):
+    python scripts/benchmark_hedging.py
+    python scripts/benchmark_hedging.py --calls 300 --latency-dist 0.1:95,3:5 --budget 0.1
+    python scripts/benchmark_hedging.py --stream
+
+Starts the fake Groq server in-process with the given latency
+distribution and sends the same sequence of calls through two
+LLM clients — hedging off, then on (warmed up with --warmup calls
+so the percentile is known). Prints p50 / p95 / p99 / max latency
+and the extra requests hedging cost. Nothing under data/ is
+touched; the response cache is off.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from app.services.llm_cache import LLMCache
+from app.services.llm_client import LLMClient, RequestHedger
+from app.services.llm_usage import LLMUsageLog
+from scripts.fake_groq_server import parse_latency_dist, start_fake_server
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def one_call(client: LLMClient, i: int, stream: bool) -> float:
+    prompt = f"Benchmark call {i}"
+    started = time.perf_counter()
+
+    if stream:
+        async for _ in client.stream(prompt, tags={"purpose": "benchmark"}):
+            pass
+    else:
+        await client.chat(prompt, tags={"purpose": "benchmark"})
+
+    return time.perf_counter() - started
+
+
+async def run(client: LLMClient, calls: int, concurrency: int, stream: bool) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(i: int) -> float:
+        async with semaphore:
+            return await one_call(client, i, stream)
+
+    return await asyncio.gather(*(_one(i) for i in range(calls)))
+
+
+def make_client(url: str, tmp: str, name: str, hedger: RequestHedger) -> LLMClient:
+    return LLMClient(
+        api_url=url,
+        api_key="benchmark",
+        requests_per_minute=0,
+        cache=LLMCache(path=os.path.join(tmp, f"{name}-cache.sqlite3"), mode="off"),
+        usage_log=LLMUsageLog(path=os.path.join(tmp, f"{name}-usage.sqlite3")),
+        hedger=hedger
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged LLM request benchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-dist", type=parse_latency_dist,
+                        default=parse_latency_dist("0.1:94,2:6"))
+    parser.add_argument("--percentile", type=float, default=90)
+    parser.add_argument("--min-delay", type=float, default=0.2)
+    parser.add_argument("--budget", type=float, default=0.15)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+
+    server, url = start_fake_server(latency_dist=args.latency_dist)
+    tmp = tempfile.mkdtemp(prefix="hedging-")
+
+    plain = make_client(url, tmp, "plain", RequestHedger(False, 0, 0, 0, 0))
+    hedger = RequestHedger(True, args.percentile, args.warmup // 2, args.min_delay, args.budget)
+    hedged = make_client(url, tmp, "hedged", hedger)
+
+    print(f"Latency distribution: {args.latency_dist}, {args.calls} calls, "
+          f"{'streamed' if args.stream else 'plain'}")
+
+    results = {}
+    for name, client in (("off", plain), ("on", hedged)):
+        # The warm-up fills the hedger's latency window
+        asyncio.run(run(client, args.warmup, args.concurrency, args.stream))
+        before = server.requests
+        hedges_before, wins_before = hedger.hedges, hedger.hedge_wins
+        results[name] = asyncio.run(run(client, args.calls, args.concurrency, args.stream))
+        requests = server.requests - before
+
+        latencies = results[name]
+        print(
+            f"hedging {name:<3}  p50 {statistics.median(latencies):6.2f}s  "
+            f"p95 {percentile(latencies, 95):6.2f}s  p99 {percentile(latencies, 99):6.2f}s  "
+            f"max {max(latencies):6.2f}s  requests {requests} "
+            f"(+{100 * (requests - args.calls) / args.calls:.1f}%)"
+        )
+        client.close()
+
+    print(f"hedges sent: {hedger.hedges - hedges_before}, won: {hedger.hedge_wins - wins_before}, "
+          f"delay: {hedger.stats()['delays']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
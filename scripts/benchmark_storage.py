@@ -0,0 +1,208 @@
+"""
+benchmark_storage.py  —  JSON-file vs SQLite storage backend at scale.
+
+Usage (from project root):
+    python scripts/benchmark_storage.py
+    python scripts/benchmark_storage.py --users 20000 --topics 150 --ops 5000
+
+Builds a synthetic population in a temporary directory (nothing
+under data/ is touched) and times, per backend:
+    populate      full save of every learner + plan
+    load          random full learner load
+    patch         random partial update of 3 topics (CAS)
+    save          random full learner rewrite
+    plan_load     random plan load
+    bank_topics   10 topics out of a large question bank
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from app.storage.json_backend import JsonFileBackend
+from app.storage.sqlite_backend import SqliteBackend
+
+
+def make_learner(n_topics: int) -> dict:
+    return {
+        "topic_states": {
+            f"Topic {i} of the Organizational Behavior syllabus": {
+                "familiarity": round(random.random(), 3),
+                "confidence": round(random.random(), 3),
+                "retention": round(random.random(), 3),
+                "attempts": random.randint(0, 20),
+                "revision_due": random.random() < 0.3,
+                "last_updated": "2026-03-15",
+                "last_studied": "2026-03-27"
+            }
+            for i in range(n_topics)
+        },
+        "learning_speed": 1.0,
+        "consistency": 0.9,
+        "tested_units": [2, 3],
+        "history": [
+            {"date": f"2026-03-{d:02d}", "actual_hours": 2, "expected_hours": 3}
+            for d in range(1, 29)
+        ]
+    }
+
+
+def make_plan(user_id: str, n_days: int = 30) -> dict:
+    return {
+        "plan_id": user_id,
+        "user_id": user_id,
+        "plan": {
+            "schedule": {
+                str(day): [
+                    {"type": "study", "topic": f"Topic {day}", "hours": 1.5, "complexity": "Medium"},
+                    {"type": "micro_test", "questions": 10}
+                ]
+                for day in range(1, n_days + 1)
+            },
+            "confidence": 0.5
+        },
+        "hours_per_day": 3,
+        "deadline_days": n_days,
+        "created_at": "2026-03-01T00:00:00"
+    }
+
+
+def make_bank(n_topics: int) -> dict:
+    return {
+        f"Topic {i}": [{
+            "question": f"Question about topic {i}?",
+            "options": ["Option one", "Option two", "Option three", "Option four"],
+            "answer": "Option one"
+        }]
+        for i in range(n_topics)
+    }
+
+
+def timed(fn, ops: int) -> list:
+    samples = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(name: str, samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    total = sum(samples) / 1000
+    return (
+        f"  {name:<12} median {statistics.median(samples):7.3f} ms   "
+        f"p95 {p95:7.3f} ms   {len(samples) / total:9.0f} ops/s"
+    )
+
+
+def disk_usage(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def run(backend, root: str, users: int, topics: int, ops: int):
+    user_ids = [f"{i:024x}" for i in range(users)]
+    template = make_learner(topics)
+
+    start = time.perf_counter()
+    for user_id in user_ids:
+        backend.save_learner(user_id, dict(template))
+        backend.save_plan(user_id, make_plan(user_id))
+    populate = time.perf_counter() - start
+    print(f"  populate     {users} users in {populate:.1f}s ({users / populate:.0f} users/s)")
+
+    topic_names = list(template["topic_states"])
+
+    def load():
+        backend.load_learner(random.choice(user_ids))
+
+    def patch():
+        user_id = random.choice(user_ids)
+        state, _ = backend.load_learner(user_id)
+        changed = {
+            t: dict(state["topic_states"][t], familiarity=round(random.random(), 3))
+            for t in random.sample(topic_names, 3)
+        }
+        backend.patch_learner(
+            user_id,
+            {"topics": changed, "removed_topics": [], "fields": {}, "removed_fields": []},
+            expected_version=state["version"]
+        )
+
+    def save():
+        user_id = random.choice(user_ids)
+        state, _ = backend.load_learner(user_id)
+        backend.save_learner(user_id, state, expected_version=state["version"])
+
+    def plan_load():
+        backend.load_plan(random.choice(user_ids))
+
+    bank = make_bank(max(topics, 500))
+    backend.save_bank("bench-bank", bank)
+    bank_topics = list(bank)
+
+    def load_bank_topics():
+        backend.load_bank_topics("bench-bank", random.sample(bank_topics, 10))
+
+    for name, fn in [
+        ("load", load),
+        ("patch", patch),
+        ("save", save),
+        ("plan_load", plan_load),
+        ("bank_topics", load_bank_topics),
+    ]:
+        print(summarize(name, timed(fn, ops)))
+
+    print(f"  disk         {disk_usage(root) / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--topics", type=int, default=60)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="storage-bench-")
+
+    try:
+        json_root = os.path.join(workdir, "json")
+        sqlite_path = os.path.join(workdir, "sqlite", "storage.sqlite3")
+
+        backends = [
+            ("json", json_root, JsonFileBackend(
+                learner_path=os.path.join(json_root, "learners"),
+                plan_path=os.path.join(json_root, "plans"),
+                bank_path=os.path.join(json_root, "question_banks")
+            )),
+            ("sqlite", os.path.dirname(sqlite_path), SqliteBackend(sqlite_path)),
+        ]
+
+        print(f"users={args.users} topics/user={args.topics} ops={args.ops}\n")
+
+        for name, root, backend in backends:
+            print(f"[{name}]")
+            run(backend, root, args.users, args.topics, args.ops)
+            print()
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
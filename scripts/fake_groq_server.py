@@ -0,0 +1,318 @@
+"""
+fake_groq_server.py  —  local stand-in for the Groq chat completions API.
+
+Usage (from project root):
+    python scripts/fake_groq_server.py --port 8099
+    python scripts/fake_groq_server.py --port 8099 --latency 0.5 --fail-rate 0.2
+    python scripts/fake_groq_server.py --port 8099 --rate-limit-every 3
+    python scripts/fake_groq_server.py --port 8099 --latency-dist 0.2:90,4:10
+
+then run the app (or a script) against it:
+    GROQ_API_URL=http://127.0.0.1:8099/openai/v1/chat/completions \\
+        python -m uvicorn app.main:app
+
+Answers the two prompts the app sends with well-formed content:
+    question bank prompt  → {topic: [MCQ, ...]} for every listed topic
+    topic cleaner prompt  → {id: name title-cased} (names with ", "
+                            split into a list, like merged lines)
+anything else             → "OK"
+
+Faults for exercising the LLM client's retries, rate limiting and
+circuit breaker:
+    --latency S           sleep S seconds before answering
+    --latency-dist S:W,.. also sleep one of the S, picked with weight W
+                          per request (a latency tail, for hedging)
+    --fail-rate P         answer 503 with probability P
+    --rate-limit-every N  answer every Nth request with 429 (Retry-After: 1)
+    --outage              answer every request with 503
+
+Requests with "stream": true get the reply as server-sent events
+in small pieces, like the real API:
+    --stream-delay S      sleep S seconds between streamed pieces
+    --stream-cut F        drop the connection after fraction F of
+                          the reply (0 = send it all)
+
+In-process (no network setup needed):
+    server, url = start_fake_server(fail_rate=0.5)
+    set_llm_client(LLMClient(api_url=url))
+    ...
+    server.faults["outage"] = True      # change faults on the fly
+    server.shutdown()
+"""
+
+import argparse
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FAULTS = {
+    "latency": 0.0,
+    "latency_dist": (),
+    "fail_rate": 0.0,
+    "rate_limit_every": 0,
+    "outage": False,
+    "stream_delay": 0.0,
+    "stream_cut": 0.0
+}
+
+# Characters per streamed piece (a few tokens, like Groq's deltas)
+STREAM_PIECE = 24
+
+
+# --------------------------------------------------
+# Canned completions
+# --------------------------------------------------
+def _listed_names(prompt: str, marker: str, brackets: str = "[]") -> list | dict | None:
+    at = prompt.rfind(marker)
+    if at == -1:
+        return None
+
+    tail = prompt[at:]
+    start, end = tail.find(brackets[0]), tail.rfind(brackets[1])
+    if start == -1 or end == -1:
+        return None
+
+    try:
+        return json.loads(tail[start:end + 1])
+    except ValueError:
+        return None
+
+
+def _question_bank(topics: list, per_topic: int) -> dict:
+    bank = {}
+    for topic in topics:
+        bank[topic] = []
+        for i in range(per_topic):
+            options = [f"{topic} — statement {n}" for n in range(1, 5)]
+            bank[topic].append({
+                "question": f"Which statement about {topic} is correct? ({i + 1})",
+                "options": options,
+                "answer": options[i % 4]
+            })
+    return bank
+
+
+def completion_for(prompt: str) -> str:
+    topics = _listed_names(prompt, "Topics to generate questions for:")
+    if topics is not None:
+        match = re.search(r"Generate exactly (\d+) MCQ", prompt)
+        per_topic = int(match.group(1)) if match else 1
+        return "```json\n" + json.dumps(_question_bank(topics, per_topic), indent=2) + "\n```"
+
+    names = _listed_names(prompt, "Topics by id:", "{}")
+    if names is not None:
+        cleaned = {}
+        for topic_id, name in names.items():
+            parts = [p.strip().title() for p in str(name).split(", ") if p.strip()]
+            cleaned[topic_id] = parts if len(parts) > 1 else str(name).strip().title()
+        return json.dumps(cleaned)
+
+    return "OK"
+
+
+# --------------------------------------------------
+# HTTP
+# --------------------------------------------------
+class FakeGroqHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes — without this,
+        # Nagle + delayed ACK add ~40 ms to every keep-alive request
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply_stream(self, content: str, completion_id: str, model: str,
+                      delay: float, cut: float, usage: dict):
+        # No Content-Length: chunked transfer, one chunk per event
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def _event(data: str):
+            line = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        end = int(len(content) * cut) if cut else len(content)
+
+        for start in range(0, end, STREAM_PIECE):
+            if delay and start:
+                time.sleep(delay)
+            _event(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": content[start:min(start + STREAM_PIECE, end)]},
+                    "finish_reason": None
+                }]
+            }))
+
+        if cut:
+            # Broken off mid-reply: no [DONE], no final chunk
+            self.close_connection = True
+            return
+
+        # Like Groq: the last chunk carries the usage as x_groq.usage
+        _event(json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage}
+        }))
+        _event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.requests += 1
+            count = server.requests
+        faults = server.faults
+
+        if not self.path.endswith("/chat/completions"):
+            self._reply(404, {"error": {"message": "Not found"}})
+            return
+
+        delay = faults["latency"]
+        if faults["latency_dist"]:
+            seconds, weights = zip(*faults["latency_dist"])
+            delay += random.choices(seconds, weights)[0]
+        if delay:
+            time.sleep(delay)
+
+        if faults["outage"] or random.random() < faults["fail_rate"]:
+            self._reply(503, {"error": {"message": "Service unavailable (fake)"}})
+            return
+
+        if faults["rate_limit_every"] and count % faults["rate_limit_every"] == 0:
+            self._reply(429, {"error": {"message": "Rate limit reached (fake)"}}, {"Retry-After": "1"})
+            return
+
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+        content = completion_for(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4
+        }
+
+        if payload.get("stream"):
+            self._reply_stream(
+                content, f"fake-{count}", payload.get("model", "fake"),
+                faults["stream_delay"], faults["stream_cut"], usage
+            )
+            return
+
+        self._reply(200, {
+            "id": f"fake-{count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-reply (timeouts, hedged requests
+        # that lost the race) — not worth a traceback
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **faults) -> tuple:
+    """
+    Serve on a daemon thread. port=0 picks a free port.
+    Returns (server, chat completions url).
+    """
+    server = FakeGroqServer((host, port), FakeGroqHandler)
+    server.daemon_threads = True
+    server.faults = dict(DEFAULT_FAULTS, **faults)
+    server.requests = 0
+    server.lock = threading.Lock()
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://{host}:{server.server_address[1]}/openai/v1/chat/completions"
+    return server, url
+
+
+def parse_latency_dist(spec: str) -> tuple:
+    """
+    "0.2:90,4:10" → ((0.2, 90.0), (4.0, 10.0)): seconds and weight.
+    """
+    pairs = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        seconds, _, weight = part.partition(":")
+        pairs.append((float(seconds), float(weight or 1)))
+    return tuple(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-dist", type=parse_latency_dist, default=())
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--outage", action="store_true")
+    parser.add_argument("--stream-delay", type=float, default=0.0)
+    parser.add_argument("--stream-cut", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_server(
+        args.host,
+        args.port,
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        fail_rate=args.fail_rate,
+        rate_limit_every=args.rate_limit_every,
+        outage=args.outage,
+        stream_delay=args.stream_delay,
+        stream_cut=args.stream_cut
+    )
+    print(f"Fake Groq API at {url}  (Ctrl+C to stop)")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+learner_history.py  —  print a learner's audit trail.
+
+Usage (from project root):
+    python scripts/learner_history.py <user_id>
+    python scripts/learner_history.py <user_id> --topic "Binary Search Trees"
+
+Every change to a learner state is recorded as an event
+(micro_test, study_session, daily_quiz, ...). Without --topic
+this lists every event and what it touched; with --topic it
+shows how that topic's familiarity moved over time.
+
+Uses whichever backend STORAGE_BACKEND selects.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from app.storage.backend import get_backend
+
+
+def describe(event: dict) -> str:
+    if "state" in event:
+        topics = event["state"].get("topic_states", {})
+        return f"full save ({len(topics)} topics)"
+
+    patch = event.get("patch", {})
+    parts = []
+    if patch.get("topics"):
+        parts.append(f"{len(patch['topics'])} topics changed")
+    if patch.get("removed_topics"):
+        parts.append(f"{len(patch['removed_topics'])} topics removed")
+    if patch.get("fields"):
+        parts.append("fields: " + ", ".join(patch["fields"]))
+    return "; ".join(parts) or "no-op"
+
+
+def topic_state(event: dict, topic: str) -> dict | None:
+    if "state" in event:
+        return event["state"].get("topic_states", {}).get(topic)
+    return event.get("patch", {}).get("topics", {}).get(topic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a learner's event history")
+    parser.add_argument("user_id")
+    parser.add_argument("--topic", default=None)
+    args = parser.parse_args()
+
+    events = list(get_backend().iter_learner_events(args.user_id))
+
+    if not events:
+        print("No events recorded for this learner.")
+        return
+
+    for event in events:
+        prefix = f"v{event['v']:<5} {event['ts'][:19]}  {event['event']:<22}"
+
+        if args.topic is None:
+            print(f"{prefix} {describe(event)}")
+            continue
+
+        state = topic_state(event, args.topic)
+        if state is not None:
+            print(
+                f"{prefix} familiarity={state.get('familiarity')} "
+                f"attempts={state.get('attempts')}"
+            )
+
+
+if __name__ == "__main__":
+    main()
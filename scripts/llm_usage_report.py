@@ -0,0 +1,102 @@
+"""
+llm_usage_report.py  —  print LLM call accounting (see app/services/llm_usage.py).
+
+Usage (from project root):
+    python scripts/llm_usage_report.py
+    python scripts/llm_usage_report.py --by syllabus --since 2026-10-01
+    python scripts/llm_usage_report.py --by user
+    python scripts/llm_usage_report.py --alert-calls 30
+
+--by day (default) shows calls, failures, cache hits, retries,
+tokens, cost and latency per day, plus the busiest minute's
+requests and tokens (compare with LLM_REQUESTS_PER_MINUTE /
+LLM_TOKENS_PER_MINUTE). --by user credits bank builds to the
+syllabus owner, so it needs MONGO_URL.
+
+Syllabuses with at least --alert-calls calls in one day are
+listed at the end — usually a bank stuck in a retry loop.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from app.services.llm_usage import LLM_USAGE_PATH, LLMUsageLog
+
+COLUMNS = (
+    ("calls", 7), ("failed", 7), ("cached", 7), ("retries", 8),
+    ("prompt_tokens", 14), ("completion_tokens", 18), ("cost", 11),
+    ("avg_latency_ms", 15), ("max_latency_ms", 15)
+)
+
+
+def syllabus_owners(syllabus_ids: list) -> dict:
+    """
+    { syllabus_id: user_id } from MongoDB, {} if unreachable.
+    """
+    try:
+        from bson import ObjectId
+        from app.database import syllabus_collection
+
+        docs = syllabus_collection.find(
+            {"_id": {"$in": [ObjectId(s) for s in syllabus_ids if ObjectId.is_valid(s)]}},
+            {"user_id": 1}
+        )
+        return {str(d["_id"]): str(d.get("user_id")) for d in docs}
+    except Exception as e:
+        print(f"(syllabus owners unavailable, bank builds shown as user None: {e})")
+        return {}
+
+
+def print_table(rows: list, key: str, columns: tuple):
+    header = f"{key:<26}" + "".join(f"{name:>{width}}" for name, width in columns)
+    print(header)
+    print("-" * len(header))
+
+    for row in rows:
+        line = f"{str(row[key]):<26}"
+        for name, width in columns:
+            value = row.get(name)
+            if name == "cost":
+                value = f"${value:.4f}"
+            line += f"{'-' if value is None else value:>{width}}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM usage report")
+    parser.add_argument("--path", default=LLM_USAGE_PATH)
+    parser.add_argument("--by", default="day",
+                        choices=("day", "syllabus", "user", "model", "purpose"))
+    parser.add_argument("--since", help="first day, YYYY-MM-DD")
+    parser.add_argument("--alert-calls", type=int, default=50)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No usage recorded yet ({args.path} missing)")
+        return
+
+    usage = LLMUsageLog(path=args.path)
+
+    if args.by == "user":
+        syllabus_ids = [row["syllabus_id"] for row in usage.summary("syllabus_id", args.since)
+                        if row["syllabus_id"]]
+        rows = usage.user_summary(syllabus_owners(syllabus_ids), args.since)
+        columns = tuple(c for c in COLUMNS if c[0] in rows[0]) if rows else COLUMNS
+        print_table(rows, "user_id", columns)
+    else:
+        key = "syllabus_id" if args.by == "syllabus" else args.by
+        columns = COLUMNS + ((("peak_rpm", 9), ("peak_tpm", 9)) if key == "day" else ())
+        print_table(usage.summary(key, args.since), key, columns)
+
+    busy = usage.busy_syllabuses(args.alert_calls, args.since)
+    if busy:
+        print(f"\nSyllabuses with {args.alert_calls}+ calls in a day:")
+        for day, syllabus_id, calls, cost in busy:
+            print(f"  {day}  {syllabus_id}  {calls} calls  ${cost:.4f}")
+
+
+if __name__ == "__main__":
+    main()
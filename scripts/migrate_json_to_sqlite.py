@@ -0,0 +1,97 @@
+"""
+migrate_json_to_sqlite.py  —  one-shot copy of the JSON data tree into SQLite.
+
+Usage (from project root):
+    python scripts/migrate_json_to_sqlite.py
+    python scripts/migrate_json_to_sqlite.py --data data --sqlite data/storage.sqlite3
+
+Copies every learner state, plan and question bank from
+data/learners, data/plans and data/question_banks (plus the
+shared questions in data/question_store the banks refer to)
+into the SQLite backend. Safe to re-run: existing rows are replaced.
+The JSON files are left untouched.
+
+Afterwards start the app with STORAGE_BACKEND=sqlite.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from app.storage.json_backend import JsonFileBackend
+from app.storage.sqlite_backend import SqliteBackend
+
+
+def migrate(source: JsonFileBackend, target: SqliteBackend) -> dict:
+    counts = {"learners": 0, "plans": 0, "banks": 0, "failed": 0}
+
+    for user_id in source.iter_learner_ids():
+        try:
+            state, _ = source.load_learner(user_id)
+            if state is not None:
+                target.save_learner(user_id, state)
+                counts["learners"] += 1
+        except Exception as e:
+            print(f"  ❌ learner {user_id}: {e}")
+            counts["failed"] += 1
+
+    for plan_id in source.iter_plan_ids():
+        try:
+            document, _ = source.load_plan(plan_id)
+            if document is not None:
+                target.save_plan(plan_id, document)
+                counts["plans"] += 1
+        except Exception as e:
+            print(f"  ❌ plan {plan_id}: {e}")
+            counts["failed"] += 1
+
+    for syllabus_id in source.iter_bank_ids():
+        try:
+            bank = source.load_bank(syllabus_id)
+            if bank is not None:
+                # Banks reference the shared question store — copy
+                # the entries they point at along with them
+                refs = [q["ref"] for q in bank.values() if isinstance(q, dict)]
+                target.save_shared_questions(source.load_shared_questions(refs))
+                target.save_bank(syllabus_id, bank)
+                counts["banks"] += 1
+        except Exception as e:
+            print(f"  ❌ bank {syllabus_id}: {e}")
+            counts["failed"] += 1
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", default="data", help="JSON data root")
+    parser.add_argument("--sqlite", default=SqliteBackend.DB_PATH, help="SQLite file")
+    args = parser.parse_args()
+
+    source = JsonFileBackend(
+        learner_path=os.path.join(args.data, "learners"),
+        plan_path=os.path.join(args.data, "plans"),
+        bank_path=os.path.join(args.data, "question_banks"),
+        shared_path=os.path.join(args.data, "question_store")
+    )
+    target = SqliteBackend(args.sqlite)
+
+    started = time.perf_counter()
+    counts = migrate(source, target)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"✅ Migrated {counts['learners']} learners, {counts['plans']} plans, "
+        f"{counts['banks']} banks into {args.sqlite} in {elapsed:.1f}s "
+        f"({counts['failed']} failed)"
+    )
+
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+shard_data_dirs.py  —  move the flat JSON data layout into hash-prefix shards.
+
+Usage (from project root, with the app STOPPED):
+    python scripts/shard_data_dirs.py
+    python scripts/shard_data_dirs.py --data data --workers 16
+    python scripts/shard_data_dirs.py --dry-run
+
+For data/learners, data/plans and data/question_banks, moves every
+    {id}.json  {id}.idx  {id}.topicmap  {id}.log  {id}.audit.log  {id}.revisions.log
+from the flat directory into {dir}/ab/cd/ (see app/storage/sharding.py),
+in parallel, then rebuilds each directory's index.txt.
+
+Moves are renames within one filesystem, so each file is moved
+atomically and nothing is copied. Safe to re-run: ids already
+sharded are skipped. The app keeps reading files left in the
+flat layout, so a partial run is not harmful — but stop the app
+while it runs, or a request may write a flat file that was
+just moved.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.getcwd())
+
+from app.storage.sharding import rebuild_index, shard_dir
+
+DATA_DIRS = ("learners", "plans", "question_banks")
+
+# Every file that belongs to one entity, by suffix
+SUFFIXES = (".json", ".idx", ".topicmap", ".log", ".audit.log", ".revisions.log")
+
+
+def flat_groups(base: str) -> dict:
+    """
+    { id: [file names] } for every entity still in the flat layout.
+    One scandir of the flat directory — unavoidable this once.
+    """
+    groups = {}
+
+    with os.scandir(base) as entries:
+        for entry in entries:
+            name = entry.name
+            if not entry.is_file() or name.startswith("."):
+                continue
+
+            # Longest suffix first: x.audit.log is not id "x.audit"
+            for suffix in sorted(SUFFIXES, key=len, reverse=True):
+                if name.endswith(suffix):
+                    groups.setdefault(name[:-len(suffix)], []).append(name)
+                    break
+
+    return groups
+
+
+def move_entity(base: str, entity_id: str, names: list, dry_run: bool) -> str:
+    target = shard_dir(base, entity_id)
+
+    if os.path.exists(os.path.join(target, f"{entity_id}.json")):
+        return "skipped"
+
+    if dry_run:
+        return "moved"
+
+    os.makedirs(target, exist_ok=True)
+
+    # Main file last: until it moves, the app still finds the
+    # entity (and its logs) in the flat layout
+    for name in sorted(names, key=lambda n: n == f"{entity_id}.json"):
+        os.replace(os.path.join(base, name), os.path.join(target, name))
+
+    # Stale lock file is no longer used
+    lock = os.path.join(base, f"{entity_id}.json.lock")
+    if os.path.exists(lock):
+        os.remove(lock)
+
+    return "moved"
+
+
+def shard_directory(base: str, workers: int, dry_run: bool) -> dict:
+    counts = {"moved": 0, "skipped": 0, "failed": 0}
+
+    if not os.path.isdir(base):
+        return counts
+
+    groups = flat_groups(base)
+
+    def _move(item):
+        entity_id, names = item
+        try:
+            return move_entity(base, entity_id, names, dry_run)
+        except OSError as e:
+            print(f"  ❌ {entity_id}: {e}")
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(_move, groups.items()):
+            counts[outcome] += 1
+
+    if not dry_run:
+        counts["indexed"] = rebuild_index(base)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard the JSON data directories")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    for name in DATA_DIRS:
+        base = os.path.join(args.data, name)
+        counts = shard_directory(base, args.workers, args.dry_run)
+        print(f"{base}: {counts}")
+
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
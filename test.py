@@ -15,14 +15,12 @@ What it does:
 You only need to run this once.
 """
 
-import json
 import os
 import sys
 
 sys.path.insert(0, os.getcwd())
 
-LEARNER_PATH = "data/learners/697872ebfc9e66d2a16ea0c6.json"
-PLAN_PATH    = "data/plans/697872ebfc9e66d2a16ea0c6.json"
+USER_ID = "697872ebfc9e66d2a16ea0c6"
 
 # ── Topics to REMOVE from learner state (generic / dirty) ──
 REMOVE_TOPICS = {
@@ -36,8 +34,11 @@ REMOVE_TOPICS = {
 }
 
 # ── Load learner state ──
-with open(LEARNER_PATH) as f:
-    learner = json.load(f)
+# Through learner_store: the files on disk are in the compact
+# encoding plus an update log, not plain pretty-printed JSON
+from app.storage.learner_store import load_learner_state, save_learner_state
+
+learner = load_learner_state(USER_ID)
 
 # ── Remove dirty topics ──
 before = len(learner["topic_states"])
@@ -62,9 +63,8 @@ print(f"\nlearning_speed = {learner['learning_speed']}")
 print(f"consistency    = {learner['consistency']}")
 
 # ── Save cleaned learner state ──
-with open(LEARNER_PATH, "w") as f:
-    json.dump(learner, f, indent=2)
-print(f"\n✅ Learner state saved: {LEARNER_PATH}")
+save_learner_state(USER_ID, learner)
+print(f"\n✅ Learner state saved for {USER_ID}")
 
 # ── Now regenerate the plan ──
 print("\nRegenerating plan...")
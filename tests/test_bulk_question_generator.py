@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+import app.services.bulk_question_generator as bulk
+from app.services.bulk_question_generator import BulkQuestionGenerator
+from app.storage.backend import get_backend, set_backend
+from app.storage.json_backend import JsonFileBackend
+
+
+def _questions(topic: str) -> list:
+    return [{"question": f"What is {topic}?", "options": ["A", "B", "C", "D"], "answer": "A"}]
+
+
+class FakeLLM:
+    """Streams a canned reply in small pieces, like the real client."""
+
+    def __init__(self, reply: dict):
+        self.text = json.dumps(reply)
+
+    async def stream(self, prompt: str, **options):
+        for start in range(0, len(self.text), 7):
+            yield self.text[start:start + 7]
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    previous = get_backend()
+    set_backend(JsonFileBackend(
+        learner_path=str(tmp_path / "learners"),
+        plan_path=str(tmp_path / "plans"),
+        bank_path=str(tmp_path / "banks"),
+        topic_index_path=str(tmp_path / "topic_index"),
+        bank_status_path=str(tmp_path / "bank_status"),
+        shared_path=str(tmp_path / "store")
+    ))
+    monkeypatch.setattr(bulk, "BANK_LOCK_PATH", str(tmp_path / "locks"))
+    yield get_backend()
+    set_backend(previous)
+
+
+def test_respelled_keys_map_to_requested_topics(monkeypatch):
+    monkeypatch.setattr(bulk, "get_llm_client", lambda: FakeLLM({
+        "FRAMEWORK": _questions("framework"),
+        "Dead-locks": _questions("deadlocks"),
+        "Something unasked": _questions("other")
+    }))
+
+    bank = asyncio.run(BulkQuestionGenerator._generate_bulk(
+        {1: ["Frame work", "Deadlocks"]}, questions_per_topic=1, domain="OS"
+    ))
+
+    assert sorted(bank) == ["Deadlocks", "Frame work"]
+
+
+def test_respelled_topic_is_not_recorded_as_failed(storage, monkeypatch):
+    monkeypatch.setattr(bulk, "get_llm_client", lambda: FakeLLM({
+        "frame work": _questions("framework"),
+        "Process scheduling.": _questions("scheduling")
+    }))
+
+    bank = BulkQuestionGenerator._build(
+        "syllabus-1", {1: ["Frame Work", "Process Scheduling"]}, "OS"
+    )
+
+    assert sorted(bank) == ["Frame Work", "Process Scheduling"]
+    assert storage.load_bank_status("syllabus-1") is None
+
+
+def test_reply_with_respelled_keys_is_complete():
+    reply = json.dumps({"frame work": _questions("framework")})
+
+    assert BulkQuestionGenerator._reply_complete(reply, ["Frame Work"])
+    assert not BulkQuestionGenerator._reply_complete(reply, ["Frame Work", "Paging"])
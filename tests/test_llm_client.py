@@ -0,0 +1,79 @@
+import socket
+import sqlite3
+import threading
+
+import pytest
+
+from app.services.llm_cache import LLMCache
+from app.services.llm_client import LLMClient, LLMError, RequestHedger
+from app.services.llm_usage import LLMUsageLog
+
+
+def _client(tmp_path, port: int) -> tuple:
+    usage_log = LLMUsageLog(path=str(tmp_path / "usage.db"))
+    client = LLMClient(
+        api_url=f"http://127.0.0.1:{port}/v1/chat/completions",
+        api_key="test",
+        max_retries=0,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        cache=LLMCache(path=str(tmp_path / "cache.db"), mode="off"),
+        usage_log=usage_log,
+        hedger=RequestHedger(False, 95, 20, 1, 0)
+    )
+    return client, usage_log
+
+
+def _billed(usage_log: LLMUsageLog) -> tuple:
+    conn = sqlite3.connect(usage_log.path)
+    try:
+        return conn.execute("SELECT prompt_tokens, completion_tokens, outcome FROM calls").fetchone()
+    finally:
+        conn.close()
+
+
+def _unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_connect_error_is_not_billed(tmp_path):
+    client, usage_log = _client(tmp_path, _unused_port())
+
+    try:
+        with pytest.raises(LLMError):
+            client.chat_sync("x" * 400, timeout=5)
+    finally:
+        client.close()
+
+    assert _billed(usage_log) == (0, 0, "error")
+
+
+def test_timeout_after_send_is_billed(tmp_path):
+    # Accepts and reads the request, never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+
+    def _serve():
+        conn, _ = server.accept()
+        accepted.append(conn)
+        conn.recv(65536)
+
+    threading.Thread(target=_serve, daemon=True).start()
+    client, usage_log = _client(tmp_path, server.getsockname()[1])
+
+    try:
+        with pytest.raises(LLMError):
+            client.chat_sync("x" * 400, timeout=0.5)
+    finally:
+        client.close()
+        for conn in accepted:
+            conn.close()
+        server.close()
+
+    prompt_tokens, _, outcome = _billed(usage_log)
+    assert outcome == "error"
+    assert prompt_tokens >= 100